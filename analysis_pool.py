@@ -0,0 +1,153 @@
+"""
+Analysis Process Pool Module
+
+This module optionally runs the CPU-bound part of a batch screen (metrics,
+Lynch categorization, feature engineering, model fitting and long-term
+indicators) in a pool of worker processes, so large screens use every core
+instead of holding the GIL on the request thread.
+
+The pool is created once and reused. Workers are started with the forkserver
+method rather than forked from the web worker: by the time the first large
+screen runs, the web worker already has rate limiter, cache refresh, job and
+single-flight threads, and a child forked from it could inherit a lock one of
+them held at that moment and deadlock on it. The fork server is a fresh,
+single-threaded process that imports NumPy, pandas and scikit-learn once
+(ANALYSIS_PRELOAD), so workers forked from it still start without re-importing
+them. Price history is sent to the workers as plain NumPy arrays rather than
+pickled DataFrames.
+
+ANALYSIS_START_METHOD=fork is still accepted for platforms without
+forkserver; forked workers drop the SQLAlchemy connections they inherited.
+"""
+
+import os
+import math
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Number of analysis worker processes (0 runs the analysis on the request thread)
+ANALYSIS_PROCESSES = int(os.environ.get("ANALYSIS_PROCESSES", "0"))
+
+# Smallest batch worth sending to the pool
+ANALYSIS_POOL_MIN_BATCH = int(os.environ.get("ANALYSIS_POOL_MIN_BATCH", "20"))
+
+# Process start method; forkserver is safe to use from a web worker that already runs threads
+ANALYSIS_START_METHOD = os.environ.get("ANALYSIS_START_METHOD", "forkserver")
+
+# Modules the fork server imports once, so workers forked from it start warm
+ANALYSIS_PRELOAD = [name for name in os.environ.get("ANALYSIS_PRELOAD", "numpy,pandas,sklearn").split(",") if name]
+
+_app = None
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def init_analysis_pool(app):
+    """Register the Flask app whose database engine workers must not share."""
+    global _app
+    _app = app
+
+
+def _worker_init():
+    # Connections inherited from a forked parent must never be used by the child
+    # (workers started by the fork server never see the app here)
+    if _app is None:
+        return
+    try:
+        from models import db
+        with _app.app_context():
+            db.engine.dispose(close=False)
+    except Exception as e:
+        logger.error(f"Error resetting database engine in analysis worker: {str(e)}")
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            start_method = ANALYSIS_START_METHOD
+            if start_method not in multiprocessing.get_all_start_methods():
+                start_method = None
+            context = multiprocessing.get_context(start_method)
+            if context.get_start_method() == 'forkserver':
+                context.set_forkserver_preload(ANALYSIS_PRELOAD)
+            _executor = ProcessPoolExecutor(max_workers=ANALYSIS_PROCESSES, mp_context=context,
+                                            initializer=_worker_init)
+            logger.info(f"Started analysis pool with {ANALYSIS_PROCESSES} {context.get_start_method()} workers")
+        return _executor
+
+
+def pack_frame(frame):
+    """Convert a numeric DataFrame into plain arrays for sending to a worker."""
+    import numpy as np
+    import pandas as pd
+
+    if not isinstance(frame, pd.DataFrame) or not isinstance(frame.index, pd.DatetimeIndex):
+        return frame
+    index = frame.index
+    return {
+        '__frame__': True,
+        'values': frame.to_numpy(dtype=np.float64),
+        'index': index.asi8,
+        'tz': str(index.tz) if getattr(index, 'tz', None) is not None else None,
+        'columns': list(frame.columns),
+    }
+
+
+def unpack_frame(packed):
+    """Rebuild a DataFrame packed by pack_frame."""
+    if not isinstance(packed, dict) or not packed.get('__frame__'):
+        return packed
+
+    import pandas as pd
+
+    index = pd.DatetimeIndex(packed['index'].view('datetime64[ns]'))
+    if packed['tz']:
+        index = index.tz_localize('UTC').tz_convert(packed['tz'])
+    return pd.DataFrame(packed['values'], index=index, columns=packed['columns'], copy=False)
+
+
+def _pack_data(data):
+    # The balance sheet is only needed by the JSON API, not by the analysis
+    return {key: pack_frame(value) for key, value in data.items() if key != 'balance_sheet'}
+
+
+def _run_chunk(process_batch, tickers, packed_datas):
+    datas = [{key: unpack_frame(value) for key, value in data.items()} for data in packed_datas]
+    return process_batch(tickers, datas)
+
+
+def run_analysis(process_batch, tickers, datas):
+    """
+    Run a batch processing function, in the process pool when it is enabled.
+
+    Args:
+        process_batch (callable): Function taking (tickers, datas) and returning one result per ticker
+        tickers (list): Ticker symbols
+        datas (list): fetch_financial_data outputs, one per ticker
+
+    Returns:
+        list: Results in the same order as tickers
+    """
+    if ANALYSIS_PROCESSES <= 0 or len(tickers) < ANALYSIS_POOL_MIN_BATCH:
+        return process_batch(tickers, datas)
+
+    try:
+        executor = _get_executor()
+        chunk_size = math.ceil(len(tickers) / ANALYSIS_PROCESSES)
+        futures = [
+            executor.submit(_run_chunk, process_batch, tickers[start:start + chunk_size],
+                            [_pack_data(data) for data in datas[start:start + chunk_size]])
+            for start in range(0, len(tickers), chunk_size)
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+    except Exception as e:
+        logger.error(f"Error in analysis pool, processing on the request thread: {str(e)}")
+        return process_batch(tickers, datas)
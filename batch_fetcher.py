@@ -0,0 +1,121 @@
+"""
+Concurrent Batch Fetch Module
+
+This module runs per-ticker work for batch screens on a bounded thread pool.
+Upstream throughput is governed by the shared token bucket in rate_limiter,
+so the pool size only controls how many requests can be in flight at once.
+Results are returned in the same order as the input tickers (or streamed as
+they complete), and a failure for one ticker never affects the others.
+
+The pool is created once per process and shared by all batches. curl_cffi
+keeps a curl handle with its own connection cache per thread (see
+http_session), so long-lived fetch threads keep their TLS connections to
+Yahoo alive from one batch to the next.
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rate_limiter import FETCH_RATE_LIMIT, UPSTREAM_CALLS_PER_TICKER
+from telemetry import fetches_in_flight
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of tickers fetched at the same time
+FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", "8"))
+
+# Seconds a synchronous batch request may spend fetching data
+# (kept below gunicorn's default 30 second worker timeout)
+BATCH_TIME_BUDGET = float(os.environ.get("BATCH_TIME_BUDGET", "20"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Get the process-wide fetch pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, FETCH_MAX_WORKERS),
+                                               thread_name_prefix="batch-fetch")
+                logger.info(f"Started fetch pool with {max(1, FETCH_MAX_WORKERS)} threads")
+    return _executor
+
+
+def max_batch_size():
+    """
+    Get the maximum number of tickers a synchronous batch request may process.
+
+    The limit can be set explicitly with BATCH_MAX_TICKERS. Otherwise it is
+    derived from the upstream rate limit, so that a full batch can be fetched
+    within BATCH_TIME_BUDGET seconds.
+
+    Returns:
+        int: Maximum number of tickers per batch
+    """
+    configured = os.environ.get("BATCH_MAX_TICKERS")
+    if configured:
+        return max(1, int(configured))
+
+    return max(1, int(FETCH_RATE_LIMIT * BATCH_TIME_BUDGET / UPSTREAM_CALLS_PER_TICKER))
+
+
+def _run_isolated(task, ticker):
+    try:
+        with fetches_in_flight.track():
+            return task(ticker)
+    except Exception as e:
+        logger.error(f"Error processing {ticker}: {str(e)}")
+        return None
+
+
+def run_batch(tickers, task, executor=None):
+    """
+    Run a task for every ticker on the fetch pool.
+
+    Args:
+        tickers (list): Ticker symbols to process
+        task (callable): Function taking a ticker and returning its result
+        executor (Executor): Pool to run on, defaults to the shared fetch pool
+
+    Returns:
+        list: Task results in the same order as tickers, None for failed tickers
+    """
+    if not tickers:
+        return []
+
+    executor = executor or get_executor()
+    futures = [executor.submit(_run_isolated, task, ticker) for ticker in tickers]
+    return [future.result() for future in futures]
+
+
+def iter_batch(tickers, task, executor=None):
+    """
+    Run a task for every ticker on the fetch pool, yielding results as they complete.
+
+    If the consumer stops iterating early (for example because a streaming
+    client disconnected), tickers that have not started yet are cancelled.
+
+    Args:
+        tickers (list): Ticker symbols to process
+        task (callable): Function taking a ticker and returning its result
+        executor (Executor): Pool to run on, defaults to the shared fetch pool
+
+    Yields:
+        tuple: (ticker, result) in completion order, result is None for failed tickers
+    """
+    if not tickers:
+        return
+
+    executor = executor or get_executor()
+    futures = {executor.submit(_run_isolated, task, ticker): ticker for ticker in tickers}
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
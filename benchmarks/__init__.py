@@ -0,0 +1,25 @@
+"""
+Benchmark Suite
+
+This package measures the analysis hot paths on synthetic universes of
+tickers, so performance regressions show up between commits:
+
+1. Stage benchmarks run each step of the pipeline in isolation
+   (fetch_financial_data parsing, the vectorized metrics, Lynch
+   categorization, create_features, the incremental feature update,
+   train_prediction_model, calculate_long_term_indicators, batch
+   prediction, process_financial_data and the Magic Formula ranking)
+2. End-to-end benchmarks screen whole universes through the Flask test client
+   (/api/batch and the index() form), with the replay data provider serving
+   recorded snapshots instead of Yahoo Finance
+3. Startup benchmarks time a cold worker from import to its first response
+
+Synthetic universes are deterministic for a given seed and are written once
+as snapshots (see data_providers), then reused by later runs.
+
+Usage:
+    python -m benchmarks --sizes 10,1000,10000 --years 1,5,10
+    python -m benchmarks --compare benchmarks/results/previous.json
+
+Results are written as JSON to benchmarks/results/ (see benchmarks.results).
+"""
@@ -0,0 +1,100 @@
+"""
+Command-line entry point: python -m benchmarks --help
+"""
+
+import sys
+import json
+import logging
+import warnings
+import argparse
+import tempfile
+
+from benchmarks.environment import BENCHMARK_SNAPSHOT_DIR, configure
+
+
+def _numbers(value, cast):
+    return [cast(part) for part in value.split(',') if part.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmark the analysis hot paths on synthetic universes.')
+    parser.add_argument('--sizes', default='10,1000,10000', type=lambda v: _numbers(v, int),
+                        help='Universe sizes, comma separated (default: 10,1000,10000)')
+    parser.add_argument('--years', default='1,5,10', type=lambda v: _numbers(v, float),
+                        help='Years of history for the per-ticker stages (default: 1,5,10)')
+    parser.add_argument('--e2e-years', default=1.0, type=float,
+                        help='Years of history recorded for end-to-end runs (default: 1)')
+    parser.add_argument('--repeat', default=3, type=int, help='Timed calls per measurement (default: 3)')
+    parser.add_argument('--sample', default=200, type=int,
+                        help='Tickers the per-ticker stages run on (default: 200)')
+    parser.add_argument('--seed', default=0, type=int, help='Seed of the synthetic universes (default: 0)')
+    parser.add_argument('--skip-stages', action='store_true', help='Skip the stage benchmarks')
+    parser.add_argument('--skip-end-to-end', action='store_true', help='Skip the end-to-end benchmarks')
+    parser.add_argument('--skip-startup', action='store_true', help='Skip the cold start benchmarks')
+    parser.add_argument('--snapshot-dir', default=BENCHMARK_SNAPSHOT_DIR,
+                        help='Where the synthetic universes are recorded (reused between runs)')
+    parser.add_argument('--workdir', default=None,
+                        help='Scratch directory for the database and history store (default: a new temp dir)')
+    parser.add_argument('--output', default=None, help='Result file (default: benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', default=None, help='Previous result file to compare against')
+    parser.add_argument('--threshold', default=0.1, type=float,
+                        help='Relative slowdown reported as a regression (default: 0.1)')
+    parser.add_argument('--log-level', default='WARNING', help='Log level of the application (default: WARNING)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # The application logs every ticker at DEBUG, which would dominate the timings
+    logging.basicConfig(level=args.log_level.upper(), format='%(message)s')
+    logging.getLogger('benchmarks').setLevel(logging.INFO)
+    warnings.simplefilter('ignore', FutureWarning)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='stocksight-bench-')
+    configure(workdir, args.snapshot_dir, max(args.sizes))
+
+    # Imported after configure() so the application picks up the benchmark settings
+    from benchmarks.synthetic import ensure_universe
+    from benchmarks.stages import run_stage_benchmarks
+    from benchmarks.end_to_end import run_end_to_end_benchmarks
+    from benchmarks.startup import run_startup_benchmarks
+    from benchmarks.results import write_results, compare_results
+
+    results = []
+    if not args.skip_startup:
+        results.extend(run_startup_benchmarks(args.repeat))
+
+    for size in ([] if args.skip_stages and args.skip_end_to_end else args.sizes):
+        tickers = ensure_universe(args.snapshot_dir, size, args.e2e_years, args.seed)
+        if not args.skip_stages:
+            results.extend(run_stage_benchmarks(args.snapshot_dir, size, args.years, args.repeat,
+                                                args.sample, args.seed))
+        if not args.skip_end_to_end:
+            results.extend(run_end_to_end_benchmarks(tickers, args.repeat, args.e2e_years))
+
+    config = {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'log_level')}
+    config['workdir'] = workdir
+    path = write_results(results, config, args.output)
+    print(f"Wrote {len(results)} results to {path}")
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+
+    regressions = 0
+    for (benchmark, name, universe, years), old, new, ratio, regressed in compare_results(
+            baseline, results, args.threshold):
+        regressions += regressed
+        label = f"{benchmark}/{name} [{universe} tickers{f', {years:g} years' if years else ''}]" if universe else f"{benchmark}/{name}"
+        print(f"{'REGRESSION' if regressed else 'ok':<10} {label:<60} {old:9.4f}s -> {new:9.4f}s ({ratio:5.2f}x)")
+
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+End-to-End Benchmarks Module
+
+This module screens a whole synthetic universe through the Flask test client,
+so the timings include routing, the tiered cache, the fetch thread pool,
+processing, ranking and rendering. The replay data provider serves the
+universe from its snapshots (see benchmarks.environment).
+
+Each universe is measured four ways:
+1. api_batch_cold: the first POST /api/batch, with empty caches
+2. api_batch_warm: repeated POST /api/batch, served from the cache
+3. index_batch: the batch form posted to index(), which renders the ranked table
+4. api_screen: GET /api/screen on the metrics the batches materialized (the
+   first call also re-ranks the universe)
+"""
+
+import logging
+
+from benchmarks.results import measure, make_result
+
+logger = logging.getLogger(__name__)
+
+
+def _check(response, size):
+    if response.status_code != 200:
+        raise RuntimeError(f"Batch request for {size} tickers failed with HTTP {response.status_code}: "
+                           f"{response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def run_end_to_end_benchmarks(tickers, repeat=3, years=1):
+    """
+    Screen one synthetic universe through the Flask test client.
+
+    Args:
+        tickers (list): Ticker symbols of the universe
+        repeat (int): Timed calls for the warm measurements
+        years (float): Years of history recorded in the snapshots
+
+    Returns:
+        list: Result entries
+    """
+    from main import app
+
+    client = app.test_client()
+    size = len(tickers)
+    results = []
+    ranked = []
+
+    def post_batch():
+        response = _check(client.post('/api/batch', json={'tickers': tickers}), size)
+        ranked[:] = response.get_json()['data']
+
+    def post_index():
+        _check(client.post('/', data={'action': 'batch', 'ticker_list': ', '.join(tickers)}), size)
+
+    def get_screen():
+        _check(client.get('/api/screen?earnings_yield_gt=8&return_on_capital_gt=20&sort=magic_rank'), size)
+
+    for name, timings in (('api_batch_cold', measure(post_batch, 1)),
+                          ('api_batch_warm', measure(post_batch, repeat)),
+                          ('index_batch', measure(post_index, repeat)),
+                          ('api_screen', measure(get_screen, repeat))):
+        result = make_result('end_to_end', name, size, timings, years=years, screened=len(ranked))
+        logger.info(f"{name} [{size} tickers]: {result['seconds']['min']:.4f}s "
+                    f"({result['per_ticker'] * 1000:.3f} ms/ticker, {len(ranked)} ranked)")
+        results.append(result)
+
+    if len(ranked) != size:
+        logger.warning(f"Only {len(ranked)} of {size} synthetic tickers were screened")
+    return results
@@ -0,0 +1,41 @@
+"""
+Benchmark Environment Module
+
+The application reads its configuration from environment variables when its
+modules are imported, so the benchmark settings have to be in place before
+main (or data_providers, data_cache, ...) is imported. This module only uses
+the standard library for that reason.
+"""
+
+import os
+
+# Directory the synthetic universes are recorded to and replayed from
+BENCHMARK_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      "instance", "benchmarks", "snapshots")
+
+# Cache lifetime used while benchmarking, so warm runs are served from the cache
+# instead of triggering background revalidation halfway through a measurement
+BENCHMARK_CACHE_TTL = str(7 * 24 * 3600)
+
+
+def configure(workdir, snapshot_dir, max_batch):
+    """
+    Point the application at the replay provider and a scratch directory.
+
+    Args:
+        workdir (str): Directory for the SQLite database and the history store
+        snapshot_dir (str): Snapshot directory of the synthetic universes
+        max_batch (int): Largest universe screened in one request
+    """
+    os.makedirs(workdir, exist_ok=True)
+    os.environ.update({
+        'DATA_PROVIDER': 'replay',
+        'DATA_SNAPSHOT_DIR': snapshot_dir,
+        'DATABASE_URL': 'sqlite:///' + os.path.join(os.path.abspath(workdir), 'benchmark.db'),
+        'HISTORY_STORE_DIR': os.path.join(workdir, 'history'),
+        'BATCH_MAX_TICKERS': str(max_batch),
+        'CACHE_TTL_INFO': BENCHMARK_CACHE_TTL,
+        'CACHE_TTL_HISTORY': BENCHMARK_CACHE_TTL,
+    })
+    # Fitted models must not leak between runs
+    os.environ.pop('MODEL_CACHE_DIR', None)
@@ -0,0 +1,185 @@
+"""
+Benchmark Results Module
+
+This module times benchmark callables and writes the results as JSON, one
+file per run. A result file records the commit, the environment and one entry
+per measurement, so two runs can be compared to spot regressions:
+
+    {
+        "schema": 1,
+        "commit": "...",
+        "results": [
+            {"benchmark": "stage", "name": "create_features", "universe": 1000,
+             "years": 5, "tickers": 200, "repeat": 3,
+             "seconds": {"min": ..., "median": ..., "mean": ...},
+             "per_ticker": ...},
+            ...
+        ]
+    }
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+# Version of the result file layout
+RESULTS_SCHEMA = 1
+
+# Directory result files are written to by default
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def measure(fn, repeat=3, setup=None):
+    """
+    Time a callable.
+
+    Args:
+        fn (callable): Work to time, called without arguments
+        repeat (int): Number of timed calls
+        setup (callable): Called before each timed call, outside the timing
+
+    Returns:
+        list: Seconds taken by each call
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def make_result(benchmark, name, universe, timings, tickers=None, years=None, **extra):
+    """
+    Build one result entry from the timings of a measurement.
+
+    Args:
+        benchmark (str): 'stage' or 'end_to_end'
+        name (str): Stage or scenario name
+        universe (int): Size of the synthetic universe
+        timings (list): Seconds per call from measure()
+        tickers (int): Number of tickers processed per call, defaults to universe
+        years (float): Years of history, None when not applicable
+
+    Returns:
+        dict: Result entry
+    """
+    tickers = universe if tickers is None else tickers
+    best = min(timings)
+    result = {
+        'benchmark': benchmark,
+        'name': name,
+        'universe': universe,
+        'years': years,
+        'tickers': tickers,
+        'repeat': len(timings),
+        'seconds': {
+            'min': best,
+            'median': statistics.median(timings),
+            'mean': statistics.fmean(timings),
+        },
+        'per_ticker': best / tickers if tickers else None,
+    }
+    result.update(extra)
+    return result
+
+
+def result_key(result):
+    """Identify a measurement across runs."""
+    return (result['benchmark'], result['name'], result['universe'], result['years'])
+
+
+def _git_commit(cwd):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=cwd, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def _package_versions():
+    versions = {}
+    for name in ('numpy', 'pandas', 'sklearn', 'flask', 'sqlalchemy'):
+        module = sys.modules.get(name)
+        if module is not None:
+            versions[name] = getattr(module, '__version__', None)
+    return versions
+
+
+def write_results(results, config, path=None):
+    """
+    Write the results of a run to a JSON file.
+
+    Args:
+        results (list): Result entries from make_result
+        config (dict): Options the run was made with
+        path (str): Output file, defaults to RESULTS_DIR/<timestamp>-<commit>.json
+
+    Returns:
+        str: Path of the written file
+    """
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    commit, dirty = _git_commit(repo)
+    created_at = datetime.now(timezone.utc)
+
+    if path is None:
+        name = created_at.strftime('%Y%m%dT%H%M%SZ') + (f"-{commit[:10]}" if commit else '') + '.json'
+        path = os.path.join(RESULTS_DIR, name)
+
+    document = {
+        'schema': RESULTS_SCHEMA,
+        'created_at': created_at.isoformat(),
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': _package_versions(),
+        'config': config,
+        'results': results,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare_results(baseline, results, threshold=0.1):
+    """
+    Compare a run against a baseline result file.
+
+    Measurements are compared on their best time; noise makes smaller
+    differences meaningless, so only changes beyond the threshold are flagged.
+
+    Args:
+        baseline (dict): Contents of a previous result file
+        results (list): Result entries of the current run
+        threshold (float): Relative slowdown reported as a regression
+
+    Returns:
+        list: One (key, baseline seconds, current seconds, ratio, regressed) tuple
+        per measurement present in both runs
+    """
+    previous = {result_key(result): result for result in baseline.get('results', [])}
+    comparisons = []
+    for result in results:
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+        old, new = before['seconds']['min'], result['seconds']['min']
+        ratio = new / old if old else float('inf')
+        comparisons.append((result_key(result), old, new, ratio, ratio > 1 + threshold))
+    return comparisons
@@ -0,0 +1,173 @@
+"""
+Stage Benchmarks Module
+
+This module times each step of the analysis pipeline in isolation on a
+synthetic universe. Steps that work on the whole universe at once (the
+vectorized metrics, Lynch categorization and the Magic Formula ranking) run on
+every ticker; steps that run per ticker on price history (feature
+engineering, model fitting, long-term indicators, prediction and the
+/api/stock serialization) run on a sample of the universe for each history
+length, and report the time per ticker.
+"""
+
+import logging
+
+from benchmarks.results import measure, make_result
+from benchmarks.synthetic import universe_tickers, synthetic_history
+
+logger = logging.getLogger(__name__)
+
+
+def _load_records(snapshot_dir, tickers):
+    """Parse every ticker's snapshots with fetch_financial_data, bypassing the cache."""
+    from main import fetch_financial_data
+    from data_providers import ReplayProvider
+
+    provider = ReplayProvider(snapshot_dir)
+    records = []
+    for ticker in tickers:
+        record = fetch_financial_data(ticker, provider=provider, use_cache=False)
+        if 'error' in record:
+            raise RuntimeError(f"Could not load synthetic data for {ticker}: {record['error']}")
+        record.pop('historical_data', None)
+        records.append(record)
+    return records
+
+
+def _lynch_inputs(tickers, records, metrics):
+    # Same fields main.lynch_inputs passes to the Lynch rule engine
+    return [{
+        'ticker': ticker,
+        'market_cap': record['market_cap'],
+        'earnings_growth': record['earnings_growth'],
+        'revenue_growth': None,
+        'industry': record['industry'],
+        'sector': record['sector'],
+        'price_change_percent': record['price_change_percent'],
+        'book_value_per_share': record['book_value_per_share'],
+        'current_price': record['current_price'],
+        'total_assets': record['total_assets'],
+        'enterprise_value': row['enterprise_value'],
+        'pe_ratio': row['pe_ratio'],
+        'peg_ratio': row['peg_ratio'],
+        'debt_to_equity': row['debt_to_equity'],
+    } for ticker, record, row in zip(tickers, records, metrics)]
+
+
+def run_stage_benchmarks(snapshot_dir, size, years=(1,), repeat=3, sample=200, seed=0):
+    """
+    Time every pipeline stage on one synthetic universe.
+
+    Args:
+        snapshot_dir (str): Snapshot directory holding the universe
+        size (int): Number of tickers in the universe
+        years (iterable): History lengths, in years, for the per-ticker stages
+        repeat (int): Timed calls per stage
+        sample (int): Number of tickers the per-ticker stages run on
+        seed (int): Universe seed
+
+    Returns:
+        list: Result entries
+    """
+    import main
+    from data_providers import ReplayProvider
+    from metrics_engine import records_to_frame, compute_metrics, metrics_to_rows
+    from lynch_categories import categorize_stock, evaluate_stock_against_checklist
+    from lynch_engine import records_to_frame as lynch_frame, classify_frame, classification_to_rows
+    from ranking import rank_results
+    from serialization import encode_stock_data, dumps
+    from stock_predictor import (create_features, train_prediction_model, calculate_long_term_indicators,
+                                 predict_price_movements, clear_model_cache)
+    from feature_state import FeatureState
+
+    tickers = universe_tickers(size)
+    sampled = tickers[:min(size, sample)]
+    results = []
+
+    def record(name, timings, tickers_measured=None, history_years=None):
+        result = make_result('stage', name, size, timings, tickers=tickers_measured, years=history_years)
+        logger.info(f"{name} [{size} tickers, {history_years or '-'} years]: "
+                    f"{result['seconds']['min']:.4f}s ({result['per_ticker'] * 1000:.3f} ms/ticker)")
+        results.append(result)
+
+    # Snapshot decoding and parsing, with a fresh replay provider so nothing is decoded in advance
+    providers = []
+    record('fetch_financial_data', measure(
+        lambda: [main.fetch_financial_data(ticker, provider=providers[-1], use_cache=False) for ticker in sampled],
+        repeat, setup=lambda: providers.append(ReplayProvider(snapshot_dir))), len(sampled))
+    providers.clear()
+
+    records = _load_records(snapshot_dir, tickers)
+
+    record('compute_metrics', measure(lambda: compute_metrics(records_to_frame(records)), repeat))
+    metrics = metrics_to_rows(compute_metrics(records_to_frame(records)))
+
+    lynch_inputs = _lynch_inputs(tickers, records, metrics)
+
+    # The whole universe in one pass of the rule engine, as process_financial_batch does
+    record('lynch_categorization', measure(
+        lambda: classification_to_rows(classify_frame(lynch_frame(lynch_inputs))), repeat))
+
+    def categorize_each():
+        for data in lynch_inputs[:len(sampled)]:
+            category = categorize_stock(data)['category']
+            evaluate_stock_against_checklist(data, category)
+
+    record('lynch_categorization_per_ticker', measure(categorize_each, repeat), len(sampled))
+
+    ranked_rows = [dict(row, ticker=ticker) for ticker, row in zip(tickers, metrics)]
+    record('magic_formula_ranking', measure(lambda: rank_results(ranked_rows), repeat))
+
+    for history_years in years:
+        histories = {ticker: synthetic_history(position, history_years, seed)
+                     for position, ticker in enumerate(sampled)}
+        features = {ticker: create_features(history) for ticker, history in histories.items()}
+
+        record('create_features', measure(
+            lambda: [create_features(history) for history in histories.values()], repeat),
+            len(sampled), history_years)
+
+        # One new bar folded into states holding every earlier bar
+        saved_states = {ticker: FeatureState.from_frame(history.iloc[:-1]).to_dict()
+                        for ticker, history in histories.items()}
+        new_bars = {ticker: (history.index[-1], tuple(history.iloc[-1])) for ticker, history in histories.items()}
+        states = {}
+        record('feature_state_update', measure(
+            lambda: [states[ticker].update(*new_bars[ticker]) for ticker in sampled], repeat,
+            setup=lambda: states.update((ticker, FeatureState.from_dict(state)) for ticker, state in saved_states.items())),
+            len(sampled), history_years)
+
+        record('train_prediction_model', measure(
+            lambda: [train_prediction_model(histories[ticker], 30, df_features=features[ticker])
+                     for ticker in sampled], repeat),
+            len(sampled), history_years)
+
+        record('calculate_long_term_indicators', measure(
+            lambda: [calculate_long_term_indicators(history) for history in histories.values()], repeat),
+            len(sampled), history_years)
+
+        record('predict_price_movements', measure(
+            lambda: predict_price_movements(histories, forecast_period=30), repeat, setup=clear_model_cache),
+            len(sampled), history_years)
+
+        datas = [dict(records[position], historical_data=histories[ticker]) for position, ticker in enumerate(sampled)]
+
+        record('process_financial_data', measure(
+            lambda: [main.process_financial_data(ticker, data) for ticker, data in zip(sampled, datas)],
+            repeat, setup=clear_model_cache),
+            len(sampled), history_years)
+
+        record('process_financial_batch', measure(
+            lambda: main.process_financial_batch(sampled, datas), repeat, setup=clear_model_cache),
+            len(sampled), history_years)
+
+        # /api/stock payloads, full precision and compact
+        record('encode_stock_data', measure(
+            lambda: [dumps(encode_stock_data(data)) for data in datas], repeat),
+            len(sampled), history_years)
+
+        record('encode_stock_data_compact', measure(
+            lambda: [dumps(encode_stock_data(data, float32=True, delta_timestamps=True)) for data in datas], repeat),
+            len(sampled), history_years)
+
+    return results
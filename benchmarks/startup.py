@@ -0,0 +1,83 @@
+"""
+Startup Benchmarks Module
+
+This module measures how fast a cold worker comes up. Each run starts a fresh
+interpreter (like a new gunicorn worker), imports main and serves one
+request to /api/ticker-lists through the test client, and reports:
+
+1. import_main: time to import the application
+2. first_request: time to answer the first request, including schema creation
+3. process_start: wall time from spawning the process to the first response
+
+It also records which heavy modules were loaded by then; the ticker list
+endpoints must come up without scikit-learn.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import subprocess
+
+from benchmarks.results import make_result
+
+logger = logging.getLogger(__name__)
+
+# Modules that are expensive to import and should only load on first use
+HEAVY_MODULES = ('pandas', 'numpy', 'sklearn', 'yfinance', 'requests', 'curl_cffi')
+
+_PROBE = """
+import sys, time, json, logging
+logging.disable(logging.CRITICAL)
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+response = main.app.test_client().get('/api/ticker-lists')
+served = time.perf_counter()
+print(json.dumps({
+    'import_main': imported - start,
+    'first_request': served - imported,
+    'status': response.status_code,
+    'modules': [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def _probe_once(repo):
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', _PROBE], cwd=repo, env=dict(os.environ),
+                               capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    probe = json.loads(completed.stdout.strip().splitlines()[-1])
+    probe['process_start'] = wall
+    return probe
+
+
+def run_startup_benchmarks(repeat=3):
+    """
+    Start the application in fresh interpreters and time its first request.
+
+    Args:
+        repeat (int): Number of cold starts
+
+    Returns:
+        list: Result entries
+    """
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    probes = [_probe_once(repo) for _ in range(repeat)]
+
+    statuses = {probe['status'] for probe in probes}
+    modules = sorted({name for probe in probes for name in probe['modules']})
+    if statuses != {200}:
+        logger.warning(f"/api/ticker-lists answered {sorted(statuses)} during startup runs")
+    if 'sklearn' in modules:
+        logger.warning("scikit-learn was loaded before the first /api/ticker-lists response")
+
+    results = []
+    for name in ('import_main', 'first_request', 'process_start'):
+        result = make_result('startup', name, 0, [probe[name] for probe in probes], tickers=0,
+                             loaded_modules=modules)
+        logger.info(f"{name}: {result['seconds']['min']:.4f}s (loaded: {', '.join(modules) or 'none'})")
+        results.append(result)
+    return results
@@ -0,0 +1,238 @@
+"""
+Synthetic Universe Module
+
+This module generates deterministic market data for benchmarking: daily OHLCV
+history from a geometric random walk, and info, annual financials, balance
+sheet and dividends shaped like the yfinance responses fetch_financial_data
+parses. Every ticker is generated from (seed, position), so any ticker can be
+rebuilt on its own without generating the rest of the universe.
+
+Fundamentals are spread over sizes, growth rates and sectors so that every
+Lynch category and Magic Formula decision shows up in a large universe.
+"""
+
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from data_providers import write_snapshot, SNAPSHOT_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+# Trading days per year of synthetic history
+TRADING_DAYS = 252
+
+# Exchange time zone of the synthetic bars (matches Ticker.history() for US listings)
+HISTORY_TZ = 'America/New_York'
+
+# (sector, industry) pairs, cyclical and defensive
+SECTORS = [
+    ('Technology', 'Software - Infrastructure'),
+    ('Technology', 'Semiconductors'),
+    ('Healthcare', 'Drug Manufacturers - General'),
+    ('Financial Services', 'Banks - Diversified'),
+    ('Consumer Defensive', 'Beverages - Non-Alcoholic'),
+    ('Energy', 'Oil & Gas Integrated'),
+    ('Industrials', 'Aerospace & Defense'),
+    ('Utilities', 'Utilities - Regulated Electric'),
+    ('Real Estate', 'REIT - Diversified'),
+    ('Communication Services', 'Internet Content & Information'),
+]
+
+# Name of the file describing a generated universe
+MANIFEST_NAME = 'manifest.json'
+
+
+def universe_tickers(size):
+    """
+    Get the ticker symbols of a synthetic universe.
+
+    Universes of different sizes use different symbols, so caches warmed by
+    one universe never serve another.
+
+    Args:
+        size (int): Number of tickers
+
+    Returns:
+        list: Ticker symbols
+    """
+    return [f"SYN{size}-{i:05d}" for i in range(size)]
+
+
+def _last_session():
+    return pd.offsets.BDay().rollback(pd.Timestamp.now(tz=HISTORY_TZ).normalize().tz_localize(None))
+
+
+def synthetic_history(position, years=1, seed=0):
+    """
+    Generate daily OHLCV history for one ticker.
+
+    Args:
+        position (int): Position of the ticker in its universe
+        years (float): Length of the history in years
+        seed (int): Universe seed
+
+    Returns:
+        pd.DataFrame: Bars with the columns of Ticker.history(), ending at the last weekday
+    """
+    rng = np.random.default_rng([seed, position, 0])
+    n = max(2, int(round(years * TRADING_DAYS)))
+    index = pd.bdate_range(end=_last_session(), periods=n).tz_localize(HISTORY_TZ)
+
+    drift = rng.normal(0.0003, 0.0004)
+    volatility = rng.uniform(0.008, 0.035)
+    close = rng.uniform(5, 500) * np.exp(np.cumsum(rng.normal(drift, volatility, n)))
+    open_ = np.empty(n)
+    open_[0] = close[0]
+    open_[1:] = close[:-1] * (1 + rng.normal(0, volatility / 4, n - 1))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, n)))
+    volume = np.round(rng.lognormal(14, 0.6, n))
+
+    dividends = np.zeros(n)
+    if rng.random() < 0.6:
+        dividends[np.arange(n - 1, -1, -63)] = np.round(close[-1] * rng.uniform(0.002, 0.012), 4)
+
+    return pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume,
+        'Dividends': dividends,
+        'Stock Splits': np.zeros(n),
+    }, index=pd.DatetimeIndex(index, name='Date'))
+
+
+def synthetic_fundamentals(ticker, position, history, seed=0):
+    """
+    Generate the info, financials, balance sheet and dividends of one ticker.
+
+    Args:
+        ticker (str): Ticker symbol
+        position (int): Position of the ticker in its universe
+        history (pd.DataFrame): The ticker's synthetic history, for prices and dividends
+        seed (int): Universe seed
+
+    Returns:
+        dict: Raw responses keyed by kind, as returned by a provider's ticker object
+    """
+    rng = np.random.default_rng([seed, position, 1])
+    sector, industry = SECTORS[int(rng.integers(len(SECTORS)))]
+
+    current_price = float(history['Close'].iloc[-1])
+    previous_close = float(history['Close'].iloc[-2])
+    market_cap = float(np.exp(rng.uniform(np.log(2e8), np.log(2e12))))
+    shares_outstanding = market_cap / current_price
+
+    revenue = market_cap * rng.uniform(0.1, 1.5)
+    operating_margin = rng.normal(0.15, 0.12)
+    growth = rng.normal(0.08, 0.15)
+    revenues = revenue / (1 + growth) ** np.arange(4)
+    operating_income = revenues * operating_margin
+    net_income = operating_income * rng.uniform(0.6, 0.85)
+
+    total_assets = revenue * rng.uniform(0.8, 3.0)
+    current_assets = total_assets * rng.uniform(0.2, 0.5)
+    current_liabilities = current_assets / rng.uniform(0.6, 3.0)
+    total_debt = total_assets * rng.uniform(0.0, 0.5)
+    equity = max(total_assets - total_debt - current_liabilities, total_assets * 0.05)
+
+    year_ends = pd.DatetimeIndex([pd.Timestamp(year=history.index[-1].year - i - 1, month=12, day=31)
+                                  for i in range(4)])
+    financials = pd.DataFrame(
+        [revenues, operating_income, operating_income, net_income, net_income],
+        index=['Total Revenue', 'Operating Income', 'Total Operating Income As Reported',
+               'Net Income From Continuing Operation Net Minority Interest', 'Net Income'],
+        columns=year_ends,
+    )
+    balance_sheet = pd.DataFrame(
+        [np.full(4, total_debt), np.full(4, total_assets * rng.uniform(0.02, 0.15)),
+         np.full(4, current_assets), np.full(4, current_liabilities),
+         np.full(4, total_assets * rng.uniform(0.1, 0.5)), np.full(4, total_assets), np.full(4, equity)],
+        index=['Total Debt', 'Cash And Cash Equivalents', 'Current Assets', 'Current Liabilities',
+               'Property Plant And Equipment', 'Total Assets', 'Stockholders Equity'],
+        columns=year_ends,
+    )
+
+    dividends = history['Dividends'][history['Dividends'] > 0].rename('Dividends')
+    dividend_rate = float(dividends.iloc[-4:].sum()) if not dividends.empty else None
+
+    info = {
+        'symbol': ticker,
+        'shortName': f"Synthetic {ticker}",
+        'sector': sector,
+        'industry': industry,
+        'country': 'United States',
+        'currency': 'USD',
+        'marketCap': int(market_cap),
+        'currentPrice': round(current_price, 4),
+        'previousClose': round(previous_close, 4),
+        'sharesOutstanding': int(shares_outstanding),
+        'trailingEPS': round(float(net_income[0] / shares_outstanding), 4),
+        'forwardEps': round(float(net_income[0] * (1 + growth) / shares_outstanding), 4),
+        'earningsGrowth': round(float(growth), 4),
+        'dividendRate': round(dividend_rate, 4) if dividend_rate else None,
+        'dividendYield': round(dividend_rate / current_price * 100, 2) if dividend_rate else None,
+        'exDividendDate': int(dividends.index[-1].timestamp()) if dividend_rate else None,
+        'fiveYearAvgDividendYield': round(float(rng.uniform(0.5, 4.0)), 2) if dividend_rate else None,
+    }
+
+    return {
+        'info': info,
+        'financials': financials,
+        'balance_sheet': balance_sheet,
+        'dividends': dividends,
+    }
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def ensure_universe(directory, size, years=1, seed=0):
+    """
+    Write the snapshots of a synthetic universe, unless they already exist.
+
+    Snapshots are recorded for the last weekday; a universe generated on an
+    earlier day is regenerated so cached history stays current.
+
+    Args:
+        directory (str): Snapshot directory served by the replay provider
+        size (int): Number of tickers
+        years (float): Length of the recorded history in years
+        seed (int): Universe seed
+
+    Returns:
+        list: Ticker symbols of the universe
+    """
+    tickers = universe_tickers(size)
+    manifest_key = f"{size}"
+    expected = {'years': years, 'seed': seed, 'session': _last_session().date().isoformat()}
+
+    manifest = _read_manifest(directory) or {}
+    if manifest.get(manifest_key) == expected and all(
+            os.path.exists(os.path.join(directory, tickers[i], 'info' + SNAPSHOT_SUFFIX))
+            for i in (0, size - 1)):
+        return tickers
+
+    logger.info(f"Generating synthetic universe of {size} tickers ({years} years of history)")
+    for position, ticker in enumerate(tickers):
+        history = synthetic_history(position, years, seed)
+        write_snapshot(directory, ticker, 'history', history)
+        for kind, value in synthetic_fundamentals(ticker, position, history, seed).items():
+            write_snapshot(directory, ticker, kind, value)
+
+    manifest = _read_manifest(directory) or {}
+    manifest[manifest_key] = expected
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return tickers
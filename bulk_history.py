@@ -0,0 +1,173 @@
+"""
+Bulk Price History Module
+
+This module downloads daily price history for many tickers with yf.download
+instead of one Ticker.history() call per ticker inside fetch_financial_data.
+Tickers are sent in large chunks; yfinance fetches the symbols of a chunk on
+its own thread pool over the shared HTTP session and returns one wide frame.
+
+The wide frame is converted to a single float64 array once, and every ticker's
+frame is a view on its block of columns. Rows are only copied for tickers
+whose trading calendar differs from the rest of the chunk (e.g. a holiday on
+one exchange), where the dates it did not trade have to be dropped.
+"""
+
+import os
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from rate_limiter import (upstream_limiter, upstream_circuit, record_upstream_result, is_rate_limit_error,
+                          UpstreamThrottled)
+from http_session import get_session
+
+logger = logging.getLogger(__name__)
+
+# Number of tickers requested in one yf.download call
+BULK_HISTORY_CHUNK = int(os.environ.get("BULK_HISTORY_CHUNK", "50"))
+
+# Number of threads yfinance uses inside one yf.download call
+BULK_HISTORY_THREADS = int(os.environ.get("BULK_HISTORY_THREADS", "8"))
+
+# yf.download keeps its results in module-level state, so calls must not overlap
+_download_lock = threading.Lock()
+
+
+def split_wide_frame(data, tickers):
+    """
+    Split a yf.download frame grouped by ticker into one frame per ticker.
+
+    Args:
+        data (pd.DataFrame): Wide frame with (ticker, field) column pairs
+        tickers (list): Ticker symbols to extract
+
+    Returns:
+        dict: Ticker symbol to its OHLCV DataFrame; tickers without any bars are omitted
+    """
+    frames = {}
+    if data is None or data.empty or not isinstance(data.columns, pd.MultiIndex):
+        return frames
+
+    values = data.to_numpy(dtype=np.float64)
+    index = data.index
+    level = data.columns.get_level_values(0)
+
+    for ticker in tickers:
+        positions = np.flatnonzero(level == ticker)
+        if len(positions) == 0:
+            continue
+
+        # Columns of one ticker are adjacent, so this is a view on the wide array
+        block = values[:, positions[0]:positions[-1] + 1]
+        has_bar = ~np.isnan(block).all(axis=1)
+        rows = np.flatnonzero(has_bar)
+        if len(rows) == 0:
+            continue
+
+        first, last = rows[0], rows[-1] + 1
+        if len(rows) == last - first:
+            block, ticker_index = block[first:last], index[first:last]
+        else:
+            block, ticker_index = block[has_bar], index[has_bar]
+
+        columns = list(data.columns.get_level_values(1)[positions[0]:positions[-1] + 1])
+        frames[ticker] = pd.DataFrame(block, index=ticker_index, columns=columns, copy=False)
+
+    return frames
+
+
+def download_errors(yf, tickers, frames):
+    """
+    Collect the per-symbol failures of the last yf.download call.
+
+    yf.download logs failures instead of raising them and only keeps them in
+    its module state (yf.shared._ERRORS, as reprs of the exceptions). That is
+    not public API, so it is read defensively: if it is missing or changes
+    shape, symbols that came back without any bars are still reported, just
+    without a reason.
+
+    Args:
+        yf (module): The yfinance module
+        tickers (list): Ticker symbols that were requested
+        frames (dict): Ticker symbol to the frame returned for it
+
+    Returns:
+        dict: Ticker symbol to an exception describing its failure
+    """
+    reported = getattr(getattr(yf, 'shared', None), '_ERRORS', None)
+    if not isinstance(reported, dict):
+        reported = {}
+
+    errors = {}
+    for ticker in tickers:
+        error = reported.get(ticker)
+        if error is not None:
+            errors[ticker] = error if isinstance(error, BaseException) else Exception(str(error))
+        elif ticker not in frames:
+            errors[ticker] = Exception(f"No price data returned for {ticker}")
+    return errors
+
+
+def download_histories(tickers, start=None, period='1y'):
+    """
+    Download daily price history for many tickers in chunks.
+
+    The columns match Ticker.history() (adjusted OHLC, volume, dividends and
+    stock splits), and timestamps are returned in UTC since the chunk may mix
+    exchanges.
+
+    Args:
+        tickers (list): Ticker symbols
+        start (date): First date to download, None downloads the whole period
+        period (str): History period used when start is None
+
+    Returns:
+        dict: Ticker symbol to its OHLCV DataFrame; failed tickers are omitted
+    """
+    import yfinance as yf
+
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    frames = {}
+
+    for offset in range(0, len(tickers), BULK_HISTORY_CHUNK):
+        chunk = tickers[offset:offset + BULK_HISTORY_CHUNK]
+
+        try:
+            upstream_circuit.before_call()
+        except UpstreamThrottled as e:
+            # Leave the remaining tickers to the cache's stale data
+            logger.warning(f"Skipping bulk history download: {str(e)}")
+            break
+
+        # yfinance still requests every symbol separately
+        for _ in chunk:
+            upstream_limiter.acquire()
+
+        try:
+            with _download_lock:
+                data = yf.download(chunk, start=start, period=None if start else period,
+                                   group_by='ticker', actions=True, auto_adjust=True,
+                                   ignore_tz=False, threads=min(BULK_HISTORY_THREADS, len(chunk)),
+                                   progress=False, session=get_session(), multi_level_index=True)
+                chunk_frames = split_wide_frame(data, chunk)
+                errors = download_errors(yf, chunk, chunk_frames)
+            frames.update(chunk_frames)
+        except Exception as e:
+            logger.error(f"Error downloading history for {len(chunk)} tickers: {str(e)}")
+            record_upstream_result(e)
+            continue
+
+        # yf.download reports per-symbol failures instead of raising them; a chunk
+        # that failed entirely counts as a failed upstream call
+        throttled = [error for error in errors.values() if is_rate_limit_error(error)]
+        if throttled:
+            record_upstream_result(throttled[0])
+        elif errors and len(errors) == len(chunk):
+            record_upstream_result(next(iter(errors.values())))
+        else:
+            record_upstream_result(None)
+
+    logger.info(f"Downloaded history for {len(frames)} of {len(tickers)} tickers in bulk")
+    return frames
@@ -0,0 +1,472 @@
+"""
+Tiered Data Cache Module
+
+This module caches upstream Yahoo Finance responses in two tiers:
+1. An in-process LRU cache, so repeat lookups never leave the process
+2. A persistent store in the application database (CachedPayload), shared by
+   all gunicorn workers and kept across restarts; price history is persisted
+   in the local history store instead (see history_store)
+
+Each kind of data has its own time-to-live: quotes expire in seconds, annual
+statements in days. Price history is never re-downloaded in full once stored;
+when it expires only the bars after the last stored date are fetched. When
+stale-while-revalidate is enabled, an expired entry is returned immediately
+while a background thread refreshes it, unless it is older than
+CACHE_MAX_STALE_FACTOR times its TTL (e.g. after a restart), in which case the
+caller waits for the fetch. Concurrent misses for the same ticker and kind
+share one upstream fetch (see single_flight). Analyzed results precomputed by
+the universe refresher are cached the same way (kind 'result').
+
+Values are persisted as data-only JSON (serialization.encode_payload), never
+pickled, so a writer to the shared database cannot make workers run code.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from history_store import history_store
+from serialization import encode_payload, decode_payload
+from single_flight import SingleFlight
+from telemetry import cache_requests
+
+logger = logging.getLogger(__name__)
+
+# Time-to-live in seconds for each kind of upstream data
+CACHE_TTLS = {
+    'info': int(os.environ.get("CACHE_TTL_INFO", "60")),
+    'financials': int(os.environ.get("CACHE_TTL_STATEMENTS", str(3 * 24 * 3600))),
+    'balance_sheet': int(os.environ.get("CACHE_TTL_STATEMENTS", str(3 * 24 * 3600))),
+    'dividends': int(os.environ.get("CACHE_TTL_DIVIDENDS", str(24 * 3600))),
+    'history': int(os.environ.get("CACHE_TTL_HISTORY", "900")),
+    # Analyzed results precomputed by the universe refresher (0 disables reusing them)
+    'result': int(os.environ.get("CACHE_TTL_RESULT", "900")),
+}
+
+# Maximum number of entries held in the in-process LRU cache
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "4096"))
+
+# Serve expired entries immediately and refresh them in the background
+CACHE_STALE_WHILE_REVALIDATE = os.environ.get("CACHE_STALE_WHILE_REVALIDATE", "true").lower() in ("1", "true", "yes")
+
+# Oldest entry served while revalidating, as a multiple of its TTL; older entries are fetched first
+CACHE_MAX_STALE_FACTOR = float(os.environ.get("CACHE_MAX_STALE_FACTOR", "10"))
+
+# Length of the price history window served to callers
+HISTORY_WINDOW = timedelta(days=365)
+
+
+class CacheEntry:
+    """A cached value together with the time it was fetched."""
+
+    __slots__ = ('value', 'fetched_at')
+
+    def __init__(self, value, fetched_at):
+        self.value = value
+        self.fetched_at = fetched_at
+
+    def age(self):
+        return (datetime.utcnow() - self.fetched_at).total_seconds()
+
+
+class DataCache:
+    """Two-tier (memory + database) cache for upstream responses."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttls=None, stale_while_revalidate=CACHE_STALE_WHILE_REVALIDATE,
+                 max_stale_factor=CACHE_MAX_STALE_FACTOR):
+        self.max_entries = max_entries
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale_factor = max_stale_factor
+        self.app = None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.single_flight = SingleFlight()
+
+    def init_app(self, app):
+        """Enable the persistent tier using the application's database."""
+        self.app = app
+        self.single_flight.init_app(app)
+
+    # In-process tier
+
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # Persistent tier
+
+    def _db_get(self, ticker, kind):
+        if self.app is None:
+            return None
+
+        from models import CachedPayload
+
+        try:
+            with self.app.app_context():
+                row = CachedPayload.query.filter_by(ticker=ticker, kind=kind).first()
+                if row is None:
+                    return None
+                return CacheEntry(decode_payload(row.payload), row.fetched_at)
+        except ValueError:
+            logger.debug(f"Ignoring cached {kind} for {ticker} in an unreadable format")
+            return None
+        except Exception as e:
+            logger.error(f"Error reading cached {kind} for {ticker}: {str(e)}")
+            return None
+
+    def _db_put(self, ticker, kind, entry):
+        if self.app is None:
+            return
+
+        from models import db, CachedPayload
+
+        try:
+            with self.app.app_context():
+                payload = encode_payload(entry.value)
+                row = CachedPayload.query.filter_by(ticker=ticker, kind=kind).first()
+                if row is None:
+                    row = CachedPayload(ticker=ticker, kind=kind)
+                    db.session.add(row)
+                row.payload = payload
+                row.fetched_at = entry.fetched_at
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"Error storing cached {kind} for {ticker}: {str(e)}")
+
+    # Public API
+
+    def lookup(self, ticker, kind):
+        """
+        Find a cached entry in either tier, regardless of its age.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            kind (str): Kind of data (info, financials, balance_sheet, dividends, history)
+
+        Returns:
+            CacheEntry: The cached entry, or None if nothing is cached
+        """
+        key = (ticker.upper(), kind)
+        entry = self._memory_get(key)
+        if entry is None:
+            entry = self._db_get(*key)
+            if entry is not None:
+                self._memory_put(key, entry)
+        return entry
+
+    def store(self, ticker, kind, value):
+        """Store a freshly fetched value in both tiers."""
+        key = (ticker.upper(), kind)
+        entry = CacheEntry(value, datetime.utcnow())
+        self._memory_put(key, entry)
+        self._db_put(key[0], kind, entry)
+        return entry
+
+    def get_fresh_many(self, tickers, kind):
+        """
+        Find the fresh cached values of many tickers, reading the database once.
+
+        Nothing is fetched: tickers without a fresh entry are simply left out.
+
+        Args:
+            tickers (list): Stock ticker symbols
+            kind (str): Kind of data, selects the TTL
+
+        Returns:
+            dict: Upper-case ticker symbol to cached value
+        """
+        ttl = self.ttls.get(kind, 0)
+        if ttl <= 0:
+            return {}
+
+        unique = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        found = {}
+        missing = []
+        for ticker in unique:
+            entry = self._memory_get((ticker, kind))
+            if self.is_fresh(entry, kind):
+                found[ticker] = entry.value
+            else:
+                missing.append(ticker)
+
+        if missing and self.app is not None:
+            from models import CachedPayload
+
+            cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+            try:
+                with self.app.app_context():
+                    for start in range(0, len(missing), 500):
+                        rows = CachedPayload.query.filter(CachedPayload.kind == kind,
+                                                          CachedPayload.ticker.in_(missing[start:start + 500]),
+                                                          CachedPayload.fetched_at >= cutoff).all()
+                        for row in rows:
+                            try:
+                                entry = CacheEntry(decode_payload(row.payload), row.fetched_at)
+                            except ValueError:
+                                continue
+                            self._memory_put((row.ticker, kind), entry)
+                            found[row.ticker] = entry.value
+            except Exception as e:
+                logger.error(f"Error reading cached {kind} for {len(missing)} tickers: {str(e)}")
+
+        cache_requests.inc(kind, 'hit', amount=len(found))
+        cache_requests.inc(kind, 'miss', amount=len(unique) - len(found))
+        return found
+
+    def fetched_times(self, ticker, kinds):
+        """
+        Find when the cached data of a ticker was fetched, without loading it.
+
+        Used to validate HTTP responses before anything is fetched or serialized:
+        fresh entries in memory are trusted, the rest is read from one query on
+        the persistent tier (without decoding payloads) and from the history store.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            kinds (iterable): Kinds of data to look up
+
+        Returns:
+            dict: Kind to UTC fetch time, for the kinds that are cached
+        """
+        ticker = ticker.upper()
+        times = {}
+        missing = []
+        for kind in kinds:
+            entry = self._memory_get((ticker, kind))
+            if self.is_fresh(entry, kind):
+                times[kind] = entry.fetched_at
+            elif kind == 'history':
+                # Another worker may have extended the store since we last looked
+                updated_at = history_store.updated_at(ticker)
+                if updated_at is not None:
+                    times[kind] = updated_at
+            else:
+                missing.append(kind)
+
+        if missing and self.app is not None:
+            from models import db, CachedPayload
+
+            try:
+                with self.app.app_context():
+                    rows = (db.session.query(CachedPayload.kind, CachedPayload.fetched_at)
+                            .filter(CachedPayload.ticker == ticker, CachedPayload.kind.in_(missing)).all())
+                    times.update((kind, fetched_at) for kind, fetched_at in rows)
+            except Exception as e:
+                logger.error(f"Error reading cache times for {ticker}: {str(e)}")
+        return times
+
+    def is_fresh(self, entry, kind):
+        return entry is not None and entry.age() < self.ttls.get(kind, 0)
+
+    def can_serve_stale(self, entry, kind):
+        """Whether an expired entry may be served while it is revalidated in the background."""
+        return (self.stale_while_revalidate and entry is not None
+                and entry.age() < self.ttls.get(kind, 0) * self.max_stale_factor)
+
+    def get(self, ticker, kind, loader):
+        """
+        Get a value from the cache, calling the loader on a miss.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            kind (str): Kind of data, selects the TTL
+            loader (callable): Function fetching the value from upstream
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        entry = self.lookup(ticker, kind)
+        if self.is_fresh(entry, kind):
+            logger.debug(f"Cache hit for {ticker} {kind}")
+            cache_requests.inc(kind, 'hit')
+            return entry.value
+
+        if self.can_serve_stale(entry, kind):
+            logger.debug(f"Serving stale {kind} for {ticker} while revalidating")
+            cache_requests.inc(kind, 'stale')
+            self._revalidate(ticker, kind, loader)
+            return entry.value
+
+        logger.debug(f"Cache miss for {ticker} {kind}")
+        cache_requests.inc(kind, 'miss')
+        try:
+            return self._fetch(ticker, kind, loader)
+        except Exception:
+            if entry is not None:
+                logger.warning(f"Upstream error for {ticker} {kind}, serving stale data")
+                return entry.value
+            raise
+
+    def get_history(self, ticker, full_loader, since_loader):
+        """
+        Get the last year of daily price history from the local history store.
+
+        Only the bars after the last stored date are downloaded; a full year is
+        fetched the first time a ticker is seen.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            full_loader (callable): Function fetching a full year of history
+            since_loader (callable): Function taking a start date and fetching bars from that date on
+
+        Returns:
+            pd.DataFrame: Historical OHLCV data
+        """
+        key = (ticker.upper(), 'history')
+        entry = self._memory_get(key)
+        if entry is None:
+            # Another worker may have extended the store since we last looked
+            updated_at = history_store.updated_at(ticker)
+            if updated_at is not None:
+                entry = CacheEntry(self._read_history_window(ticker), updated_at)
+                self._memory_put(key, entry)
+
+        if self.is_fresh(entry, 'history'):
+            logger.debug(f"Cache hit for {ticker} history")
+            cache_requests.inc('history', 'hit')
+            return entry.value
+
+        if entry is None or entry.value is None or entry.value.empty:
+            cache_requests.inc('history', 'miss')
+            return self._fetch_history(ticker, full_loader, since_loader)
+
+        cache_requests.inc('history', 'stale')
+        if self.can_serve_stale(entry, 'history'):
+            self._revalidate(ticker, 'history', lambda: self._fetch_history(ticker, full_loader, since_loader))
+            return entry.value
+
+        try:
+            return self._fetch_history(ticker, full_loader, since_loader)
+        except Exception as e:
+            logger.warning(f"Error extending history for {ticker}, serving stored bars: {str(e)}")
+            return entry.value
+
+    def _fetch(self, ticker, kind, loader):
+        """Load a value upstream and store it, sharing the fetch with concurrent callers."""
+        def reload():
+            entry = self._db_get(ticker.upper(), kind)
+            if not self.is_fresh(entry, kind):
+                return None
+            self._memory_put((ticker.upper(), kind), entry)
+            return entry.value
+
+        return self.single_flight.do((ticker.upper(), kind),
+                                     lambda: self.store(ticker, kind, loader()).value, reload)
+
+    def prefetch_histories(self, tickers, bulk_loader):
+        """
+        Bring the stored price history of many tickers up to date in bulk.
+
+        Tickers whose history is still fresh are skipped. The rest are grouped
+        by the date of their last stored bar, so each group is downloaded with
+        one bulk call; later get_history calls are then served from the cache.
+        Tickers the bulk loader could not fetch are left to get_history.
+
+        Args:
+            tickers (list): Stock ticker symbols
+            bulk_loader (callable): Function taking (tickers, start) and returning
+                a dict of ticker to DataFrame; start is None for a full year
+        """
+        groups = {}
+        for ticker in dict.fromkeys(ticker.upper() for ticker in tickers):
+            entry = self._memory_get((ticker, 'history'))
+            updated_at = entry.fetched_at if entry is not None else history_store.updated_at(ticker)
+            if updated_at is not None and self.is_fresh(CacheEntry(None, updated_at), 'history'):
+                continue
+
+            last_date = history_store.last_date(ticker)
+            groups.setdefault(None if last_date is None else last_date.date(), []).append(ticker)
+
+        for start, group in groups.items():
+            try:
+                frames = bulk_loader(group, start)
+            except Exception as e:
+                logger.error(f"Error prefetching history for {len(group)} tickers: {str(e)}")
+                continue
+
+            for ticker, bars in frames.items():
+                history_store.append(ticker, bars)
+                history = self._read_history_window(ticker)
+                if history is not None:
+                    self._memory_put((ticker, 'history'), CacheEntry(history, datetime.utcnow()))
+
+    def _read_history_window(self, ticker):
+        last_date = history_store.last_date(ticker)
+        if last_date is None:
+            return None
+        return history_store.read(ticker, start=last_date - HISTORY_WINDOW)
+
+    def _fetch_history(self, ticker, full_loader, since_loader):
+        """Extend the stored history, sharing the download with concurrent callers."""
+        def reload():
+            updated_at = history_store.updated_at(ticker)
+            if updated_at is None or not self.is_fresh(CacheEntry(None, updated_at), 'history'):
+                return None
+            history = self._read_history_window(ticker)
+            if history is not None:
+                self._memory_put((ticker.upper(), 'history'), CacheEntry(history, updated_at))
+            return history
+
+        return self.single_flight.do((ticker.upper(), 'history'),
+                                     lambda: self._extend_history(ticker, full_loader, since_loader), reload)
+
+    def _extend_history(self, ticker, full_loader, since_loader):
+        """Download missing bars into the history store and cache the served window."""
+        last_date = history_store.last_date(ticker)
+        if last_date is None:
+            new_bars = full_loader()
+        else:
+            new_bars = since_loader(last_date.date())
+
+        history_store.append(ticker, new_bars)
+        history = self._read_history_window(ticker)
+        if history is None:
+            # Nothing could be stored (e.g. an empty upstream response)
+            history = new_bars
+
+        self._memory_put((ticker.upper(), 'history'), CacheEntry(history, datetime.utcnow()))
+        return history
+
+    def _revalidate(self, ticker, kind, loader):
+        key = (ticker.upper(), kind)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                if kind == 'history':
+                    loader()
+                else:
+                    self._fetch(ticker, kind, loader)
+            except Exception as e:
+                logger.error(f"Error refreshing {kind} for {ticker}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"cache-refresh-{key[0]}-{kind}", daemon=True).start()
+
+    def clear(self):
+        """Drop every entry from the in-process tier."""
+        with self._lock:
+            self._memory.clear()
+
+
+# Process-wide cache shared by all request threads
+data_cache = DataCache()
@@ -0,0 +1,347 @@
+"""
+Market Data Providers Module
+
+This module decouples fetch_financial_data from yfinance. A provider hands out
+ticker objects with the same surface as yf.Ticker (info, financials,
+balance_sheet, dividends and history()), and there are three implementations:
+
+1. LiveProvider: Yahoo Finance through yfinance on the shared HTTP session
+2. RecordingProvider: wraps another provider and snapshots every raw response
+   to a compressed file per ticker and kind
+3. ReplayProvider: serves recorded snapshots from memory-mapped files without
+   any network access, for deterministic benchmarks and load tests
+
+Snapshots are gzip-compressed JSON, so they stay readable across pandas
+versions. The bundled snapshots in snapshots/sample replace the hard-coded
+sample data used when Yahoo Finance rate limits us.
+
+The provider is selected with DATA_PROVIDER (live, record or replay) and
+DATA_SNAPSHOT_DIR.
+"""
+
+import os
+import re
+import json
+import mmap
+import zlib
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Provider used for all market data: live, record or replay
+DATA_PROVIDER = os.environ.get("DATA_PROVIDER", "live").lower()
+
+# Directory snapshots are recorded to and replayed from
+DATA_SNAPSHOT_DIR = os.environ.get(
+    "DATA_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "snapshots"),
+)
+
+# Bundled snapshots served when Yahoo Finance rate limits us
+SAMPLE_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots", "sample")
+
+SNAPSHOT_SUFFIX = ".json.gz"
+
+
+class SnapshotMissing(LookupError):
+    """Raised by the replay provider when a response was never recorded."""
+
+
+# Snapshot encoding
+
+def _encode_index(index):
+    if isinstance(index, pd.DatetimeIndex):
+        tz = str(index.tz) if index.tz is not None else None
+        naive = index.tz_convert('UTC').tz_localize(None) if tz else index
+        return {'datetime': naive.asi8.tolist(), 'tz': tz, 'name': index.name}
+    return {'labels': [label.isoformat() if isinstance(label, pd.Timestamp) else label for label in index],
+            'name': index.name}
+
+
+def _decode_index(encoded):
+    if 'datetime' in encoded:
+        index = pd.DatetimeIndex(np.asarray(encoded['datetime'], dtype=np.int64).view('datetime64[ns]'),
+                                 name=encoded.get('name'))
+        return index.tz_localize('UTC').tz_convert(encoded['tz']) if encoded['tz'] else index
+    return pd.Index(encoded['labels'], name=encoded.get('name'))
+
+
+def _encode_values(values):
+    return [None if value is None or (isinstance(value, float) and value != value) else value
+            for value in pd.Series(values, dtype=object).tolist()]
+
+
+def _decode_values(values, dtype):
+    if dtype.startswith(('float', 'int', 'bool')):
+        try:
+            array = np.array(values, dtype=np.float64)
+            return array if dtype.startswith('float') or np.isnan(array).any() else array.astype(dtype)
+        except (TypeError, ValueError):
+            pass
+    return np.array(values, dtype=object)
+
+
+def encode_snapshot(value):
+    """Encode a raw provider response (dict, DataFrame or Series) as JSON-compatible data."""
+    if isinstance(value, pd.DataFrame):
+        return {
+            '__frame__': True,
+            'index': _encode_index(value.index),
+            'columns': _encode_index(value.columns),
+            'data': [_encode_values(value.iloc[:, i]) for i in range(value.shape[1])],
+            'dtypes': [str(dtype) for dtype in value.dtypes],
+        }
+    if isinstance(value, pd.Series):
+        return {
+            '__series__': True,
+            'name': value.name,
+            'index': _encode_index(value.index),
+            'data': _encode_values(value),
+            'dtype': str(value.dtype),
+        }
+    return value
+
+
+def decode_snapshot(value):
+    """Rebuild a raw provider response from encode_snapshot output."""
+    if isinstance(value, dict) and value.get('__frame__'):
+        index = _decode_index(value['index'])
+        columns = _decode_index(value['columns'])
+        frame = pd.DataFrame({i: _decode_values(column, dtype)
+                              for i, (column, dtype) in enumerate(zip(value['data'], value['dtypes']))},
+                             index=index)
+        frame.columns = columns
+        return frame
+    if isinstance(value, dict) and value.get('__series__'):
+        return pd.Series(_decode_values(value['data'], value['dtype']), index=_decode_index(value['index']),
+                         name=value['name'])
+    return value
+
+
+def _snapshot_path(directory, ticker, kind):
+    name = re.sub(r'[^A-Z0-9._-]', '_', ticker.upper())
+    return os.path.join(directory, name, kind + SNAPSHOT_SUFFIX)
+
+
+def write_snapshot(directory, ticker, kind, value):
+    """Write one raw response to a compressed snapshot file (atomically)."""
+    path = _snapshot_path(directory, ticker, kind)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = json.dumps(encode_snapshot(value), default=str).encode('utf-8')
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # gzip container
+    data = compressor.compress(payload) + compressor.flush()
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(directory, ticker, kind):
+    """Read one raw response from its memory-mapped snapshot file."""
+    path = _snapshot_path(directory, ticker, kind)
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            payload = zlib.decompress(mapped, 31)
+    except (FileNotFoundError, ValueError):
+        raise SnapshotMissing(f"No {kind} snapshot recorded for {ticker.upper()}")
+    return decode_snapshot(json.loads(payload))
+
+
+def _history_since(history, start):
+    if history is None or history.empty or start is None:
+        return history
+    return history[history.index.date >= pd.Timestamp(start).date()]
+
+
+# Providers
+
+class DataProvider:
+    """Base class for market data providers."""
+
+    name = 'base'
+
+    # Whether calls reach the network (and so go through the rate limiter)
+    remote = False
+
+    # Whether bulk_history may download history for many tickers at once
+    supports_bulk = False
+
+    def ticker(self, ticker):
+        """
+        Get an object exposing the raw responses for one ticker.
+
+        Args:
+            ticker (str): Stock ticker symbol
+
+        Returns:
+            object: Ticker with info, financials, balance_sheet, dividends and history()
+        """
+        raise NotImplementedError
+
+
+class LiveProvider(DataProvider):
+    """Yahoo Finance through yfinance."""
+
+    name = 'live'
+    remote = True
+    supports_bulk = True
+
+    def ticker(self, ticker):
+        import yfinance as yf
+        from http_session import get_session
+
+        # The shared, pooled session reuses connections and the Yahoo cookie/crumb
+        return yf.Ticker(ticker, session=get_session())
+
+
+class _RecordingTicker:
+    def __init__(self, provider, ticker, inner):
+        self._provider = provider
+        self._ticker = ticker
+        self._inner = inner
+
+    def _record(self, kind, value):
+        try:
+            self._provider.save(self._ticker, kind, value)
+        except Exception as e:
+            logger.error(f"Error recording {kind} snapshot for {self._ticker}: {str(e)}")
+        return value
+
+    @property
+    def info(self):
+        return self._record('info', self._inner.info)
+
+    @property
+    def financials(self):
+        return self._record('financials', self._inner.financials)
+
+    @property
+    def balance_sheet(self):
+        return self._record('balance_sheet', self._inner.balance_sheet)
+
+    @property
+    def dividends(self):
+        return self._record('dividends', self._inner.dividends)
+
+    def history(self, **kwargs):
+        bars = self._inner.history(**kwargs)
+        if kwargs.get('start') is not None:
+            # Keep one continuous recording so replayed incremental requests see the same bars
+            try:
+                recorded = read_snapshot(self._provider.directory, self._ticker, 'history')
+                merged = pd.concat([recorded, bars])
+                self._record('history', merged[~merged.index.duplicated(keep='last')].sort_index())
+                return bars
+            except SnapshotMissing:
+                pass
+        return self._record('history', bars)
+
+
+class RecordingProvider(DataProvider):
+    """Wraps another provider and snapshots every raw response it returns."""
+
+    name = 'record'
+
+    def __init__(self, inner=None, directory=DATA_SNAPSHOT_DIR):
+        self.inner = inner or LiveProvider()
+        self.directory = directory
+        self.remote = self.inner.remote
+
+    def save(self, ticker, kind, value):
+        write_snapshot(self.directory, ticker, kind, value)
+
+    def ticker(self, ticker):
+        return _RecordingTicker(self, ticker.upper(), self.inner.ticker(ticker))
+
+
+class _ReplayTicker:
+    def __init__(self, provider, ticker):
+        self._provider = provider
+        self._ticker = ticker
+
+    @property
+    def info(self):
+        return self._provider.load(self._ticker, 'info')
+
+    @property
+    def financials(self):
+        return self._provider.load(self._ticker, 'financials')
+
+    @property
+    def balance_sheet(self):
+        return self._provider.load(self._ticker, 'balance_sheet')
+
+    @property
+    def dividends(self):
+        return self._provider.load(self._ticker, 'dividends')
+
+    def history(self, period=None, start=None, **kwargs):
+        return _history_since(self._provider.load(self._ticker, 'history'), start)
+
+
+class ReplayProvider(DataProvider):
+    """Serves recorded snapshots without network access."""
+
+    name = 'replay'
+
+    def __init__(self, directory=DATA_SNAPSHOT_DIR):
+        self.directory = directory
+        self._decoded = {}
+        self._lock = threading.Lock()
+
+    def has(self, ticker):
+        """Check whether any snapshot was recorded for a ticker."""
+        return os.path.exists(_snapshot_path(self.directory, ticker, 'info'))
+
+    def tickers(self):
+        """List the tickers with recorded snapshots."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.exists(os.path.join(self.directory, name, 'info' + SNAPSHOT_SUFFIX)))
+
+    def load(self, ticker, kind):
+        """Get a recorded response, decoding each snapshot file only once."""
+        key = (ticker.upper(), kind)
+        with self._lock:
+            if key in self._decoded:
+                return self._decoded[key]
+
+        value = read_snapshot(self.directory, ticker, kind)
+        with self._lock:
+            self._decoded[key] = value
+        return value
+
+    def ticker(self, ticker):
+        return _ReplayTicker(self, ticker.upper())
+
+
+def create_provider(name=DATA_PROVIDER, directory=DATA_SNAPSHOT_DIR):
+    """
+    Create a provider by name.
+
+    Args:
+        name (str): live, record or replay
+        directory (str): Snapshot directory for the record and replay providers
+
+    Returns:
+        DataProvider: The provider
+    """
+    if name == 'record':
+        return RecordingProvider(LiveProvider(), directory)
+    if name == 'replay':
+        return ReplayProvider(directory)
+    if name != 'live':
+        logger.warning(f"Unknown data provider '{name}', using live data")
+    return LiveProvider()
+
+
+# Process-wide provider for market data, and the bundled rate-limit fallback
+data_provider = create_provider()
+sample_provider = ReplayProvider(SAMPLE_SNAPSHOT_DIR)
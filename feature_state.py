@@ -0,0 +1,645 @@
+"""
+Incremental Feature Module
+
+This module maintains the create_features columns of a ticker incrementally.
+Instead of recomputing every pct_change and rolling window over the full
+history, a FeatureState keeps ring buffers of the last bars and running sums,
+so each new daily bar is folded in in constant time:
+
+1. Returns (1, 5, 10 and 20 days) and the volume change come from a ring
+   buffer of forward-filled closes and volumes, as pct_change computes them
+2. Moving averages keep Kahan-compensated running sums and the volatility
+   windows Welford's running variance, ported from the pandas rolling
+   kernels (including their guards for runs of identical values), so the
+   results are those of rolling().mean() and rolling().std()
+3. Price relationships and the dropna() of create_features are applied to
+   each new row, and the last FEATURE_STATE_ROWS rows are kept, so the
+   feature frame of a training window is available without recomputing it
+
+A state fed the bars of a frame produces exactly the rows create_features
+returns for that frame. When a state is continued over a sliding window (the
+last N bars of a history), its running sums still include the bars before the
+window, while create_features of the window starts them afresh, so the rows
+match only up to floating-point rounding: within a relative 1e-12, or 1e-14
+absolute for values near zero such as the volatilities. A state seeded from an existing create_features frame
+(FeatureState.seed) takes that frame's rows and only replays the last bars
+the rolling windows need, so building a state costs one vectorized
+create_features call. States are kept next to the price history in the
+history store, so they survive restarts and are shared by the workers;
+FeatureStore.features() only feeds the bars a state has not seen yet.
+"""
+
+import os
+import math
+import logging
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from history_store import history_store
+
+logger = logging.getLogger(__name__)
+
+# Serve prediction features from incremental states instead of recomputing them
+INCREMENTAL_FEATURES = os.environ.get("INCREMENTAL_FEATURES", "true").lower() in ("1", "true", "yes")
+
+# Maximum number of feature states kept in memory
+FEATURE_STATE_CACHE_SIZE = int(os.environ.get("FEATURE_STATE_CACHE_SIZE", "1024"))
+
+# Number of feature rows kept per state; training windows with more rows fall back to create_features
+FEATURE_STATE_ROWS = int(os.environ.get("FEATURE_STATE_ROWS", "256"))
+
+# Bars folded into a state before it is written back; other workers catch up on the rest
+FEATURE_STATE_SAVE_BARS = int(os.environ.get("FEATURE_STATE_SAVE_BARS", "5"))
+
+# Name of the state file kept next to each ticker's history
+STATE_NAME = 'features'
+
+# Bump when the layout of serialized states changes; older states are rebuilt
+STATE_VERSION = 2
+
+RETURN_PERIODS = (1, 5, 10, 20)
+PRICE_WINDOWS = (5, 10, 20, 50)
+VOLATILITY_WINDOWS = (5, 10, 20)
+VOLUME_WINDOWS = (5, 10)
+
+# Leading bars of a frame without a complete create_features row
+WARMUP_BARS = max(max(PRICE_WINDOWS) - 1, max(RETURN_PERIODS), max(VOLATILITY_WINDOWS), max(VOLUME_WINDOWS) - 1)
+
+NAN = float('nan')
+
+
+def _divide(a, b):
+    # IEEE division as NumPy does it: x/0 is +-inf and 0/0 is NaN instead of an error
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != a or a == 0:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+class RollingMean:
+    """Fixed-window mean with the Kahan-compensated running sum of pandas' roll_mean."""
+
+    __slots__ = ('window', 'values', 'nobs', 'sum', 'neg_count',
+                 'add_compensation', 'remove_compensation', 'same_count', 'prev_value')
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.nobs = 0
+        self.sum = 0.0
+        self.neg_count = 0
+        self.add_compensation = 0.0
+        self.remove_compensation = 0.0
+        self.same_count = 0
+        self.prev_value = NAN
+
+    def _add(self, value):
+        if value != value:
+            return
+        self.nobs += 1
+        y = value - self.add_compensation
+        t = self.sum + y
+        self.add_compensation = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_count += 1
+        # Runs of identical values return the value itself, without rounding artifacts
+        if value == self.prev_value:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        self.prev_value = value
+
+    def _remove(self, value):
+        if value != value:
+            return
+        self.nobs -= 1
+        y = -value - self.remove_compensation
+        t = self.sum + y
+        self.remove_compensation = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_count -= 1
+
+    def update(self, value):
+        """Add the newest value and return the mean of the window (NaN until it is full)."""
+        if len(self.values) == self.window:
+            self._remove(self.values[0])
+        self.values.append(value)
+        self._add(value)
+
+        if self.nobs < self.window or self.nobs == 0:
+            return NAN
+        result = self.sum / self.nobs
+        if self.same_count >= self.nobs:
+            return self.prev_value
+        if self.neg_count == 0 and result < 0:
+            return 0.0
+        if self.neg_count == self.nobs and result > 0:
+            return 0.0
+        return result
+
+    @classmethod
+    def from_values(cls, window, values):
+        """Build the window holding the last values of a series (the earlier ones only affect rounding)."""
+        rolling = cls(window)
+        for value in values[-window:]:
+            rolling.values.append(value)
+            rolling._add(value)
+        return rolling
+
+    def to_dict(self):
+        return {'values': list(self.values), 'nobs': self.nobs, 'sum': self.sum, 'neg_count': self.neg_count,
+                'add_compensation': self.add_compensation, 'remove_compensation': self.remove_compensation,
+                'same_count': self.same_count, 'prev_value': self.prev_value}
+
+    @classmethod
+    def from_dict(cls, window, state):
+        rolling = cls(window)
+        rolling.values.extend(state['values'])
+        for name in ('nobs', 'sum', 'neg_count', 'add_compensation', 'remove_compensation',
+                     'same_count', 'prev_value'):
+            setattr(rolling, name, state[name])
+        return rolling
+
+
+class RollingStd:
+    """Fixed-window sample standard deviation with the Welford update of pandas' roll_var."""
+
+    __slots__ = ('window', 'values', 'nobs', 'mean', 'ssqdm',
+                 'add_compensation', 'remove_compensation', 'same_count', 'prev_value')
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.add_compensation = 0.0
+        self.remove_compensation = 0.0
+        self.same_count = 0
+        self.prev_value = NAN
+
+    def _add(self, value):
+        if value != value:
+            return
+        self.nobs += 1
+        if value == self.prev_value:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        self.prev_value = value
+
+        prev_mean = self.mean - self.add_compensation
+        y = value - self.add_compensation
+        t = y - self.mean
+        self.add_compensation = t + self.mean - y
+        self.mean = self.mean + t / self.nobs
+        self.ssqdm = self.ssqdm + (value - prev_mean) * (value - self.mean)
+
+    def _remove(self, value):
+        if value != value:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean - self.remove_compensation
+            y = value - self.remove_compensation
+            t = y - self.mean
+            self.remove_compensation = t + self.mean - y
+            self.mean = self.mean - t / self.nobs
+            self.ssqdm = self.ssqdm - (value - prev_mean) * (value - self.mean)
+        else:
+            self.mean = 0.0
+            self.ssqdm = 0.0
+
+    def update(self, value):
+        """Add the newest value and return the standard deviation of the window (NaN until it is full)."""
+        if len(self.values) == self.window:
+            self._remove(self.values[0])
+        self.values.append(value)
+        self._add(value)
+
+        if self.nobs < self.window or self.nobs <= 1:
+            return NAN
+        if self.same_count >= self.nobs:
+            return 0.0
+        variance = self.ssqdm / (self.nobs - 1)
+        return math.sqrt(variance) if variance >= 0 else 0.0
+
+    @classmethod
+    def from_values(cls, window, values):
+        """Build the window holding the last values of a series (the earlier ones only affect rounding)."""
+        rolling = cls(window)
+        for value in values[-window:]:
+            rolling.values.append(value)
+            rolling._add(value)
+        return rolling
+
+    def to_dict(self):
+        return {'values': list(self.values), 'nobs': self.nobs, 'mean': self.mean, 'ssqdm': self.ssqdm,
+                'add_compensation': self.add_compensation, 'remove_compensation': self.remove_compensation,
+                'same_count': self.same_count, 'prev_value': self.prev_value}
+
+    @classmethod
+    def from_dict(cls, window, state):
+        rolling = cls(window)
+        rolling.values.extend(state['values'])
+        for name in ('nobs', 'mean', 'ssqdm', 'add_compensation', 'remove_compensation',
+                     'same_count', 'prev_value'):
+            setattr(rolling, name, state[name])
+        return rolling
+
+
+class Lagged:
+    """Ring buffer of forward-filled values for pct_change over several periods."""
+
+    __slots__ = ('values', 'last_valid')
+
+    def __init__(self, max_period):
+        self.values = deque(maxlen=max_period + 1)
+        self.last_valid = NAN
+
+    def update(self, value):
+        # pct_change pads missing values with the previous valid one
+        if value == value:
+            self.last_valid = value
+        self.values.append(self.last_valid)
+
+    def pct_change(self, period):
+        if len(self.values) <= period:
+            return NAN
+        return _divide(self.values[-1], self.values[-1 - period]) - 1
+
+    @classmethod
+    def from_values(cls, max_period, values):
+        """Build the buffer holding the last values of a series."""
+        lagged = cls(max_period)
+        for value in values[-(max_period + 1):]:
+            lagged.update(value)
+        return lagged
+
+    def to_dict(self):
+        return {'values': list(self.values), 'last_valid': self.last_valid}
+
+    @classmethod
+    def from_dict(cls, max_period, state):
+        lagged = cls(max_period)
+        lagged.values.extend(state['values'])
+        lagged.last_valid = state['last_valid']
+        return lagged
+
+
+class FeatureState:
+    """
+    Incremental create_features state of one price history.
+
+    Args:
+        columns (list): Columns of the history frame, in order
+        max_rows (int): Number of create_features rows kept
+    """
+
+    def __init__(self, columns, max_rows=FEATURE_STATE_ROWS):
+        self.columns = list(columns)
+        self.has_volume = 'Volume' in self.columns
+        self.close = Lagged(max(RETURN_PERIODS))
+        self.price_means = {window: RollingMean(window) for window in PRICE_WINDOWS}
+        self.volatility = {window: RollingStd(window) for window in VOLATILITY_WINDOWS}
+        self.volume = Lagged(1)
+        self.volume_means = {window: RollingMean(window) for window in VOLUME_WINDOWS}
+        self.bars = 0
+        # Bars seen when the state was last written to (or read from) the store
+        self.saved_bars = 0
+        self.last_timestamp = None
+        self.last_bar = None
+        # Ring buffer of the kept rows and their times as int64 nanoseconds (pd.Timestamp.value)
+        self.max_rows = max_rows
+        self._row_times = np.zeros(max_rows, dtype=np.int64)
+        self._rows = np.zeros((max_rows, len(self.columns) + len(self.feature_columns)))
+        self._row_count = 0
+        self._row_next = 0
+
+    @property
+    def feature_columns(self):
+        """Columns added by create_features, in its order."""
+        columns = [f'return_{period}d' for period in RETURN_PERIODS]
+        columns += [f'ma{window}' for window in PRICE_WINDOWS]
+        columns += [f'volatility_{window}d' for window in VOLATILITY_WINDOWS]
+        columns += [f'close_to_ma{window}' for window in PRICE_WINDOWS]
+        if self.has_volume:
+            columns += [f'volume_ma{window}' for window in VOLUME_WINDOWS] + ['volume_change']
+        return columns
+
+    def update(self, timestamp, bar):
+        """
+        Fold one new bar into the state in constant time.
+
+        Args:
+            timestamp (pd.Timestamp): Time of the bar, after every bar seen so far
+            bar (list): Values of the bar, one per column
+
+        Returns:
+            list: The create_features row of the bar (columns followed by
+                feature_columns), or None if create_features would drop it
+        """
+        bar = [float(value) for value in bar]
+        row = dict(zip(self.columns, bar))
+        close = row['Close']
+
+        self.close.update(close)
+        features = [self.close.pct_change(period) for period in RETURN_PERIODS]
+        means = [self.price_means[window].update(close) for window in PRICE_WINDOWS]
+        features += means
+        features += [self.volatility[window].update(features[0]) for window in VOLATILITY_WINDOWS]
+        features += [_divide(close, mean) for mean in means]
+
+        if self.has_volume:
+            volume = row['Volume']
+            self.volume.update(volume)
+            features += [self.volume_means[window].update(volume) for window in VOLUME_WINDOWS]
+            features.append(self.volume.pct_change(1))
+
+        self.bars += 1
+        self.last_timestamp = timestamp
+        self.last_bar = bar
+
+        values = bar + features
+        if any(value != value for value in values):
+            return None
+        self._keep_row(timestamp.value, values)
+        return values
+
+    def _keep_row(self, time, values):
+        self._row_times[self._row_next] = time
+        self._rows[self._row_next] = values
+        self._row_next = (self._row_next + 1) % self.max_rows
+        self._row_count = min(self._row_count + 1, self.max_rows)
+
+    def kept_rows(self):
+        """Get copies of the kept row times (int64 nanoseconds) and rows, oldest first."""
+        if self._row_count < self.max_rows:
+            return self._row_times[:self._row_count].copy(), self._rows[:self._row_count].copy()
+        return np.roll(self._row_times, -self._row_next), np.roll(self._rows, -self._row_next, axis=0)
+
+    def _set_rows(self, times, rows):
+        times = np.asarray(times, dtype=np.int64)[-self.max_rows:]
+        rows = np.asarray(rows, dtype=np.float64).reshape(len(times), -1)[-self.max_rows:]
+        self._row_times[:len(times)] = times
+        self._rows[:len(times)] = rows
+        self._row_count = len(times)
+        self._row_next = len(times) % self.max_rows
+
+    def feed(self, data):
+        """Fold every bar of a frame (with the state's columns) into the state."""
+        values = data[self.columns].to_numpy(dtype=np.float64)
+        for timestamp, bar in zip(data.index, values.tolist()):
+            self.update(timestamp, bar)
+        return self
+
+    @classmethod
+    def from_frame(cls, data, max_rows=FEATURE_STATE_ROWS):
+        """Build the state of a price history by replaying all of its bars."""
+        return cls(data.columns, max_rows).feed(data)
+
+    @classmethod
+    def seed(cls, data, features, max_rows=FEATURE_STATE_ROWS):
+        """
+        Build the state of a price history from its create_features frame.
+
+        The rows are taken from features and the rolling windows are filled
+        with the last values of data, so the rows the state adds later match
+        create_features up to floating-point rounding.
+
+        Args:
+            data (pd.DataFrame): Historical OHLCV data, oldest bar first
+            features (pd.DataFrame): create_features(data)
+            max_rows (int): Number of create_features rows kept
+
+        Returns:
+            FeatureState: The state after the last bar of data
+        """
+        state = cls(data.columns, max_rows)
+        if list(features.columns) != state.columns + state.feature_columns:
+            raise ValueError("features do not have the create_features columns of data")
+
+        values = data.iloc[-(WARMUP_BARS + 1):].to_numpy(dtype=np.float64)
+        closes = values[:, state.columns.index('Close')]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = closes[1:] / closes[:-1] - 1
+        closes, returns = closes.tolist(), returns.tolist()
+        state.close = Lagged.from_values(max(RETURN_PERIODS), closes)
+        state.price_means = {window: RollingMean.from_values(window, closes) for window in PRICE_WINDOWS}
+        state.volatility = {window: RollingStd.from_values(window, returns) for window in VOLATILITY_WINDOWS}
+        if state.has_volume:
+            volumes = values[:, state.columns.index('Volume')].tolist()
+            state.volume = Lagged.from_values(1, volumes)
+            state.volume_means = {window: RollingMean.from_values(window, volumes) for window in VOLUME_WINDOWS}
+        state.bars = len(data)
+        state.last_timestamp = data.index[-1]
+        state.last_bar = values[-1].tolist()
+
+        kept = features.iloc[-max_rows:]
+        state._set_rows(kept.index.as_unit('ns').asi8, kept.to_numpy(dtype=np.float64))
+        return state
+
+    def frame(self, index):
+        """
+        Get the kept rows at the times of a history's complete bars as a create_features frame.
+
+        Args:
+            index (pd.DatetimeIndex): Times of the bars from the first one with a complete row
+
+        Returns:
+            pd.DataFrame: The rows at or after index[0], or None if the state does not keep them all
+        """
+        times, rows = self.kept_rows()
+        if not len(times) or times[0] > index[0].value:
+            return None
+
+        import pandas as pd
+
+        position = times.searchsorted(index[0].value)
+        times, rows = times[position:], rows[position:]
+        # Rows are only missing for bars with missing values, as create_features drops them
+        if len(times) != len(index):
+            tz = index.tz
+            index = pd.DatetimeIndex(times.view('datetime64[ns]'), name=index.name)
+            if tz is not None:
+                index = index.tz_localize('UTC').tz_convert(tz)
+        return pd.DataFrame(rows, index=index, columns=self.columns + self.feature_columns)
+
+    def to_dict(self):
+        """Serialize the state as JSON-compatible data and the kept rows as arrays."""
+        row_times, rows = self.kept_rows()
+        return {
+            'version': STATE_VERSION,
+            'columns': self.columns,
+            'max_rows': self.max_rows,
+            'bars': self.bars,
+            'last_timestamp': self.last_timestamp.isoformat() if self.last_timestamp is not None else None,
+            'last_bar': self.last_bar,
+            'row_times': row_times,
+            'rows': rows,
+            'close': self.close.to_dict(),
+            'price_means': {str(window): rolling.to_dict() for window, rolling in self.price_means.items()},
+            'volatility': {str(window): rolling.to_dict() for window, rolling in self.volatility.items()},
+            'volume': self.volume.to_dict(),
+            'volume_means': {str(window): rolling.to_dict() for window, rolling in self.volume_means.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restore a state serialized with to_dict, or return None if it has an older layout."""
+        if state.get('version') != STATE_VERSION:
+            return None
+
+        import pandas as pd
+
+        feature_state = cls(state['columns'], state['max_rows'])
+        feature_state.bars = feature_state.saved_bars = state['bars']
+        feature_state.last_bar = state['last_bar']
+        if state['last_timestamp'] is not None:
+            feature_state.last_timestamp = pd.Timestamp(state['last_timestamp'])
+        feature_state._set_rows(state['row_times'], state['rows'])
+        feature_state.close = Lagged.from_dict(max(RETURN_PERIODS), state['close'])
+        feature_state.price_means = {window: RollingMean.from_dict(window, state['price_means'][str(window)])
+                                     for window in PRICE_WINDOWS}
+        feature_state.volatility = {window: RollingStd.from_dict(window, state['volatility'][str(window)])
+                                    for window in VOLATILITY_WINDOWS}
+        feature_state.volume = Lagged.from_dict(1, state['volume'])
+        feature_state.volume_means = {window: RollingMean.from_dict(window, state['volume_means'][str(window)])
+                                      for window in VOLUME_WINDOWS}
+        return feature_state
+
+
+def _same_bar(a, b):
+    return len(a) == len(b) and all(x == y or (x != x and y != y) for x, y in zip(a, b))
+
+
+def _is_complete(data):
+    # create_features of a window drops leading rows beyond WARMUP_BARS when closes or
+    # volumes are missing, which the rows of a longer-running state do not reflect
+    if len(data) <= WARMUP_BARS or 'Close' not in data.columns:
+        return False
+    columns = ['Close', 'Volume'] if 'Volume' in data.columns else ['Close']
+    return not any(np.isnan(data[column].to_numpy(dtype=np.float64)).any() for column in columns)
+
+
+class FeatureStore:
+    """Feature states per ticker, cached in memory and persisted next to the history store."""
+
+    def __init__(self, store=history_store, max_entries=FEATURE_STATE_CACHE_SIZE, max_rows=FEATURE_STATE_ROWS):
+        self.store = store
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _get(self, ticker):
+        with self._lock:
+            state = self._states.get(ticker)
+            if state is not None:
+                self._states.move_to_end(ticker)
+                return state
+
+        stored = self.store.read_state(ticker, STATE_NAME)
+        if stored is None:
+            return None
+        try:
+            return FeatureState.from_dict(stored)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable feature state for {ticker}: {str(e)}")
+            return None
+
+    def _put(self, ticker, state, persist):
+        with self._lock:
+            self._states[ticker] = state
+            self._states.move_to_end(ticker)
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+        if persist:
+            self.store.write_state(ticker, STATE_NAME, state.to_dict())
+            state.saved_bars = state.bars
+
+    def _catch_up(self, state, data, values):
+        # Position of the first bar the state has not seen, or None if the state cannot be
+        # continued (other columns, or the last bar it saw was revised or is not in data)
+        if state is None or state.columns != list(data.columns) or state.last_timestamp is None:
+            return None
+        position = data.index.searchsorted(state.last_timestamp, side='right')
+        if position == 0 or data.index[position - 1] != state.last_timestamp:
+            return None
+        if not _same_bar(state.last_bar, values[position - 1].tolist()):
+            return None
+        return position
+
+    def features(self, ticker, data):
+        """
+        Get the create_features frame of a price history from the ticker's state.
+
+        Only the bars the state has not seen are folded in.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            data (pd.DataFrame): Historical OHLCV data, oldest bar first
+
+        Returns:
+            pd.DataFrame: Same rows as create_features(data), or None if the state
+                cannot provide them (no state yet, the last bar it saw was revised,
+                or it does not keep rows back to the start of data); build them
+                with create_features and pass them to seed() then
+        """
+        if data is None or not _is_complete(data):
+            return None
+
+        ticker = ticker.upper()
+        values = data.to_numpy(dtype=np.float64)
+        with self._ticker_lock(ticker):
+            state = self._get(ticker)
+            position = self._catch_up(state, data, values)
+            if position is None:
+                return None
+            for i in range(position, len(data)):
+                state.update(data.index[i], values[i].tolist())
+            self._put(ticker, state, persist=state.bars - state.saved_bars >= FEATURE_STATE_SAVE_BARS)
+            return state.frame(data.index[WARMUP_BARS:])
+
+    def seed(self, ticker, data, features):
+        """
+        Replace the ticker's state with one built from create_features(data).
+
+        Histories whose feature frame does not fit in the kept rows get no state,
+        since every later call would have to fall back to create_features anyway.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            data (pd.DataFrame): Historical OHLCV data, oldest bar first
+            features (pd.DataFrame): create_features(data)
+        """
+        if data is None or not _is_complete(data) or features.empty or len(features) > self.max_rows:
+            return
+
+        ticker = ticker.upper()
+        with self._ticker_lock(ticker):
+            try:
+                state = FeatureState.seed(data, features, self.max_rows)
+            except ValueError as e:
+                logger.warning(f"Cannot build feature state for {ticker}: {str(e)}")
+                return
+            self._put(ticker, state, persist=True)
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+
+
+# Process-wide feature states
+feature_store = FeatureStore()
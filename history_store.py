@@ -0,0 +1,290 @@
+"""
+Local OHLCV History Store Module
+
+This module keeps daily price history on local disk so that it only has to be
+downloaded once. Each ticker is stored as a single NumPy file holding one
+record of float64 fields per bar: the first field holds the bar timestamp
+(epoch seconds) and is named "time" or "time:<exchange timezone>", and the
+remaining fields are the OHLCV columns under their own names. Derived
+per-ticker state, such as the incremental features, can be kept next to it
+(read_state/write_state).
+
+Reads are memory-mapped, so serving a window of history only touches the pages
+that are needed, and windows longer than one year are as cheap as short ones.
+New bars are merged in under a per-ticker file lock, so appends from several
+gunicorn workers never drop each other's bars, and the file (bars, columns
+and timezone together) is replaced with a single atomic rename, so readers in
+other workers always see a consistent version. Files written with the older
+JSON sidecar for columns and timezone are still read, and rewritten on the
+next append.
+
+NumPy and pandas are imported on first use, so the cache layer can be set up
+without loading them.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the per-ticker history files
+HISTORY_STORE_DIR = os.environ.get(
+    "HISTORY_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "history"),
+)
+
+# Member of a state file holding its JSON-compatible values
+STATE_META_KEY = '_meta'
+
+# Name of the timestamp field, followed by ":<timezone>" for timezone-aware histories
+TIME_FIELD = 'time'
+
+
+class HistoryStore:
+    """Per-ticker columnar store for daily OHLCV bars."""
+
+    def __init__(self, directory=HISTORY_STORE_DIR):
+        self.directory = directory
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _paths(self, ticker):
+        # The JSON sidecar only exists for files written in the older format
+        name = re.sub(r'[^A-Z0-9._-]', '_', ticker.upper())
+        base = os.path.join(self.directory, name)
+        return base + ".npy", base + ".json"
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker.upper(), threading.Lock())
+
+    @contextmanager
+    def _locked(self, ticker):
+        """Hold the ticker's lock across threads and, where fcntl exists, across processes."""
+        with self._lock(ticker):
+            if fcntl is None:
+                yield
+                return
+            array_path, _ = self._paths(ticker)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(array_path[:-len('.npy')] + ".lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self, ticker):
+        """Memory-map the stored bars as a 2D float array and read their columns and timezone."""
+        array_path, meta_path = self._paths(ticker)
+        if not os.path.exists(array_path):
+            return None, None
+
+        import numpy as np
+
+        try:
+            stored = np.load(array_path, mmap_mode='r')
+            if stored.dtype.names:
+                time_field, *columns = stored.dtype.names
+                meta = {'columns': columns, 'tz': time_field.partition(':')[2] or None}
+                array = stored.view(np.float64).reshape(len(stored), len(stored.dtype.names))
+            else:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                array = stored
+            if array.ndim != 2 or array.shape[1] != len(meta['columns']) + 1:
+                logger.warning(f"Ignoring corrupt history file for {ticker}")
+                return None, None
+            return array, meta
+        except Exception as e:
+            logger.error(f"Error reading stored history for {ticker}: {str(e)}")
+            return None, None
+
+    def updated_at(self, ticker):
+        """
+        Get the time the stored history was last written.
+
+        Args:
+            ticker (str): Stock ticker symbol
+
+        Returns:
+            datetime: UTC modification time, or None if nothing is stored
+        """
+        array_path, _ = self._paths(ticker)
+        try:
+            return datetime.utcfromtimestamp(os.path.getmtime(array_path))
+        except OSError:
+            return None
+
+    def last_date(self, ticker):
+        """
+        Get the timestamp of the most recent stored bar.
+
+        Args:
+            ticker (str): Stock ticker symbol
+
+        Returns:
+            pd.Timestamp: Timestamp of the last bar, or None if nothing is stored
+        """
+        import pandas as pd
+
+        array, meta = self._load(ticker)
+        if array is None or len(array) == 0:
+            return None
+        last = pd.Timestamp(int(array[-1, 0]), unit='s', tz='UTC')
+        return last.tz_convert(meta['tz']) if meta.get('tz') else last.tz_localize(None)
+
+    def read(self, ticker, start=None):
+        """
+        Read stored bars as a DataFrame backed by the memory-mapped file.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            start (pd.Timestamp): Only return bars from this time on
+
+        Returns:
+            pd.DataFrame: Historical OHLCV data, or None if nothing is stored
+        """
+        import numpy as np
+        import pandas as pd
+
+        array, meta = self._load(ticker)
+        if array is None:
+            return None
+
+        if start is not None:
+            first = np.searchsorted(array[:, 0], pd.Timestamp(start).timestamp(), side='left')
+            array = array[first:]
+
+        index = pd.to_datetime(array[:, 0].astype(np.int64), unit='s', utc=True)
+        index = index.tz_convert(meta['tz']) if meta.get('tz') else index.tz_localize(None)
+
+        return pd.DataFrame(array[:, 1:], index=index, columns=meta['columns'], copy=False)
+
+    def append(self, ticker, bars):
+        """
+        Merge new bars into the stored history.
+
+        Bars that overlap stored ones replace them, since the last stored bar
+        may have been a partial trading day.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            bars (pd.DataFrame): OHLCV data indexed by timestamp
+        """
+        if bars is None or bars.empty:
+            return
+
+        import numpy as np
+        import pandas as pd
+
+        with self._locked(ticker):
+            stored = self.read(ticker)
+            if stored is not None and not stored.empty:
+                # Keep the stored timezone when bars arrive in another one (e.g. UTC bulk downloads)
+                if stored.index.tz is not None and bars.index.tz is not None:
+                    bars = bars.tz_convert(stored.index.tz)
+                merged = pd.concat([stored, bars])
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+            else:
+                merged = bars.sort_index()
+
+            merged = merged.select_dtypes(include=[np.number]).astype(np.float64)
+            tz = str(merged.index.tz) if merged.index.tz is not None else None
+            timestamps = merged.index.tz_localize('UTC') if tz is None else merged.index
+            epoch = (timestamps.tz_convert('UTC').tz_localize(None) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+
+            array = np.empty((len(merged), len(merged.columns) + 1), dtype=np.float64)
+            array[:, 0] = np.asarray(epoch, dtype=np.float64)
+            array[:, 1:] = merged.to_numpy()
+
+            self._write(ticker, array, list(merged.columns), tz)
+
+    def read_state(self, ticker, name):
+        """
+        Read a state kept next to a ticker's history (e.g. incremental features).
+
+        Args:
+            ticker (str): Stock ticker symbol
+            name (str): Name of the state
+
+        Returns:
+            dict: The stored state, or None if there is none
+        """
+        import numpy as np
+
+        path = self._state_path(ticker, name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                state = json.loads(str(stored[STATE_META_KEY]))
+                state.update((key, stored[key]) for key in stored.files if key != STATE_META_KEY)
+                return state
+        except Exception as e:
+            logger.error(f"Error reading stored {name} state for {ticker}: {str(e)}")
+            return None
+
+    def write_state(self, ticker, name, state):
+        """
+        Replace the state kept next to a ticker's history.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            name (str): Name of the state
+            state (dict): State whose values are JSON-compatible or NumPy arrays
+        """
+        import numpy as np
+
+        path = self._state_path(ticker, name)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        arrays = {key: value for key, value in state.items() if isinstance(value, np.ndarray)}
+        meta = {key: value for key, value in state.items() if key not in arrays}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + suffix, 'wb') as f:
+                np.savez(f, **{STATE_META_KEY: np.array(json.dumps(meta))}, **arrays)
+            os.replace(path + suffix, path)
+        except Exception as e:
+            logger.error(f"Error storing {name} state for {ticker}: {str(e)}")
+
+    def _state_path(self, ticker, name):
+        # Lower-case state names cannot clash with the upper-case ticker file names
+        array_path, _ = self._paths(ticker)
+        return f"{array_path[:-len('.npy')]}.{name.lower()}.npz"
+
+    def _write(self, ticker, array, columns, tz):
+        import numpy as np
+
+        os.makedirs(self.directory, exist_ok=True)
+        array_path, meta_path = self._paths(ticker)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        time_field = f"{TIME_FIELD}:{tz}" if tz else TIME_FIELD
+        dtype = np.dtype([(time_field, np.float64)] + [(column, np.float64) for column in columns])
+        records = np.ascontiguousarray(array, dtype=np.float64).view(dtype).reshape(len(array))
+
+        with open(array_path + suffix, 'wb') as f:
+            np.save(f, records)
+        os.replace(array_path + suffix, array_path)
+
+        # The columns and timezone are in the file now
+        if os.path.exists(meta_path):
+            try:
+                os.remove(meta_path)
+            except OSError:
+                pass
+
+
+# Process-wide history store
+history_store = HistoryStore()
@@ -0,0 +1,172 @@
+"""
+HTTP Caching Module
+
+This module lets polling clients and the reverse proxy revalidate JSON API
+responses instead of downloading them again:
+
+1. Validators: a weak ETag and a Last-Modified date derived from when the
+   underlying data was fetched (or saved), so a matching If-None-Match (or,
+   without one, If-Modified-Since) is answered with 304 Not Modified before
+   any fetch or serialization
+2. Cache-Control: max-age follows the per-kind TTLs of the data cache, so a
+   response stays fresh exactly as long as the data behind it
+3. Compression: large JSON bodies are compressed with brotli (when the
+   brotli package is installed and the client accepts it) or gzip
+
+ETags are weak because the same data may be sent with different content
+encodings.
+"""
+
+import os
+import gzip
+import hashlib
+from datetime import timezone
+
+from flask import request, Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Smallest response body, in bytes, worth compressing
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+
+# gzip compression level (1-9) and brotli quality (0-11)
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+# Content types that are compressed
+COMPRESSIBLE_MIMETYPES = ('application/json',)
+
+
+def make_etag(*parts):
+    """
+    Build an ETag value from the parts that identify a representation.
+
+    Args:
+        *parts: Values whose string forms identify the data and its variant
+
+    Returns:
+        str: Opaque ETag value (without quotes)
+    """
+    digest = hashlib.sha1('\x1f'.join(str(part) for part in parts).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # HTTP dates have a resolution of one second
+    return value.replace(microsecond=0)
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    Check the current request's conditional headers against a representation.
+
+    If-None-Match takes precedence; If-Modified-Since is only evaluated when the
+    request does not carry an ETag condition.
+
+    Args:
+        etag (str): ETag of the current representation
+        last_modified (datetime): When the current representation changed, naive UTC or aware
+
+    Returns:
+        bool: True if the client's copy is still current
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _as_utc(last_modified) <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified=None, cache_control='no-cache'):
+    """
+    Add ETag, Last-Modified and Cache-Control headers to a response.
+
+    Args:
+        response (Response): Response to update
+        etag (str): ETag of the representation
+        last_modified (datetime): When the representation changed
+        cache_control (str): Cache-Control header value
+
+    Returns:
+        Response: The same response
+    """
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def not_modified_response(etag, last_modified=None, cache_control='no-cache'):
+    """Build a 304 Not Modified response carrying the current validators."""
+    return set_validators(Response(status=304), etag, last_modified, cache_control)
+
+
+def max_age_cache_control(max_age, public=True):
+    """
+    Cache-Control value letting caches reuse a response for max_age seconds.
+
+    Args:
+        max_age (float): Seconds the data stays fresh; 0 or less requires revalidation
+        public (bool): Whether shared caches (the reverse proxy) may store it
+
+    Returns:
+        str: Cache-Control header value
+    """
+    scope = 'public' if public else 'private'
+    if max_age is None or max_age <= 0:
+        return f"{scope}, no-cache"
+    return f"{scope}, max-age={int(max_age)}"
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    br_quality = accepted['br'] if brotli is not None else 0
+    gzip_quality = accepted['gzip']
+    if br_quality and br_quality >= gzip_quality:
+        return 'br'
+    if gzip_quality:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """
+    Compress a large JSON response body for clients that accept it.
+
+    Registered as an after_request handler by init_compression. Streamed responses
+    (Server-Sent Events) and responses that already have an encoding are left alone.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Compress the large JSON responses of an application."""
+    app.after_request(compress_response)
@@ -0,0 +1,127 @@
+"""
+Shared HTTP Session Module
+
+This module provides the single HTTP session used for all Yahoo Finance
+traffic. Creating a Ticker without a session makes yfinance build a new
+session, and with it new TCP/TLS connections; switching sessions also drops
+the cookie that yfinance's crumb is tied to. Handing the same session to every
+yf.Ticker keeps connections alive between calls and lets the crumb and cookie
+be fetched once per process.
+
+yfinance needs a curl_cffi session (Yahoo rejects clients that do not look
+like a browser). curl_cffi keeps one curl handle with its own connection cache
+per thread, so each fetch worker reuses its connections. When curl_cffi is not
+installed, a requests session with a pooled HTTPAdapter is used instead.
+Transient failures (connection errors, timeouts and 5xx responses) are retried
+with exponential backoff; 429 responses are left to the rate limiter.
+"""
+
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Connections kept alive per host (requests fallback) or per thread (curl_cffi)
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "16"))
+
+# Number of retries for transient failures and the base backoff in seconds
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.5"))
+
+# Response codes worth retrying
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# Browser profile presented to Yahoo Finance
+HTTP_IMPERSONATE = os.environ.get("HTTP_IMPERSONATE", "chrome")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def backoff_delay(attempt, backoff=HTTP_BACKOFF):
+    """Seconds to wait before retry number attempt (0-based)."""
+    return backoff * (2 ** attempt)
+
+
+try:
+    from curl_cffi import requests as curl_requests
+except ImportError:
+    curl_requests = None
+
+
+if curl_requests is not None:
+    class RetryingSession(curl_requests.Session):
+        """curl_cffi session that retries transient failures with exponential backoff."""
+
+        def __init__(self, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF, **kwargs):
+            super().__init__(**kwargs)
+            self.retries = retries
+            self.backoff = backoff
+
+        def request(self, method, url, *args, **kwargs):
+            attempt = 0
+            while True:
+                try:
+                    response = super().request(method, url, *args, **kwargs)
+                except (curl_requests.exceptions.ConnectionError, curl_requests.exceptions.Timeout) as e:
+                    if attempt >= self.retries:
+                        raise
+                    logger.warning(f"Retrying {method} {url} after error: {str(e)}")
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                        return response
+                    logger.warning(f"Retrying {method} {url} after HTTP {response.status_code}")
+
+                time.sleep(backoff_delay(attempt, self.backoff))
+                attempt += 1
+
+
+def create_session():
+    """
+    Create a pooled HTTP session with retries.
+
+    Returns:
+        Session: curl_cffi session impersonating a browser, or a requests
+        session with a pooled HTTPAdapter when curl_cffi is not available
+    """
+    if curl_requests is not None:
+        session = RetryingSession(impersonate=HTTP_IMPERSONATE)
+        # Let every per-thread curl handle keep up to HTTP_POOL_SIZE connections alive
+        session.curl_options = dict(session.curl_options or {})
+        try:
+            from curl_cffi import CurlOpt
+            session.curl_options[CurlOpt.MAXCONNECTS] = HTTP_POOL_SIZE
+        except (ImportError, AttributeError):
+            pass
+        return session
+
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(total=HTTP_RETRIES, backoff_factor=HTTP_BACKOFF,
+                  status_forcelist=RETRY_STATUS_CODES, allowed_methods=None,
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def get_session():
+    """Get the process-wide HTTP session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+                logger.info(f"Created shared HTTP session ({type(_session).__name__})")
+    return _session
+
@@ -0,0 +1,223 @@
+"""
+Background Screening Jobs Module
+
+This module runs large batch screens in the background so they do not block
+a web worker until every ticker is done. A screen is submitted as a job and
+stored in the ScreenJob table; a small pool of local worker threads drains an
+in-process queue and processes the tickers in chunks. After each chunk the
+partial results and progress are written back to the database, so any
+gunicorn worker can answer status polls. When all tickers are done, the
+results are ranked with the Magic Formula.
+
+The in-process queue only wakes the local workers; a job is owned by whichever
+worker claims its row in the table. Workers that find the queue idle also
+claim queued jobs nobody is running and running jobs whose progress has not
+been written for JOB_HEARTBEAT_TIMEOUT seconds, so jobs left behind by a
+recycled or restarted gunicorn worker resume from their last finished chunk.
+"""
+
+import os
+import json
+import uuid
+import queue
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from serialization import make_json_safe
+
+logger = logging.getLogger(__name__)
+
+# Number of local threads processing queued jobs
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+
+# Number of tickers processed between progress updates
+JOB_CHUNK_SIZE = int(os.environ.get("JOB_CHUNK_SIZE", "25"))
+
+# Maximum number of tickers accepted in a single job
+JOB_MAX_TICKERS = int(os.environ.get("JOB_MAX_TICKERS", "5000"))
+
+# Seconds without a progress update after which a running job is considered abandoned
+JOB_HEARTBEAT_TIMEOUT = float(os.environ.get("JOB_HEARTBEAT_TIMEOUT", "300"))
+
+# Seconds an idle worker waits before looking for abandoned jobs
+JOB_RECOVERY_INTERVAL = float(os.environ.get("JOB_RECOVERY_INTERVAL", "30"))
+
+
+class JobQueue:
+    """In-process queue of screening jobs backed by the ScreenJob table."""
+
+    def __init__(self, workers=JOB_WORKERS, chunk_size=JOB_CHUNK_SIZE,
+                 heartbeat_timeout=JOB_HEARTBEAT_TIMEOUT, recovery_interval=JOB_RECOVERY_INTERVAL):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.heartbeat_timeout = timedelta(seconds=heartbeat_timeout)
+        self.recovery_interval = recovery_interval
+        self.app = None
+        self.screen = None
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app, screen):
+        """
+        Configure the queue.
+
+        Args:
+            app (Flask): Application whose database stores the jobs
+            screen (callable): Function taking a list of tickers and returning their results
+        """
+        self.app = app
+        self.screen = screen
+
+    def _ensure_workers(self):
+        # Threads are started lazily so they are created in the serving process
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._work, name=f"screen-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, tickers):
+        """
+        Queue a screen of the given tickers.
+
+        Args:
+            tickers (list): Ticker symbols to screen
+
+        Returns:
+            str: Id of the new job
+        """
+        from models import db, ScreenJob
+
+        job_id = str(uuid.uuid4())
+        job = ScreenJob(id=job_id, status='queued', tickers=','.join(tickers), total=len(tickers), completed=0)
+        db.session.add(job)
+        db.session.commit()
+
+        self._ensure_workers()
+        self._queue.put(job_id)
+        logger.info(f"Queued screening job {job_id} for {len(tickers)} tickers")
+        return job_id
+
+    def get(self, job_id, offset=0):
+        """
+        Get the status and results of a job.
+
+        Args:
+            job_id (str): Id of the job
+            offset (int): Only include results from this position on
+
+        Returns:
+            dict: Job status, progress and results, or None if the job does not exist
+        """
+        from models import db, ScreenJob
+
+        # Polls start the workers of a fresh process, so they pick up abandoned jobs
+        self._ensure_workers()
+        job = db.session.get(ScreenJob, job_id)
+        if job is None:
+            return None
+
+        results = job.get_results()
+        return {
+            'id': job.id,
+            'status': job.status,
+            'total': job.total,
+            'completed': job.completed,
+            'error': job.error,
+            'offset': offset,
+            'results': results[offset:],
+            'created_at': job.created_at.isoformat() if job.created_at else None,
+            'updated_at': job.updated_at.isoformat() if job.updated_at else None,
+        }
+
+    def _work(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=self.recovery_interval)
+                from_queue = True
+            except queue.Empty:
+                job_id, from_queue = None, False
+
+            try:
+                with self.app.app_context():
+                    if job_id is None:
+                        job_id = self._find_abandoned()
+                    if job_id is not None and self._claim(job_id):
+                        self._run(job_id)
+            except Exception as e:
+                logger.error(f"Error running screening job {job_id}: {str(e)}")
+            finally:
+                if from_queue:
+                    self._queue.task_done()
+
+    def _find_abandoned(self):
+        from models import ScreenJob
+
+        job = (ScreenJob.query
+               .filter(self._claimable(ScreenJob))
+               .order_by(ScreenJob.created_at)
+               .first())
+        return job.id if job is not None else None
+
+    def _claimable(self, model):
+        from sqlalchemy import or_, and_
+
+        stale = datetime.utcnow() - self.heartbeat_timeout
+        return or_(model.status == 'queued', and_(model.status == 'running', model.updated_at < stale))
+
+    def _claim(self, job_id):
+        """Mark a job as running by this worker, unless another worker already runs it."""
+        from models import db, ScreenJob
+
+        claimed = (ScreenJob.query
+                   .filter(ScreenJob.id == job_id, self._claimable(ScreenJob))
+                   .update({'status': 'running', 'updated_at': datetime.utcnow()}, synchronize_session=False))
+        db.session.commit()
+        if claimed:
+            logger.info(f"Claimed screening job {job_id}")
+        return claimed == 1
+
+    def _run(self, job_id):
+        from models import db, ScreenJob
+        from ranking import rank_results
+
+        job = db.session.get(ScreenJob, job_id)
+        if job is None:
+            return
+
+        tickers = job.get_tickers_list()
+
+        # Resume after the chunks a previous worker finished
+        results = job.get_results()
+        try:
+            for start in range(job.completed, len(tickers), self.chunk_size):
+                chunk = tickers[start:start + self.chunk_size]
+                try:
+                    results.extend(self.screen(chunk))
+                except Exception as e:
+                    logger.error(f"Error screening tickers {chunk} in job {job_id}: {str(e)}")
+
+                # Publish progress and partial results after each chunk
+                job.completed = min(len(tickers), start + len(chunk))
+                job.results = json.dumps(make_json_safe(results))
+                db.session.commit()
+
+            job.results = json.dumps(make_json_safe(rank_results(results)))
+            job.status = 'done'
+            if not results:
+                job.error = "Could not retrieve valid data for any of the provided tickers."
+            db.session.commit()
+            logger.info(f"Finished screening job {job_id} with {len(results)} results")
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(e)
+            db.session.commit()
+            raise
+
+
+# Process-wide job queue
+job_queue = JobQueue()
@@ -0,0 +1,471 @@
+"""
+Lynch Rule Engine Module
+
+This module evaluates Peter Lynch's categorization and checklist for many
+tickers at once. The category rules and the per-category checklist checks are
+compiled once, at import, into ordered tables:
+
+1. Category rules are tried in priority order (Asset Play, Turnaround,
+   Cyclical, then the growth categories) and each row takes the first rule
+   whose mask holds
+2. Checklist checks are lists of tiers; a row takes the first tier that holds
+   and records its text under meets_criteria (adding its points) or
+   needs_attention
+3. Cyclical industries and sectors are matched with one precompiled regular
+   expression each, instead of scanning keyword lists per ticker
+
+Inputs are one column per field (a DataFrame with one row per ticker), and
+missing values are NaN, so a NaN input is treated the same way as None. The
+single-ticker functions in lynch_categories are thin wrappers over this
+module, so the per-ticker and batch paths always agree.
+"""
+
+import re
+import logging
+import numpy as np
+import pandas as pd
+
+from lynch_categories import LYNCH_CHECKLISTS
+
+logger = logging.getLogger(__name__)
+
+# Numeric fields read by the category rules and the checklist
+NUMERIC_FIELDS = [
+    'market_cap', 'earnings_growth', 'revenue_growth', 'price_change_percent',
+    'book_value_per_share', 'current_price', 'total_assets', 'enterprise_value',
+    'pe_ratio', 'peg_ratio', 'debt_to_equity', 'dividend_yield',
+    'price_to_book', 'assets_to_ev',
+]
+
+# Text fields; matched case-insensitively for cyclicals, exactly for the checklist
+TEXT_FIELDS = ['ticker', 'industry', 'sector']
+
+# Keywords marking an industry or sector as cyclical (matched as substrings)
+CYCLICAL_INDUSTRIES = ['automotive', 'airline', 'mining', 'steel', 'construction',
+                       'semiconductor', 'energy', 'oil', 'gas', 'housing', 'travel']
+CYCLICAL_SECTORS = ['materials', 'energy', 'industrials', 'consumer discretionary']
+
+_CYCLICAL_INDUSTRY_PATTERN = re.compile('|'.join(map(re.escape, CYCLICAL_INDUSTRIES)))
+_CYCLICAL_SECTOR_PATTERN = re.compile('|'.join(map(re.escape, CYCLICAL_SECTORS)))
+
+# Exact industry and sector names the checklist gives extra credit for
+EXPANSION_INDUSTRIES = frozenset(["Retail", "Restaurants", "Consumer Services", "Technology"])
+CONFIRMED_CYCLICAL_INDUSTRIES = frozenset(["Automotive", "Steel", "Chemicals", "Construction",
+                                           "Manufacturing", "Airlines", "Hotels", "Energy"])
+PHYSICAL_ASSET_SECTORS = frozenset(['Real Estate', 'Consumer Discretionary', 'Energy'])
+
+UNKNOWN = "Unknown"
+MEETS = 'meets_criteria'
+NEEDS = 'needs_attention'
+
+
+def _as_float(value):
+    if value is None or isinstance(value, str):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _float_column(values):
+    # Numbers and None convert in one call; anything else goes through _as_float
+    if not any(isinstance(value, str) for value in values):
+        try:
+            return np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            pass
+    return np.array([_as_float(value) for value in values], dtype=np.float64)
+
+
+def records_to_columns(records):
+    """
+    Build the column arrays the rules read from Lynch input dicts.
+
+    Args:
+        records (list): Dicts with the fields build_ticker_result passes to categorize_stock
+
+    Returns:
+        dict: One float64 array per numeric field (NaN when missing) and one
+            object array per text field
+    """
+    columns = {field: _float_column([record.get(field) for record in records]) for field in NUMERIC_FIELDS}
+    for field in TEXT_FIELDS:
+        column = columns[field] = np.empty(len(records), dtype=object)
+        column[:] = [record.get(field) for record in records]
+    return columns
+
+
+def records_to_frame(records):
+    """
+    Build the columnar input for classify_frame from Lynch input dicts.
+
+    Args:
+        records (list): Dicts with the fields build_ticker_result passes to categorize_stock
+
+    Returns:
+        pd.DataFrame: One float64 column per numeric field and one object column per text field
+    """
+    return pd.DataFrame(records_to_columns(records))
+
+
+def _present(values):
+    return ~np.isnan(values)
+
+
+def _matches(values, pattern):
+    # Industry and sector names repeat across a universe, so each distinct name is searched once
+    found = {value: pattern.search(value) is not None for value in set(values)}
+    return np.fromiter((found[value] for value in values), dtype=bool, count=len(values))
+
+
+def _take(values, rows):
+    if isinstance(values, np.ndarray):
+        return values[rows].tolist()
+    return [values[row] for row in rows.tolist()]
+
+
+def _member(values, names):
+    return np.fromiter((value in names for value in values), dtype=bool, count=len(values))
+
+
+def _prepare(source, n):
+    """Input columns as typed arrays plus the derived columns the rules read."""
+    col = {}
+    for field in NUMERIC_FIELDS:
+        col[field] = np.asarray(source[field], dtype=np.float64) if field in source else np.full(n, np.nan)
+    for field in TEXT_FIELDS:
+        col[field] = np.asarray(source[field], dtype=object) if field in source else np.full(n, None, dtype=object)
+
+    col['industry_lower'] = [value.lower() if isinstance(value, str) else '' for value in col['industry']]
+    col['sector_lower'] = [value.lower() if isinstance(value, str) else '' for value in col['sector']]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Ratios derived for the categorization (the checklist reads the input columns)
+        book_value_per_share = col['book_value_per_share']
+        col['derived_price_to_book'] = np.where(_present(col['current_price']) & (book_value_per_share > 0),
+                                                col['current_price'] / book_value_per_share, np.nan)
+        enterprise_value = col['enterprise_value']
+        col['derived_assets_to_ev'] = np.where(_present(col['total_assets']) & (enterprise_value > 0),
+                                               col['total_assets'] / enterprise_value, np.nan)
+
+        # Earnings growth as a percentage when it's in decimal form
+        earnings_growth = col['earnings_growth']
+        col['growth_rate'] = np.where(earnings_growth < 1, earnings_growth * 100, earnings_growth)
+    return col
+
+
+def _frame_columns(frame):
+    return _prepare({name: frame[name].to_numpy() for name in frame.columns}, len(frame))
+
+
+# Key metric templates are (format, column, fallback): the fallback is shown when the value
+# is missing or zero, and a fallback of None always formats the value
+GROWTH_METRIC = ("Growth Rate: {:.2f}%", 'growth_rate', None)
+
+# Category rules in priority order: (category, description, condition, key metric templates)
+CATEGORY_RULES = [
+    ("Asset Play", "Companies with valuable assets not reflected in the stock price",
+     lambda c: (c['derived_price_to_book'] < 1.0) | (c['derived_assets_to_ev'] > 1.2),
+     [("Price-to-Book: {:.2f}", 'derived_price_to_book', "Price-to-Book: N/A"),
+      ("Assets to Enterprise Value: {:.2f}", 'derived_assets_to_ev', "Assets to EV: N/A")]),
+    ("Turnaround", "Companies recovering from poor performance",
+     lambda c: c['price_change_percent'] < -30,
+     [("1-Year Price Change: {:.2f}%", 'price_change_percent', "Price Change: N/A"),
+      ("Debt-to-Equity: {:.2f}", 'debt_to_equity', "Debt-to-Equity: N/A")]),
+    ("Cyclical", "Companies whose performance is tied to economic cycles",
+     lambda c: _matches(c['industry_lower'], _CYCLICAL_INDUSTRY_PATTERN)
+     | _matches(c['sector_lower'], _CYCLICAL_SECTOR_PATTERN),
+     [("Industry: {}", 'industry_lower', None),
+      ("P/E Ratio: {:.2f}", 'pe_ratio', "P/E Ratio: N/A")]),
+    ("Slow Grower", "Large, mature companies with modest growth (less than 10% annually)",
+     lambda c: (c['market_cap'] > 100_000_000_000) & (c['growth_rate'] < 10),  # $100B+
+     [("Dividend Yield: {:.2f}%", 'dividend_yield', "Dividend Yield: N/A"),
+      GROWTH_METRIC]),
+    ("Stalwart", "Large, established companies with solid financials and moderate growth (10-20% annually)",
+     lambda c: (c['market_cap'] > 10_000_000_000) & (c['growth_rate'] >= 10) & (c['growth_rate'] <= 20),  # $10B+
+     [GROWTH_METRIC,
+      ("P/E Ratio: {:.2f}", 'pe_ratio', "P/E Ratio: N/A")]),
+    ("Fast Grower", "Companies with high growth (more than 20% annually)",
+     lambda c: c['growth_rate'] > 20,
+     [GROWTH_METRIC,
+      ("PEG Ratio: {:.2f}", 'peg_ratio', "PEG Ratio: N/A")]),
+    # Default categorization when no growth category applies
+    ("Stalwart", "Large, established companies with solid financials",
+     lambda c: c['market_cap'] > 50_000_000_000,  # $50B+
+     [("P/E Ratio: {:.2f}", 'pe_ratio', "P/E Ratio: N/A"),
+      ("Dividend Yield: {:.2f}%", 'dividend_yield', "Dividend Yield: N/A")]),
+]
+
+UNKNOWN_DESCRIPTION = "Unable to categorize with available data"
+
+
+def _tier(condition, kind, text, points=0):
+    return (condition, kind, text, points)
+
+
+def _otherwise(field):
+    return lambda c: _present(c[field])
+
+
+# Checklist checks per category. Each check is a list of tiers tried in order; the first tier
+# whose condition holds is recorded. A condition of None always holds.
+CHECKLIST_RULES = {
+    "Slow Grower": [
+        [_tier(lambda c: c['dividend_yield'] > 2.0, MEETS, "Good dividend yield (>2%)", 1),
+         _tier(None, NEEDS, "Dividend yield could be higher")],
+        [_tier(lambda c: c['debt_to_equity'] < 0.8, MEETS, "Reasonable debt levels", 1),
+         _tier(None, NEEDS, "Monitor debt levels")],
+    ],
+    "Stalwart": [
+        [_tier(lambda c: c['pe_ratio'] < c['earnings_growth'] * 1.5, MEETS, "Good P/E ratio relative to growth", 1),
+         _tier(lambda c: _present(c['pe_ratio']) & _present(c['earnings_growth']), NEEDS,
+               "P/E ratio may be too high relative to growth")],
+        [_tier(lambda c: c['price_change_percent'] < -10, MEETS,
+               "Currently experiencing a temporary setback (potential buying opportunity)", 1)],
+    ],
+    "Fast Grower": [
+        [_tier(lambda c: c['revenue_growth'] > 25, MEETS, "Exceptional revenue growth (>25%)", 1.5),
+         _tier(lambda c: c['revenue_growth'] > 20, MEETS, "Strong revenue growth (>20%)", 1),
+         _tier(lambda c: c['revenue_growth'] > 15, MEETS, "Good revenue growth (>15%)", 0.5),
+         _tier(_otherwise('revenue_growth'), NEEDS, "Revenue growth may be insufficient for a Fast Grower")],
+        # Lynch emphasized that Fast Growers should be reasonably priced relative to growth
+        [_tier(lambda c: c['peg_ratio'] < 0.8, MEETS, "Excellent PEG ratio (<0.8)", 1.5),
+         _tier(lambda c: c['peg_ratio'] < 1.2, MEETS, "Attractive PEG ratio (<1.2)", 1),
+         _tier(lambda c: c['peg_ratio'] < 1.5, MEETS, "Acceptable PEG ratio (<1.5)", 0.5),
+         _tier(_otherwise('peg_ratio'), NEEDS, "PEG ratio may be too high for growth rate")],
+        # Lynch favored companies that could expand nationally/internationally
+        [_tier(lambda c: _member(c['industry'], EXPANSION_INDUSTRIES), MEETS,
+               "Industry with strong expansion potential", 0.5)],
+    ],
+    "Cyclical": [
+        # Lynch emphasized buying cyclicals during downturns (when P/E is low) and selling during booms
+        [_tier(lambda c: c['pe_ratio'] < 8, MEETS, "Very low P/E ratio (strong buying opportunity)", 1.5),
+         _tier(lambda c: c['pe_ratio'] < 12, MEETS, "Low P/E ratio (potential buying opportunity)", 1),
+         _tier(lambda c: c['pe_ratio'] > 25, NEEDS, "Very high P/E ratio (consider taking profits)"),
+         _tier(lambda c: c['pe_ratio'] > 18, NEEDS, "High P/E ratio (approaching peak valuation)")],
+        [_tier(lambda c: c['price_change_percent'] < -30, MEETS, "Significant downturn (strong buying opportunity)", 1.5),
+         _tier(lambda c: c['price_change_percent'] < -20, MEETS,
+               "Currently in a downturn (potential buying opportunity)", 1),
+         _tier(lambda c: c['price_change_percent'] > 50, NEEDS, "Significant upturn (consider taking profits)")],
+        [_tier(lambda c: _member(c['industry'], CONFIRMED_CYCLICAL_INDUSTRIES), MEETS,
+               "Confirmed cyclical industry: {industry}", 0.5)],
+    ],
+    "Turnaround": [
+        [_tier(lambda c: c['debt_to_equity'] < 2.0, MEETS, "Manageable debt level for recovery", 1),
+         _tier(_otherwise('debt_to_equity'), NEEDS, "High debt level may impede recovery")],
+        # A positive price change after a big drop could indicate recovery in progress
+        [_tier(lambda c: c['price_change_percent'] > 10, MEETS, "Shows signs of recovery in share price", 1)],
+    ],
+    "Asset Play": [
+        [_tier(lambda c: c['price_to_book'] < 1.0, MEETS, "Trading below book value", 1),
+         _tier(lambda c: c['price_to_book'] < 1.3, MEETS, "Trading at reasonable price-to-book ratio", 0.5),
+         _tier(_otherwise('price_to_book'), NEEDS, "Price to book ratio may be too high for an Asset Play")],
+        [_tier(lambda c: c['assets_to_ev'] > 1.2, MEETS, "Assets worth more than enterprise value", 1),
+         _tier(lambda c: c['assets_to_ev'] > 0.8, MEETS,
+               "Assets represent significant portion of enterprise value", 0.5),
+         _tier(_otherwise('assets_to_ev'), NEEDS, "Enterprise value significantly higher than asset value")],
+        # Companies with property/real estate that might be undervalued
+        [_tier(lambda c: _member(c['sector'], PHYSICAL_ASSET_SECTORS), MEETS,
+               "Operates in sector likely to have valuable physical assets", 0.5)],
+    ],
+}
+
+# Maximum checklist score
+MAX_SCORE = 5
+
+# Checklist items (recommendations) per category, falling back to the general checklist
+_RECOMMENDATIONS = {category: LYNCH_CHECKLISTS.get(category, LYNCH_CHECKLISTS["General"])
+                    for category in [rule[0] for rule in CATEGORY_RULES] + [UNKNOWN]}
+
+
+def _format_metrics(template, values):
+    text, _, fallback = template
+    format_value = text.format
+    if fallback is None:
+        return [format_value(value) for value in values]
+    # The fallback replaces missing (NaN) and zero values, like `if value:`
+    return [format_value(value) if value == value and value != 0 else fallback for value in values]
+
+
+def _first_match(conditions, eligible):
+    """Index of the first condition holding in each eligible row, -1 where none does."""
+    chosen = np.full(len(eligible), -1)
+    pending = eligible.copy()
+    for index, condition in enumerate(conditions):
+        hit = pending & condition
+        chosen[hit] = index
+        pending &= ~hit
+    return chosen
+
+
+def _categorize(col, n):
+    # NaN fails every comparison, so rows without earnings growth skip the growth categories
+    with np.errstate(invalid='ignore'):
+        conditions = [condition(col) for _, _, condition, _ in CATEGORY_RULES]
+    rule_index = _first_match(conditions, np.ones(n, dtype=bool))
+
+    categories = np.full(n, UNKNOWN, dtype=object)
+    descriptions = np.full(n, UNKNOWN_DESCRIPTION, dtype=object)
+    key_metrics = [[] for _ in range(n)]
+    for index, (category, description, _, templates) in enumerate(CATEGORY_RULES):
+        rows = np.flatnonzero(rule_index == index)
+        if not len(rows):
+            continue
+        categories[rows] = category
+        descriptions[rows] = description
+        columns = [_format_metrics(template, _take(col[template[1]], rows)) for template in templates]
+        for row, metrics in zip(rows.tolist(), zip(*columns)):
+            key_metrics[row] = list(metrics)
+    return categories, descriptions, key_metrics
+
+
+def _evaluate(col, n, categories):
+    outcomes = {MEETS: [[] for _ in range(n)], NEEDS: [[] for _ in range(n)]}
+    scores = np.zeros(n)
+    fractional = np.zeros(n, dtype=bool)
+
+    for category, checks in CHECKLIST_RULES.items():
+        in_category = categories == category
+        if not in_category.any():
+            continue
+        with np.errstate(invalid='ignore'):
+            for tiers in checks:
+                chosen = _first_match([in_category if condition is None else condition(col)
+                                       for condition, _, _, _ in tiers], in_category)
+                for index, (_, kind, text, points) in enumerate(tiers):
+                    rows = np.flatnonzero(chosen == index)
+                    if not len(rows):
+                        continue
+                    target = outcomes[kind]
+                    if '{industry}' in text:
+                        for row in rows:
+                            target[row].append(text.format(industry=col['industry'][row]))
+                    else:
+                        for row in rows:
+                            target[row].append(text)
+                    if points:
+                        scores[rows] += points
+                        fractional[rows] |= points != int(points)
+
+    # Scores are capped at MAX_SCORE and stay integers unless a half point was added
+    checklist_scores = [MAX_SCORE if score >= MAX_SCORE else (score if is_fractional else int(score))
+                        for score, is_fractional in zip(scores.tolist(), fractional.tolist())]
+    return outcomes[MEETS], outcomes[NEEDS], checklist_scores
+
+
+def _recommendations(categories):
+    return [_RECOMMENDATIONS.get(category, LYNCH_CHECKLISTS["General"]) for category in categories]
+
+
+def categorize_frame(frame):
+    """
+    Assign a Lynch category to every row of a frame.
+
+    Args:
+        frame (pd.DataFrame): Fields from NUMERIC_FIELDS and TEXT_FIELDS, one row per ticker
+
+    Returns:
+        pd.DataFrame: category, description, key_metrics and recommendations per row
+    """
+    categories, descriptions, key_metrics = _categorize(_frame_columns(frame), len(frame))
+    return pd.DataFrame({
+        'category': categories,
+        'description': descriptions,
+        'key_metrics': key_metrics,
+        'recommendations': _recommendations(categories),
+    }, index=frame.index)
+
+
+def evaluate_checklist_frame(frame, categories):
+    """
+    Evaluate every row of a frame against Lynch's checklist for its category.
+
+    Args:
+        frame (pd.DataFrame): Fields from NUMERIC_FIELDS and TEXT_FIELDS, one row per ticker
+        categories (array-like): Lynch category of each row
+
+    Returns:
+        pd.DataFrame: meets_criteria, needs_attention and checklist_score per row
+    """
+    meets, needs, scores = _evaluate(_frame_columns(frame), len(frame), np.asarray(categories, dtype=object))
+    return pd.DataFrame({
+        'meets_criteria': meets,
+        'needs_attention': needs,
+        'checklist_score': pd.Series(scores, dtype=object, index=frame.index),
+    }, index=frame.index)
+
+
+def classify_frame(frame):
+    """
+    Categorize every row of a frame and evaluate it against its category's checklist.
+
+    Args:
+        frame (pd.DataFrame): Fields from NUMERIC_FIELDS and TEXT_FIELDS, one row per ticker
+
+    Returns:
+        pd.DataFrame: category, description, key_metrics, recommendations,
+            meets_criteria, needs_attention and checklist_score per row
+    """
+    col = _frame_columns(frame)
+    categories, descriptions, key_metrics = _categorize(col, len(frame))
+    meets, needs, scores = _evaluate(col, len(frame), categories)
+    return pd.DataFrame({
+        'category': categories,
+        'description': descriptions,
+        'key_metrics': key_metrics,
+        'recommendations': _recommendations(categories),
+        'meets_criteria': meets,
+        'needs_attention': needs,
+        'checklist_score': pd.Series(scores, dtype=object, index=frame.index),
+    }, index=frame.index)
+
+
+def classification_to_rows(classification):
+    """
+    Convert a classify_frame result into one lynch_analysis dict per ticker.
+
+    Args:
+        classification (pd.DataFrame): Output of classify_frame
+
+    Returns:
+        list: One dict per row, shaped like categorize_stock output plus the checklist fields
+    """
+    columns = {name: classification[name].tolist() for name in classification.columns}
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def categorize_record(data):
+    """
+    Categorize one ticker without building a DataFrame (used by categorize_stock).
+
+    Args:
+        data (dict): Lynch input fields of one ticker
+
+    Returns:
+        dict: category, description, key_metrics and recommendations
+    """
+    categories, descriptions, key_metrics = _categorize(_prepare(records_to_columns([data]), 1), 1)
+    return {
+        "category": categories[0],
+        "description": descriptions[0],
+        "key_metrics": key_metrics[0],
+        "recommendations": _recommendations(categories)[0],
+    }
+
+
+def evaluate_record(data, category):
+    """
+    Evaluate one ticker against a category's checklist (used by evaluate_stock_against_checklist).
+
+    Args:
+        data (dict): Lynch input fields of one ticker
+        category (str): Lynch category of the ticker
+
+    Returns:
+        tuple: (meets_criteria, needs_attention, score)
+    """
+    categories = np.empty(1, dtype=object)
+    categories[0] = category
+    meets, needs, scores = _evaluate(_prepare(records_to_columns([data]), 1), 1, categories)
+    return meets[0], needs[0], scores[0]
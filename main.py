@@ -1,16 +1,21 @@
 import os
 import logging
-import time
-import random
 import re
-import requests
-import pandas as pd
-import numpy as np
-import yfinance as yf
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+import json
+import threading
+import click
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from stock_predictor import predict_price_movement
-from lynch_categories import categorize_stock
+from rate_limiter import upstream_call, upstream_state, is_rate_limit_error
+from batch_fetcher import run_batch, iter_batch, max_batch_size
+from data_cache import data_cache
+from analysis_pool import init_analysis_pool, run_analysis
+from serialization import make_json_safe, encode_stock_data, dumps
+from jobs import job_queue, JOB_MAX_TICKERS
+from telemetry import timed, render_metrics, METRICS_ENABLED
+from rendering import init_rendering, row_cache, precompile_templates
+from http_caching import (make_etag, is_not_modified, set_validators, not_modified_response,
+                          max_age_cache_control, init_compression)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -31,101 +36,100 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
 }
 
+# Create missing database tables before the first request (disable when the schema is managed separately)
+AUTO_CREATE_SCHEMA = os.environ.get("AUTO_CREATE_SCHEMA", "true").lower() in ("1", "true", "yes")
+
 # Initialize the database
 from models import db, TickerList
 db.init_app(app)
+data_cache.init_app(app)
+init_analysis_pool(app)
+init_compression(app)
+init_rendering(app)
 
-with app.app_context():
-    try:
-        db.create_all()
-        logger.info("Database tables created successfully")
-    except Exception as e:
-        logger.error(f"Error creating database tables: {str(e)}")
+# pandas, NumPy, scikit-learn and yfinance are imported where they are first used,
+# so a cold worker can serve requests that do not analyze stocks without loading them
 
-# Sample data for major stocks to use when API is rate limited
-SAMPLE_DATA = {
-    "AAPL": {
-        "market_cap": 2800000000000,
-        "ebit": 126000000000,
-        "total_debt": 119000000000,
-        "cash": 62000000000,
-        "current_assets": 135000000000,
-        "current_liabilities": 125000000000,
-        "net_fixed_assets": 43000000000,
-        "company_name": "Apple Inc.",
-        "industry": "Consumer Electronics",
-        "sector": "Technology",
-        "country": "United States",
-        "currency": "USD",
-        "current_price": 173.50,
-        "previous_close": 172.40,
-        "dividend_rate": 0.96,
-        "dividend_yield": 0.55,
-        "ex_dividend_date": "2023-08-11",
-        "five_year_avg_dividend_yield": 0.65,
-        "total_assets": 350000000000,
-        "total_equity": 180000000000,
-        "book_value_per_share": 11.50,
-        "net_income": 100000000000
-    },
-    "MSFT": {
-        "market_cap": 2600000000000,
-        "ebit": 88000000000,
-        "total_debt": 82000000000,
-        "cash": 93000000000,
-        "current_assets": 169000000000,
-        "current_liabilities": 95000000000,
-        "net_fixed_assets": 70000000000,
-        "company_name": "Microsoft Corporation",
-        "industry": "Software—Infrastructure",
-        "sector": "Technology",
-        "country": "United States",
-        "currency": "USD",
-        "current_price": 349.50,
-        "previous_close": 347.80,
-        "dividend_rate": 3.00,
-        "dividend_yield": 0.86,
-        "ex_dividend_date": "2023-08-16",
-        "five_year_avg_dividend_yield": 0.92,
-        "total_assets": 390000000000,
-        "total_equity": 210000000000,
-        "net_income": 72000000000,
-        "book_value_per_share": 28.15
-    }
-}
+# Create the database tables
+def init_db():
+    with app.app_context():
+        try:
+            db.create_all()
+            logger.info("Database tables created successfully")
+        except Exception as e:
+            logger.error(f"Error creating database tables: {str(e)}")
+
+# Command to create the database tables ahead of deployment: flask --app main init-db
+@app.cli.command('init-db')
+def init_db_command():
+    init_db()
+
+# Command to fill the template bytecode cache ahead of deployment: flask --app main compile-templates
+@app.cli.command('compile-templates')
+def compile_templates_command():
+    count = precompile_templates(app)
+    logger.info(f"Compiled {count} templates")
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+# Create the schema once per worker, on its first request rather than at import time
+@app.before_request
+def ensure_schema():
+    global _schema_ready
+    if _schema_ready or not AUTO_CREATE_SCHEMA:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            init_db()
+            _schema_ready = True
 
-# Function to fetch financial data from Yahoo Finance with fallback to sample data
-def fetch_financial_data(ticker):
+# Fetch one kind of upstream data through the cache, the adaptive rate limiter and the circuit breaker
+# (providers that do not reach the network skip the limiter and breaker)
+def cached_upstream(ticker, kind, loader, remote=True):
+    return data_cache.get(ticker, kind, lambda: upstream_call(loader) if remote else loader())
+
+# Fetch the last year of price history, only downloading bars that are not cached yet
+def cached_history(ticker, stock, remote=True):
+    def full_loader():
+        return upstream_call(lambda: stock.history(period='1y')) if remote else stock.history(period='1y')
+    
+    def since_loader(start):
+        return upstream_call(lambda: stock.history(start=start)) if remote else stock.history(start=start)
+    
+    return data_cache.get_history(ticker, full_loader, since_loader)
+
+# Function to fetch financial data from the data provider with fallback to sample data
+def fetch_financial_data(ticker, provider=None, use_cache=True):
+    import pandas as pd
+    from data_providers import data_provider, sample_provider
+    
     logger.debug(f"Fetching data for ticker: {ticker}")
+    provider = provider or data_provider
     
-    # Check if we're being rate limited for common tickers
+    # Check if we're being rate limited for tickers with bundled sample snapshots
     use_sample_data = False
+    can_use_sample = provider is not sample_provider and sample_provider.has(ticker)
     
-    # Add rate limiting protection
-    
-    # Small delay to avoid rate limiting (reduced to prevent timeout)
-    delay = 0.1 + random.random() * 0.2
-    logger.debug(f"Adding delay of {delay:.2f} seconds before API request")
-    time.sleep(delay)
+    def load(kind, loader):
+        with timed(f'fetch.{kind}'):
+            if not use_cache:
+                return loader()
+            return cached_upstream(ticker, kind, loader, remote=provider.remote)
     
     # Try to get real data first
     if not use_sample_data:
         try:
-            # Create Ticker object
-            stock = yf.Ticker(ticker)
-            
-            # Use session object for better control over requests
-            session = requests.Session()
-            user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            session.headers.update({'User-Agent': user_agent})
+            # Create Ticker object from the configured provider (live, recording or replay)
+            stock = provider.ticker(ticker)
             
             # Fetch data one at a time with error handling for each
             try:
-                info = stock.info
+                info = load('info', lambda: stock.info)
                 logger.debug(f"Retrieved info data for {ticker}")
             except Exception as e:
                 logger.error(f"Error fetching info for {ticker}: {str(e)}")
-                if "Too Many Requests" in str(e) and ticker.upper() in SAMPLE_DATA:
+                if is_rate_limit_error(e) and can_use_sample:
                     use_sample_data = True
                     logger.warning(f"Using sample data for {ticker} due to rate limiting")
                 info = {}
@@ -133,11 +137,11 @@ def fetch_financial_data(ticker):
             if not use_sample_data:
                 try:
                     # Use annual financials
-                    financials = stock.financials.T
+                    financials = load('financials', lambda: stock.financials).T
                     logger.debug(f"Retrieved annual financials data for {ticker}")
                 except Exception as e:
                     logger.error(f"Error fetching financials for {ticker}: {str(e)}")
-                    if "Too Many Requests" in str(e) and ticker.upper() in SAMPLE_DATA:
+                    if is_rate_limit_error(e) and can_use_sample:
                         use_sample_data = True
                         logger.warning(f"Using sample data for {ticker} due to rate limiting")
                     financials = pd.DataFrame()
@@ -145,11 +149,11 @@ def fetch_financial_data(ticker):
             if not use_sample_data:
                 try:
                     # Use annual balance sheet
-                    balance_sheet = stock.balance_sheet.T
+                    balance_sheet = load('balance_sheet', lambda: stock.balance_sheet).T
                     logger.debug(f"Retrieved annual balance sheet data for {ticker}")
                 except Exception as e:
                     logger.error(f"Error fetching balance sheet for {ticker}: {str(e)}")
-                    if "Too Many Requests" in str(e) and ticker.upper() in SAMPLE_DATA:
+                    if is_rate_limit_error(e) and can_use_sample:
                         use_sample_data = True
                         logger.warning(f"Using sample data for {ticker} due to rate limiting")
                     balance_sheet = pd.DataFrame()
@@ -157,11 +161,11 @@ def fetch_financial_data(ticker):
             # Fetch dividend information
             if not use_sample_data:
                 try:
-                    dividend_data = stock.dividends
+                    dividend_data = load('dividends', lambda: stock.dividends)
                     dividend_rate = info.get('dividendRate', None)
                     dividend_yield = info.get('dividendYield', None)
                     # Note: yfinance returns dividend_yield as a decimal (e.g., 0.076 for 7.6%)
-                    # Already automatically multiplied by 100 when used in formatted_dividend_yield
+                    # Already automatically multiplied by 100 when displayed with the percent filter
                     ex_dividend_date = info.get('exDividendDate', None)
                     if ex_dividend_date:
                         ex_dividend_date = pd.to_datetime(ex_dividend_date, unit='s').strftime('%Y-%m-%d')
@@ -311,7 +315,8 @@ def fetch_financial_data(ticker):
                 # Get historical price data for prediction model (last 365 days)
                 historical_data = None
                 try:
-                    historical_data = stock.history(period='1y')
+                    with timed('fetch.history'):
+                        historical_data = cached_history(ticker, stock, remote=provider.remote) if use_cache else stock.history(period='1y')
                     logger.debug(f"Retrieved historical price data for {ticker}")
                 except Exception as e:
                     logger.error(f"Error fetching historical data for {ticker}: {str(e)}")
@@ -325,7 +330,7 @@ def fetch_financial_data(ticker):
                 
                 # Check if we have minimum required data
                 if market_cap is None and ebit is None and (total_debt is None or cash is None):
-                    if ticker.upper() in SAMPLE_DATA:
+                    if can_use_sample:
                         use_sample_data = True
                         logger.warning(f"Using sample data for {ticker} due to insufficient data from API")
                     else:
@@ -333,53 +338,16 @@ def fetch_financial_data(ticker):
             
         except Exception as e:
             logger.error(f"Error fetching data for {ticker}: {str(e)}")
-            if "Too Many Requests" in str(e) and ticker.upper() in SAMPLE_DATA:
+            if is_rate_limit_error(e) and can_use_sample:
                 use_sample_data = True
                 logger.warning(f"Using sample data for {ticker} due to rate limiting")
             else:
                 return {'error': str(e)}
     
-    # Use sample data if needed
-    if use_sample_data and ticker.upper() in SAMPLE_DATA:
+    # Use the bundled sample snapshot if needed
+    if use_sample_data:
         logger.info(f"Using sample data for {ticker}")
-        
-        data = SAMPLE_DATA[ticker.upper()]
-        
-        market_cap = data['market_cap']
-        ebit = data['ebit']
-        total_debt = data['total_debt']
-        cash = data['cash']
-        current_assets = data['current_assets']
-        current_liabilities = data['current_liabilities']
-        nwc = current_assets - current_liabilities
-        net_fixed_assets = data['net_fixed_assets']
-        company_name = data['company_name']
-        industry = data['industry']
-        sector = data['sector']
-        country = data['country']
-        currency = data['currency']
-        current_price = data['current_price']
-        previous_close = data['previous_close']
-        
-        price_change = current_price - previous_close
-        price_change_percent = (price_change / previous_close) * 100
-        
-        # Get dividend data from sample data
-        dividend_rate = data.get('dividend_rate', None)
-        dividend_yield = data.get('dividend_yield', None)
-        ex_dividend_date = data.get('ex_dividend_date', None)
-        five_year_avg_dividend_yield = data.get('five_year_avg_dividend_yield', None)
-        
-        # Get Graham Principles metrics from sample data
-        total_assets = data.get('total_assets', None)
-        total_equity = data.get('total_equity', None)
-        book_value_per_share = data.get('book_value_per_share', None)
-        
-        # For sample data, we'll have a DataFrame-like structure for balance_sheet
-        balance_sheet = None
-    else:
-        # If we're here and not using sample data, it means we successfully retrieved real data
-        pass
+        return fetch_financial_data(ticker, provider=sample_provider, use_cache=False)
         
     # Return data as a dictionary
     return {
@@ -419,328 +387,145 @@ def process_financial_data(ticker, data):
     if 'error' in data:
         return None
     
-    # Extract all necessary data for calculations
-    market_cap = data['market_cap']
-    ebit = data['ebit']
-    total_debt = data['total_debt']
-    cash = data['cash']
-    nwc = data['nwc']
-    net_fixed_assets = data['net_fixed_assets']
-    company_name = data['company_name']
-    currency = data['currency']
-    current_price = data['current_price']
-    dividend_yield = data['dividend_yield']
-    dividend_rate = data['dividend_rate']
-    current_assets = data.get('current_assets')
-    current_liabilities = data.get('current_liabilities')
-    total_assets = data.get('total_assets')
-    total_equity = data.get('total_equity')
-    book_value_per_share = data.get('book_value_per_share')
-    
-    # Get earnings per share and growth data
-    trailing_eps = data.get('trailing_eps')
-    forward_eps = data.get('forward_eps')
-    earnings_growth = data.get('earnings_growth')
-    
-    # Calculate Enterprise Value
-    if market_cap is not None and total_debt is not None and cash is not None:
-        enterprise_value = market_cap + total_debt - cash
-    else:
-        enterprise_value = None
-    
-    # Calculate Earnings Yield using Magic Formula (EBIT/EV) - Key Magic Formula Metric #1
-    if enterprise_value and ebit is not None and enterprise_value != 0:
-        earnings_yield = (ebit / enterprise_value) * 100
-    else:
-        earnings_yield = None
-        
-    # Prepare for Traditional Earnings Yield calculation later
-    # We'll need net_income from financial data
-    traditional_earnings_yield = None
-    
-    # Calculate Invested Capital using a more comprehensive definition
-    # Traditional definition of Invested Capital = Total Assets - Current Liabilities
-    # This is more aligned with how it's calculated in financial analysis
-    invested_capital = None
-    if total_assets is not None and current_liabilities is not None:
-        invested_capital = total_assets - current_liabilities
-        logger.debug(f"Invested Capital calculated as Total Assets ({total_assets}) - Current Liabilities ({current_liabilities}) = {invested_capital}")
-    # Fallback to net_fixed_assets + nwc if total_assets or current_liabilities are not available
-    elif net_fixed_assets and nwc:
-        invested_capital = net_fixed_assets + nwc
-        logger.debug(f"Invested Capital calculated as Net Fixed Assets ({net_fixed_assets}) + NWC ({nwc}) = {invested_capital}")
-    elif net_fixed_assets:
-        invested_capital = net_fixed_assets
-        logger.debug(f"Invested Capital calculated as Net Fixed Assets only = {invested_capital}")
-    elif nwc:
-        invested_capital = nwc
-        logger.debug(f"Invested Capital calculated as NWC only = {invested_capital}")
-    else:
-        invested_capital = None
-        logger.debug("Could not calculate Invested Capital due to missing data")
-    
-    # Calculate Return on Capital (EBIT/Invested Capital) - Key Magic Formula Metric #2
-    if invested_capital and ebit is not None and invested_capital != 0:
-        # ROC is calculated as a percentage (e.g., 37.7%)
-        # We'll use the correct calculation for ROC: (EBIT / Invested Capital) *100
-        # Note that ebit and invested_capital are already in the same unit (millions or billions)
-        return_on_capital = (ebit / invested_capital) * 100
-        logger.debug(f"ROC calculation: EBIT ({ebit}) / Invested Capital ({invested_capital}) * 100 = {return_on_capital:.2f}%")
-    else:
-        return_on_capital = None
-        
-    # Calculate Magic Formula Rank (higher is better)
-    magic_score = 0
-    if earnings_yield is not None and return_on_capital is not None:
-        # Simple magic formula score - 
-        # We're weighting both factors equally, but could adjust weights if needed
-        magic_score = (earnings_yield / 2) + (return_on_capital / 2)
-    else:
-        magic_score = None
-        
-    # Calculate Traditional Earnings Yield (Net Income/Market Cap)
-    traditional_earnings_yield = None
-    net_income = data.get('net_income')
-    
-    # Calculate traditional earnings yield if we have market cap and net income
-    if market_cap is not None and market_cap > 0 and net_income is not None:
-        traditional_earnings_yield = (net_income / market_cap) * 100
-        logger.debug(f"Traditional Earnings Yield calculation: Net Income ({net_income}) / Market Cap ({market_cap}) * 100 = {traditional_earnings_yield:.2f}%")
-        
-    # Calculate AlphaSpreads score - based on earnings quality and value
-    # AlphaSpreads looks at consistency of earnings and relative valuation
-    alpha_spreads_score = None
-    if earnings_yield is not None and dividend_yield is not None:
-        # Higher earnings yield relative to dividend yield indicates potential value
-        earnings_to_dividend_ratio = earnings_yield / max(dividend_yield, 0.1)  # Prevent division by zero
-        
-        # AlphaSpreads typically values consistency and quality
-        # A high ratio might indicate good value if earnings are consistent
-        if earnings_to_dividend_ratio > 3:  # earnings yield more than 3x dividend yield
-            alpha_spreads_score = min(100, earnings_to_dividend_ratio * 10)  # Cap at 100
-        else:
-            alpha_spreads_score = earnings_to_dividend_ratio * 20
-    
-    # Calculate Graham Calculator Intrinsic Value
-    # Benjamin Graham's formula: Value = EPS × (8.5 + 2g) × 4.4 / Y
-    # where g is growth rate, Y is AAA Corporate Bond yield (we use 4.5% as default)
-    graham_value = None
-    graham_upside = None
-    intrinsic_value_class = "secondary"  # Default color class
-    
-    # First try to use actual EPS if available
-    if trailing_eps is not None and current_price and current_price > 0:
-        # Use actual trailing EPS and growth rate if available
-        eps_to_use = trailing_eps
-        growth_to_use = earnings_growth if isinstance(earnings_growth, (int, float)) else 0.05
-        
-        # Convert growth to percentage if it's in decimal form (0.05 -> 5.0)
-        if growth_to_use < 1:
-            growth_to_use = growth_to_use * 100
-            
-        # Cap growth rate at 15% for Graham formula (he was conservative)
-        growth_to_use = min(growth_to_use, 15.0)
-        
-        # Graham's formula for intrinsic value
-        aaa_yield = 4.5  # Current approximate AAA corporate bond yield
-        graham_value = eps_to_use * (8.5 + 2 * (growth_to_use / 100)) * 4.4 / aaa_yield
-        
-        # Calculate potential upside/downside
-        if current_price > 0:
-            graham_upside = ((graham_value / current_price) - 1) * 100
-            
-            # Set color class based on upside potential
-            if graham_upside > 50:
-                intrinsic_value_class = "success"  # Deep value - more than 50% upside
-            elif graham_upside > 20:
-                intrinsic_value_class = "primary"  # Good value - 20-50% upside
-            elif graham_upside > 0:
-                intrinsic_value_class = "warning"  # Fair value - 0-20% upside
-            else:
-                intrinsic_value_class = "danger"   # Overvalued - negative upside (downside)
+    return process_financial_batch([ticker], [data])[0]
+
+# Process financial data for many tickers, computing the valuation metrics in one vectorized pass.
+# A ticker whose data cannot be processed gets None instead of failing the whole batch
+def process_financial_batch(tickers, datas):
+    try:
+        return _process_financial_batch(tickers, datas)
+    except Exception as e:
+        if len(tickers) == 1:
+            logger.error(f"Error processing {tickers[0]}: {str(e)}")
+            return [None]
+        logger.error(f"Error processing a batch of {len(tickers)} tickers, processing them one by one: {str(e)}")
     
-    # If actual EPS not available, fall back to estimate from EBIT
-    elif ebit is not None and market_cap is not None and market_cap > 0:
-        # Estimate EPS from EBIT (rough approximation)
-        shares_outstanding = market_cap / current_price if current_price and current_price > 0 else None
-        
-        if shares_outstanding and shares_outstanding > 0:
-            estimated_eps = ebit * 0.7 / shares_outstanding  # 0.7 factor for taxes approximation
-            estimated_growth = earnings_growth if isinstance(earnings_growth, (int, float)) else 0.05
-            
-            # Convert growth to percentage if it's in decimal form (0.05 -> 5.0)
-            if estimated_growth < 1:
-                estimated_growth = estimated_growth * 100
-                
-            # Cap growth rate at 15% for Graham formula
-            estimated_growth = min(estimated_growth, 15.0)
-            
-            # Graham's formula for intrinsic value
-            aaa_yield = 4.5  # Current approximate AAA corporate bond yield
-            graham_value = estimated_eps * (8.5 + 2 * (estimated_growth / 100)) * 4.4 / aaa_yield
-            
-            # Calculate potential upside/downside
-            if current_price and current_price > 0:
-                graham_upside = ((graham_value / current_price) - 1) * 100
-                
-                # Set color class based on upside potential
-                if graham_upside > 50:
-                    intrinsic_value_class = "success"  # Deep value - more than 50% upside
-                elif graham_upside > 20:
-                    intrinsic_value_class = "primary"  # Good value - 20-50% upside
-                elif graham_upside > 0:
-                    intrinsic_value_class = "warning"  # Fair value - 0-20% upside
-                else:
-                    intrinsic_value_class = "danger"   # Overvalued - negative upside (downside)
+    # Process the tickers separately, so the one with malformed data can be skipped
+    results = []
+    for ticker, data in zip(tickers, datas):
+        try:
+            results.extend(_process_financial_batch([ticker], [data]))
+        except Exception as e:
+            logger.error(f"Error processing {ticker}: {str(e)}")
+            results.append(None)
+    return results
+
+def _process_financial_batch(tickers, datas):
+    from metrics_engine import records_to_frame, compute_metrics, metrics_to_rows
+    from stock_predictor import predict_price_movements
     
-    # 1. Calculate Price-to-Book Ratio (Graham Principle #1)
-    price_to_book = None
-    price_to_book_class = "secondary"  # Default color class
+    valid = [i for i, data in enumerate(datas) if 'error' not in data]
+    results = [None] * len(datas)
+    if not valid:
+        return results
     
-    if current_price and book_value_per_share and book_value_per_share > 0:
-        price_to_book = current_price / book_value_per_share
-        # Color coding based on Graham's criteria: <1.5 is good value
-        if price_to_book < 1.0:
-            price_to_book_class = "success"  # Green - Excellent value
-        elif price_to_book < 1.5:
-            price_to_book_class = "primary"  # Blue - Good value
-        elif price_to_book < 2.5:
-            price_to_book_class = "warning"  # Yellow - Fair value
-        else:
-            price_to_book_class = "danger"   # Red - Poor value
+    # Calculate EV, earnings yield, ROC, Graham value and ratios for all tickers at once
+    with timed('process.metrics'):
+        frame = records_to_frame([datas[i] for i in valid])
+        metric_frame = compute_metrics(frame)
+        metrics = metrics_to_rows(metric_frame)
     
-    # 2. Calculate Current Ratio (Graham Principle #2)
-    current_ratio = None
-    current_ratio_class = "secondary"  # Default color class
+    # Make price predictions (30-day forecast period) for every ticker with enough history in one pass
+    histories = {}
+    for i in valid:
+        historical_data = datas[i].get('historical_data')
+        if historical_data is not None and not historical_data.empty and len(historical_data) >= 60:
+            histories[tickers[i]] = historical_data
+    with timed('process.prediction'):
+        predictions = predict_price_movements(histories, forecast_period=30) if histories else {}
     
-    if current_assets and current_liabilities and current_liabilities > 0:
-        current_ratio = current_assets / current_liabilities
-        # Color coding based on Graham's criteria: >2 is excellent, >1.5 is good
-        if current_ratio > 2.0:
-            current_ratio_class = "success"  # Green - Excellent financial health
-        elif current_ratio > 1.5:
-            current_ratio_class = "primary"  # Blue - Good financial health
-        elif current_ratio > 1.0:
-            current_ratio_class = "warning"  # Yellow - Adequate financial health
-        else:
-            current_ratio_class = "danger"   # Red - Poor financial health
+    # Categorize every ticker with the Lynch rule engine in one pass
+    lynch_analyses = classify_lynch([tickers[i] for i in valid], [datas[i] for i in valid], frame, metric_frame)
     
-    # 3. Calculate Debt-to-Equity Ratio (Graham Principle #3)
-    debt_to_equity = None
-    debt_to_equity_class = "secondary"  # Default color class
-    
-    if total_debt is not None and total_equity is not None and total_equity > 0:
-        debt_to_equity = total_debt / total_equity
-        # Color coding based on Graham's criteria: <0.5 is excellent, <1.0 is good
-        if debt_to_equity < 0.3:
-            debt_to_equity_class = "success"  # Green - Low leverage, excellent
-        elif debt_to_equity < 0.5:
-            debt_to_equity_class = "primary"  # Blue - Moderate leverage, good
-        elif debt_to_equity < 1.0:
-            debt_to_equity_class = "warning"  # Yellow - Higher leverage, acceptable
-        else:
-            debt_to_equity_class = "danger"   # Red - High leverage, poor
+    for i, ticker_metrics, lynch_analysis in zip(valid, metrics, lynch_analyses):
+        try:
+            with timed('process.result'):
+                results[i] = build_ticker_result(tickers[i], datas[i], ticker_metrics, predictions.get(tickers[i]),
+                                                 lynch_analysis)
+        except Exception as e:
+            logger.error(f"Error processing {tickers[i]}: {str(e)}")
     
-    # Make a Buy/Not Buy Decision based on Earnings Yield and Return on Capital
-    if earnings_yield is not None and return_on_capital is not None:
-        if earnings_yield > 40 and return_on_capital > 40:
-            buy_decision = "Not Buy"  # Too good to be true - potential trap
-            decision_class = "danger"
-        elif earnings_yield > 12 and return_on_capital > 15:
-            buy_decision = "Strong Buy"
-            decision_class = "success"
-        elif earnings_yield > 4 and return_on_capital > 8:
-            buy_decision = "Buy"
-            decision_class = "primary"
-        elif earnings_yield > 4 or return_on_capital > 8:
-            buy_decision = "Hold"
-            decision_class = "warning"
-        else:
-            buy_decision = "Not Buy"
-            decision_class = "danger"
-    else:
-        buy_decision = "Insufficient Data"
-        decision_class = "secondary"
+    return results
+
+# Calculate annual revenue growth from the income statement if possible
+def calculate_revenue_growth(data):
+    financials = data.get('financials')
+    if financials is not None and not financials.empty:
+        if 'Total Revenue' in financials.index:
+            revenues = financials.loc['Total Revenue']
+            if len(revenues) >= 2:
+                latest_revenue = revenues.iloc[0]
+                previous_revenue = revenues.iloc[1]
+                if previous_revenue and previous_revenue != 0:
+                    revenue_growth = ((latest_revenue / previous_revenue) - 1) * 100
+                    logger.debug(f"Revenue growth calculated: {revenue_growth:.2f}%")
+                    return revenue_growth
+    return None
+
+# Categorize many tickers and evaluate them against Lynch's checklist in one pass of the rule engine,
+# reusing the columns already built for the valuation metrics
+def classify_lynch(tickers, datas, frame, metric_frame):
+    import pandas as pd
+    from lynch_engine import classify_frame, classification_to_rows
     
-    # Apply Peter Lynch's categorization
-    lynch_analysis = None
     try:
-        # Calculate annual revenue growth if possible
-        revenue_growth = None
-        financials = data.get('financials')
-        if financials is not None and not financials.empty:
-            if 'Total Revenue' in financials.index:
-                revenues = financials.loc['Total Revenue']
-                if len(revenues) >= 2:
-                    latest_revenue = revenues.iloc[0]
-                    previous_revenue = revenues.iloc[1]
-                    if previous_revenue and previous_revenue != 0:
-                        revenue_growth = ((latest_revenue / previous_revenue) - 1) * 100
-                        logger.debug(f"Revenue growth calculated: {revenue_growth:.2f}%")
-        
-        # Prepare data for Lynch categorization
-        industry = data.get('industry')
-        sector = data.get('sector')
-        price_change_percent = data.get('price_change_percent')
-            
-        lynch_data = {
-            'ticker': ticker,
-            'market_cap': market_cap,
-            'earnings_growth': earnings_growth,
-            'revenue_growth': revenue_growth, 
-            'industry': industry,
-            'sector': sector,
-            'price_change_percent': price_change_percent,
-            'book_value_per_share': book_value_per_share,
-            'current_price': current_price,
-            'total_assets': total_assets,
-            'enterprise_value': enterprise_value,
-            'pe_ratio': None,
-            'peg_ratio': None,
-            'debt_to_equity': debt_to_equity
-        }
-        
-        # Calculate P/E ratio
-        if current_price is not None and trailing_eps is not None and trailing_eps != 0:
-            lynch_data['pe_ratio'] = current_price / trailing_eps
-            logger.debug(f"P/E ratio calculated: {lynch_data['pe_ratio']:.2f}")
-            
-        # Calculate PEG ratio
-        if lynch_data['pe_ratio'] is not None and earnings_growth is not None and earnings_growth != 0:
-            # Ensure earnings_growth is in percentage form for PEG calculation
-            growth_for_peg = earnings_growth
-            if isinstance(growth_for_peg, (int, float)) and growth_for_peg < 1:
-                growth_for_peg = growth_for_peg * 100
-            lynch_data['peg_ratio'] = lynch_data['pe_ratio'] / growth_for_peg
-            logger.debug(f"PEG ratio calculated: {lynch_data['peg_ratio']:.2f}")
-        
-        # Get Lynch categorization
-        lynch_analysis = categorize_stock(lynch_data)
-        logger.debug(f"Lynch category for {ticker}: {lynch_analysis['category']}")
-        
-        # Get detailed evaluation against Lynch's investment checklist
-        if lynch_analysis and 'category' in lynch_analysis:
-            try:
-                category = lynch_analysis['category']
-                from lynch_categories import evaluate_stock_against_checklist
-                checklist_evaluation = evaluate_stock_against_checklist(lynch_data, category)
-                
-                # Add evaluation results to the analysis
-                lynch_analysis['meets_criteria'] = checklist_evaluation.get('meets_criteria', [])
-                lynch_analysis['needs_attention'] = checklist_evaluation.get('needs_attention', [])
-                lynch_analysis['checklist_score'] = checklist_evaluation.get('overall_score', 0)
-                logger.debug(f"Lynch checklist score for {ticker}: {lynch_analysis['checklist_score']}")
-            except Exception as e:
-                logger.error(f"Error in Lynch checklist evaluation: {str(e)}")
-                
+        with timed('process.lynch'):
+            lynch_frame = pd.DataFrame({
+                'ticker': tickers,
+                'market_cap': frame['market_cap'],
+                'earnings_growth': frame['earnings_growth'],
+                'revenue_growth': [calculate_revenue_growth(data) for data in datas],
+                'industry': [data.get('industry') for data in datas],
+                'sector': [data.get('sector') for data in datas],
+                'price_change_percent': [data.get('price_change_percent') for data in datas],
+                'book_value_per_share': frame['book_value_per_share'],
+                'current_price': frame['current_price'],
+                'total_assets': frame['total_assets'],
+                'enterprise_value': metric_frame['enterprise_value'],
+                'pe_ratio': metric_frame['pe_ratio'],
+                'peg_ratio': metric_frame['peg_ratio'],
+                'debt_to_equity': metric_frame['debt_to_equity'],
+            })
+            analyses = classification_to_rows(classify_frame(lynch_frame))
     except Exception as e:
         logger.error(f"Error in Lynch categorization: {str(e)}")
-        lynch_analysis = {
+        return [{
             "category": "Unknown",
             "description": "Unable to categorize with available data",
             "key_metrics": [],
             "recommendations": ["Insufficient data to provide Lynch category recommendations"]
-        }
+        } for _ in tickers]
+    
+    for ticker, analysis in zip(tickers, analyses):
+        logger.debug(f"Lynch category for {ticker}: {analysis['category']}, checklist score {analysis['checklist_score']}")
+    return analyses
+
+# Build the result object for one ticker from its raw data and computed metrics
+def build_ticker_result(ticker, data, metrics, prediction_result=None, lynch_analysis=None):
+    # Extract the raw data needed for display
+    company_name = data['company_name']
+    currency = data['currency']
+    current_price = data['current_price']
+    dividend_yield = data['dividend_yield']
+    dividend_rate = data['dividend_rate']
+    
+    # Metrics computed by the vectorized engine
+    earnings_yield = metrics['earnings_yield']
+    traditional_earnings_yield = metrics['traditional_earnings_yield']
+    return_on_capital = metrics['return_on_capital']
+    magic_score = metrics['magic_score']
+    alpha_spreads_score = metrics['alpha_spreads_score']
+    graham_value = metrics['graham_value']
+    graham_upside = metrics['graham_upside']
+    intrinsic_value_class = metrics['intrinsic_value_class']
+    price_to_book = metrics['price_to_book']
+    price_to_book_class = metrics['price_to_book_class']
+    current_ratio = metrics['current_ratio']
+    current_ratio_class = metrics['current_ratio_class']
+    debt_to_equity = metrics['debt_to_equity']
+    debt_to_equity_class = metrics['debt_to_equity_class']
+    buy_decision = metrics['buy_decision']
+    decision_class = metrics['decision_class']
     
     # Make price prediction using machine learning model if historical data is available
     price_prediction = None
@@ -749,11 +534,8 @@ def process_financial_data(ticker, data):
     long_term_recommendation_class = "secondary"
     long_term_factors = []
     
-    historical_data = data.get('historical_data')
-    if historical_data is not None and not historical_data.empty and len(historical_data) >= 60:
+    if prediction_result is not None:
         try:
-            # Call the prediction function with 30-day forecast period
-            prediction_result = predict_price_movement(ticker, historical_data, forecast_period=30)
             price_prediction = prediction_result
             
             # Set color class based on prediction
@@ -794,46 +576,21 @@ def process_financial_data(ticker, data):
             long_term_recommendation_class = "secondary"
             long_term_factors = []
     
-    # Format values for display
-    formatted_current_price = format_currency(current_price, currency)
-    formatted_earnings_yield = f"{earnings_yield:.2f}%" if earnings_yield is not None else "N/A"
-    formatted_traditional_earnings_yield = f"{traditional_earnings_yield:.2f}%" if traditional_earnings_yield is not None else "N/A"
-    formatted_return_on_capital = f"{return_on_capital:.2f}%" if return_on_capital is not None else "N/A"
-    formatted_dividend_yield = f"{dividend_yield:.2f}%" if dividend_yield is not None else "N/A"
-    formatted_dividend_rate = format_currency(dividend_rate, currency) if dividend_rate is not None else "N/A"
-    formatted_alpha_score = f"{alpha_spreads_score:.1f}" if alpha_spreads_score is not None else "N/A"
-    formatted_graham_value = format_currency(graham_value, currency) if graham_value is not None else "N/A"
-    formatted_graham_upside = f"{graham_upside:.1f}%" if graham_upside is not None else "N/A"
-    
-    # Format the Graham principle metrics
-    formatted_price_to_book = f"{price_to_book:.2f}" if price_to_book is not None else "N/A"
-    formatted_current_ratio = f"{current_ratio:.2f}" if current_ratio is not None else "N/A"
-    formatted_debt_to_equity = f"{debt_to_equity:.2f}" if debt_to_equity is not None else "N/A"
-    
     # Create a simplified result object for batch processing
     result = {
         'ticker': ticker,
         'company_name': company_name,
+        'currency': currency,
         'current_price': current_price,
-        'formatted_current_price': formatted_current_price,
         'earnings_yield': earnings_yield,
-        'formatted_earnings_yield': formatted_earnings_yield,
         'traditional_earnings_yield': traditional_earnings_yield,
-        'formatted_traditional_earnings_yield': formatted_traditional_earnings_yield,
         'return_on_capital': return_on_capital,
-        'formatted_return_on_capital': formatted_return_on_capital,
         'dividend_yield': dividend_yield,
-        'formatted_dividend_yield': formatted_dividend_yield,
         'dividend_rate': dividend_rate,
-        'formatted_dividend_rate': formatted_dividend_rate,
         'magic_score': magic_score,
-        'formatted_magic_score': f"{magic_score:.1f}" if magic_score is not None else "N/A",
         'alpha_spreads_score': alpha_spreads_score,
-        'formatted_alpha_score': formatted_alpha_score,
         'graham_value': graham_value,
-        'formatted_graham_value': formatted_graham_value,
         'graham_upside': graham_upside,
-        'formatted_graham_upside': formatted_graham_upside,
         'intrinsic_value_class': intrinsic_value_class,
         
         # Add Lynch categorization data
@@ -847,15 +604,12 @@ def process_financial_data(ticker, data):
         
         # Add Graham's principles metrics
         'price_to_book': price_to_book,
-        'formatted_price_to_book': formatted_price_to_book,
         'price_to_book_class': price_to_book_class,
         
         'current_ratio': current_ratio,
-        'formatted_current_ratio': formatted_current_ratio,
         'current_ratio_class': current_ratio_class,
         
         'debt_to_equity': debt_to_equity,
-        'formatted_debt_to_equity': formatted_debt_to_equity,
         'debt_to_equity_class': debt_to_equity_class,
         
         'buy_decision': buy_decision,
@@ -873,20 +627,110 @@ def process_financial_data(ticker, data):
     
     return result
 
-# Helper function to format currency values
-def format_currency(value, currency='USD'):
-    if value is None:
-        return "N/A"
+# Fetch a single ticker for batch screens, returning None if no data could be retrieved
+def fetch_ticker_for_batch(ticker):
+    logger.info(f"Processing ticker: {ticker}")
+    data = fetch_financial_data(ticker)
+    
+    if 'error' in data:
+        # Skip tickers with errors
+        logger.error(f"Error retrieving data for {ticker}: {data['error']}")
+        return None
+    
+    return data
+
+# Fetch tickers concurrently and process them in one pass, keeping the input order
+def analyze_tickers(tickers):
+    from data_providers import data_provider
+    from bulk_history import download_histories
+    
+    # Download missing price history for the whole batch in a few bulk requests
+    if data_provider.supports_bulk:
+        data_cache.prefetch_histories(tickers, lambda group, start: download_histories(group, start=start))
+    
+    fetched = [(ticker, data) for ticker, data in zip(tickers, run_batch(tickers, fetch_ticker_for_batch)) if data]
+    if not fetched:
+        return []
+    
+    # Create simplified result objects with key metrics (in the analysis pool when enabled)
+    results = run_analysis(process_financial_batch, [ticker for ticker, _ in fetched], [data for _, data in fetched])
+    results = [result for result in results if result]
+    
+    # Keep the metrics for /api/screen
+    from screener import materialize_results
+    with timed('screen.materialize'):
+        materialize_results(results)
+    return results
+
+# Get results precomputed by the universe refresher that are still fresh, as copies callers may rank
+def precomputed_results(tickers):
+    return {ticker: dict(result) for ticker, result in data_cache.get_fresh_many(tickers, 'result').items()}
+
+# Screen tickers, reusing precomputed results and analyzing only the rest, keeping the input order
+def screen_tickers(tickers):
+    precomputed = precomputed_results(tickers)
+    remaining = [ticker for ticker in tickers if ticker.upper() not in precomputed]
+    if precomputed:
+        logger.info(f"Reusing precomputed results for {len(tickers) - len(remaining)} of {len(tickers)} tickers")
     
-    # Format large numbers with B for billions, M for millions, etc.
-    if abs(value) >= 1_000_000_000:
-        return f"{currency} {value/1_000_000_000:.2f}B"
-    elif abs(value) >= 1_000_000:
-        return f"{currency} {value/1_000_000:.2f}M"
-    elif abs(value) >= 1_000:
-        return f"{currency} {value/1_000:.2f}K"
-    else:
-        return f"{currency} {value:.2f}"
+    analyzed = {result['ticker']: result for result in analyze_tickers(remaining)} if remaining else {}
+    results = []
+    for ticker in tickers:
+        result = precomputed.get(ticker.upper()) or analyzed.get(ticker)
+        if result:
+            results.append(result)
+    return results
+
+# Background screening jobs run the same fetch-and-process pipeline
+job_queue.init_app(app, screen_tickers)
+
+# Command running the universe refresher as a separate local process: flask --app main refresh-universe
+@app.cli.command('refresh-universe')
+@click.option('--once', is_flag=True, help='Run a single refresh pass and exit')
+@click.option('--interval', type=float, default=None, help='Seconds between the starts of two passes')
+@click.option('--universe-file', default=None, help='File listing extra tickers to refresh')
+@click.option('--rate', type=float, default=None, help='Upstream calls per second the refresher may spend')
+def refresh_universe_command(once, interval, universe_file, rate):
+    import refresher
+    
+    init_db()
+    # Refresh synchronously instead of serving stale entries while revalidating in the background
+    data_cache.stale_while_revalidate = False
+    summary = refresher.run_refresher(
+        app, analyze_tickers, lambda ticker, result: data_cache.store(ticker, 'result', result),
+        once=once,
+        interval=refresher.REFRESH_INTERVAL if interval is None else interval,
+        path=universe_file or refresher.UNIVERSE_FILE,
+        rate=refresher.REFRESH_RATE_LIMIT if rate is None else rate,
+    )
+    if summary:
+        click.echo(f"Refreshed {summary['refreshed']} of {summary['tickers']} tickers in {summary['seconds']}s")
+
+# Fetch and process tickers concurrently, yielding each result as soon as it is ready
+# (precomputed results first)
+def iter_screen_tickers(tickers):
+    precomputed = precomputed_results(tickers)
+    for ticker in tickers:
+        if ticker.upper() in precomputed:
+            yield precomputed[ticker.upper()]
+    
+    remaining = [ticker for ticker in tickers if ticker.upper() not in precomputed]
+    for ticker, data in iter_batch(remaining, fetch_ticker_for_batch):
+        if not data:
+            continue
+        
+        result = process_financial_batch([ticker], [data])[0]
+        if result:
+            yield result
+
+# Format a Server-Sent Event
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(make_json_safe(payload))}\n\n"
+
+# Make the streaming batch limit available to the form
+@app.context_processor
+def inject_batch_limits():
+    return {'stream_max_tickers': max_batch_size()}
 
 # Route to display the results
 @app.route('/', methods=['GET', 'POST'])
@@ -908,104 +752,291 @@ def index():
                 tickers = [t.strip().upper() for t in tickers if t.strip()]
                 
                 if tickers:
-                    # Limit the number of tickers to process to avoid timeouts
-                    MAX_TICKERS = 10
-                    if len(tickers) > MAX_TICKERS:
-                        tickers = tickers[:MAX_TICKERS]
-                        warning_message = f"Processing only the first {MAX_TICKERS} tickers to avoid timeout. Please process the rest in another batch."
-                    else:
-                        warning_message = None
+                    # Screens too large to finish within the request run as background jobs
+                    # (the job view warns about tickers beyond the job limit)
+                    if len(tickers) > max_batch_size():
+                        skipped = {}
+                        if len(tickers) > JOB_MAX_TICKERS:
+                            skipped = {'skipped': len(tickers) - JOB_MAX_TICKERS}
+                            tickers = tickers[:JOB_MAX_TICKERS]
+                        job_id = job_queue.submit(tickers)
+                        return redirect(url_for('view_job', job_id=job_id, **skipped))
                         
                     logger.info(f"Processing batch request for {len(tickers)} tickers")
-                    batch_results = []
                     
-                    for ticker in tickers:
-                        # Short delay to avoid API rate limits
-                        time.sleep(0.1)
-                        
-                        logger.info(f"Processing ticker: {ticker}")
-                        try:
-                            data = fetch_financial_data(ticker)
-                            
-                            if 'error' in data:
-                                # Skip tickers with errors
-                                logger.error(f"Error retrieving data for {ticker}: {data['error']}")
-                                continue
-                            
-                            # Create simplified result object with key metrics
-                            ticker_result = process_financial_data(ticker, data)
-                            if ticker_result:
-                                batch_results.append(ticker_result)
-                                
-                        except Exception as e:
-                            logger.error(f"Error processing {ticker}: {str(e)}")
+                    batch_results = screen_tickers(tickers)
                     
                     if not batch_results:
                         error_message = "Could not retrieve valid data for any of the provided tickers."
                     
                     # Apply Magic Formula ranking to batch results
-                    if batch_results:
-                        # Create two separate rankings (higher is better for both metrics)
-                        earnings_yield_ranking = sorted(batch_results, key=lambda x: x.get('earnings_yield') if x.get('earnings_yield') is not None else -1, reverse=True)
-                        roc_ranking = sorted(batch_results, key=lambda x: x.get('return_on_capital') if x.get('return_on_capital') is not None else -1, reverse=True)
-                        
-                        # Create a dictionary to hold the rankings
-                        ey_rank_dict = {}
-                        roc_rank_dict = {}
-                        
-                        # Assign Earnings Yield rank (1 is best)
-                        for i, stock in enumerate(earnings_yield_ranking):
-                            ey_rank_dict[stock['ticker']] = i + 1
-                            
-                        # Assign Return on Capital rank (1 is best)
-                        for i, stock in enumerate(roc_ranking):
-                            roc_rank_dict[stock['ticker']] = i + 1
-                        
-                        # Calculate combined rank and add to each stock
-                        for stock in batch_results:
-                            ticker = stock['ticker']
-                            ey_rank = ey_rank_dict.get(ticker, len(batch_results))
-                            roc_rank = roc_rank_dict.get(ticker, len(batch_results))
-                            
-                            # The combined rank is the sum of the two ranks (lower is better)
-                            combined_rank = ey_rank + roc_rank
-                            stock['magic_rank'] = combined_rank
-                            stock['ey_rank'] = ey_rank
-                            stock['roc_rank'] = roc_rank
-                        
-                        # Sort by Magic Formula rank (lower is better)
-                        batch_results = sorted(batch_results, key=lambda x: x.get('magic_rank', 999))
+                    from ranking import rank_results
+                    batch_results = rank_results(batch_results)
                     
                     # Return with batch results
-                    return render_template('index.html', 
-                                          batch_results=batch_results, 
-                                          error_message=error_message,
-                                          warning_message=warning_message)
+                    with timed('render.batch'):
+                        return render_template('index.html', 
+                                              batch_results=batch_results, 
+                                              error_message=error_message,
+                                              warning_message=warning_message)
     
     # Default view - just show the form
     return render_template('index.html', error_message=error_message)
 
+# Route to display the progress or results of a background screening job
+@app.route('/jobs/<job_id>', methods=['GET'])
+def view_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return render_template('index.html', error_message="Screening job not found."), 404
+    
+    # Tickers left out of the job when it was submitted
+    warning_message = None
+    skipped = request.args.get('skipped', type=int)
+    if skipped:
+        warning_message = f"Screening only the first {JOB_MAX_TICKERS} tickers; {skipped} more were not included. Please process the rest in another batch."
+    
+    if job['status'] == 'done':
+        return render_template('index.html',
+                              batch_results=job['results'],
+                              error_message=job['error'],
+                              warning_message=warning_message)
+    
+    if job['status'] == 'failed':
+        return render_template('index.html', error_message=f"Screening job failed: {job['error']}",
+                              warning_message=warning_message)
+    
+    return render_template('index.html', job=job, warning_message=warning_message)
+
+# Route to submit a background screening job
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    payload = request.get_json(silent=True) or {}
+    tickers = payload.get('tickers', [])
+    if isinstance(tickers, str):
+        tickers = re.split(r'[,\s\n]+', tickers)
+    tickers = [t.strip().upper() for t in tickers if t and t.strip()]
+    
+    if not tickers:
+        return jsonify({'success': False, 'error': 'No tickers provided'}), 400
+    
+    if len(tickers) > JOB_MAX_TICKERS:
+        return jsonify({
+            'success': False,
+            'error': f'At most {JOB_MAX_TICKERS} tickers can be processed in one job'
+        }), 400
+    
+    job_id = job_queue.submit(tickers)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('get_job_status', job_id=job_id)
+    }), 202
+
+# Route to poll the status and partial results of a background screening job;
+# offset is the number of results the client already has, and the new ones are
+# also sent as table rows (html) so the job page can append them
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    offset = request.args.get('offset', 0, type=int)
+    job = job_queue.get(job_id, offset=max(0, offset))
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    # Finished jobs hold the ranked table, which the job page reloads to show
+    html = row_cache.render_many(job['results']) if job['status'] in ('queued', 'running') else ''
+    return jsonify({'success': True, 'data': job, 'html': html})
+
+# Kinds of cached upstream data a /api/stock response is built from
+STOCK_DATA_KINDS = ('info', 'financials', 'balance_sheet', 'dividends', 'history')
+
+# Compute the HTTP validators of a /api/stock response from the times its data was fetched.
+# Returns (etag, last_modified, cache_control, fresh), or None if any kind is not cached yet
+def stock_validators(ticker, variant):
+    from datetime import datetime
+    
+    times = data_cache.fetched_times(ticker, STOCK_DATA_KINDS)
+    if len(times) < len(STOCK_DATA_KINDS):
+        return None
+    
+    now = datetime.utcnow()
+    max_age = min(data_cache.ttls.get(kind, 0) - (now - times[kind]).total_seconds() for kind in STOCK_DATA_KINDS)
+    etag = make_etag(ticker, *variant, *(times[kind].isoformat() for kind in STOCK_DATA_KINDS))
+    return etag, max(times.values()), max_age_cache_control(max_age), max_age > 0
+
+# Route to get the raw financial data of a ticker; frames are sent as column arrays.
+# Query parameters: fields (comma separated keys to include), float32 (round frame
+# values to float32) and delta (delta-encode frame timestamps). Responses carry an
+# ETag and Last-Modified derived from when the data was fetched, and max-age follows
+# the shortest remaining TTL of the kinds involved
 @app.route('/api/stock/<ticker>', methods=['GET'])
 def get_stock_data(ticker):
     ticker = ticker.strip().upper()
     if not ticker:
         return jsonify({'error': 'No ticker provided'}), 400
     
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or None
+    float32 = request.args.get('float32', '').lower() in ('1', 'true', 'yes')
+    delta_timestamps = request.args.get('delta', '').lower() in ('1', 'true', 'yes')
+    variant = (','.join(fields or ()), float32, delta_timestamps)
+    
+    # Answer revalidations from the cache timestamps alone while every kind is fresh;
+    # stale data goes through fetch_financial_data so it gets refreshed
+    validators = stock_validators(ticker, variant)
+    if validators and validators[3] and is_not_modified(*validators[:2]):
+        return not_modified_response(*validators[:3])
+    
     data = fetch_financial_data(ticker)
     if 'error' in data:
         return jsonify({'error': data['error']}), 400
     
-    return jsonify(data)
+    if fields:
+        unknown = [field for field in fields if field not in data]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    
+    # The fetch may have refreshed some kinds; without a complete set (sample data) nothing is validated
+    validators = stock_validators(ticker, variant)
+    if validators and is_not_modified(*validators[:2]):
+        return not_modified_response(*validators[:3])
+    
+    with timed('render.stock_json'):
+        payload = dumps(encode_stock_data(data, fields, float32=float32, delta_timestamps=delta_timestamps))
+    response = Response(payload, mimetype='application/json')
+    if validators is None:
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return set_validators(response, *validators[:3])
 
-# Route to get saved ticker lists
+# Route to screen a batch of tickers and return them ranked by the Magic Formula
+@app.route('/api/batch', methods=['POST'])
+def screen_batch():
+    payload = request.get_json(silent=True) or {}
+    tickers = payload.get('tickers', [])
+    if isinstance(tickers, str):
+        tickers = re.split(r'[,\s\n]+', tickers)
+    tickers = [t.strip().upper() for t in tickers if t and t.strip()]
+    
+    if not tickers:
+        return jsonify({'success': False, 'error': 'No tickers provided'}), 400
+    
+    max_tickers = max_batch_size()
+    if len(tickers) > max_tickers:
+        return jsonify({
+            'success': False,
+            'error': f'At most {max_tickers} tickers can be processed in one request'
+        }), 400
+    
+    top = payload.get('top')
+    try:
+        top = int(top) if top is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'top must be an integer'}), 400
+    
+    from ranking import rank_results
+    results = rank_results(screen_tickers(tickers), top_k=top)
+    return jsonify({'success': True, 'data': make_json_safe(results)})
+
+# Route to screen the materialized metrics in SQL, e.g.
+# /api/screen?earnings_yield_gt=8&return_on_capital_gt=20&sort=magic_rank
+@app.route('/api/screen', methods=['GET'])
+def screen_materialized():
+    from screener import parse_screen_args, query_screen, ScreenQueryError
+    
+    try:
+        options = parse_screen_args(request.args)
+    except ScreenQueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    with timed('screen.query'):
+        screen = query_screen(**options)
+    return jsonify({
+        'success': True,
+        'as_of': screen['as_of'],
+        'total': screen['total'],
+        'offset': options['offset'],
+        'limit': options['limit'],
+        'data': screen['results']
+    })
+
+# Route to stream batch results as Server-Sent Events: one 'row' event per ticker
+# as soon as it is processed, then a 'ranking' event with the ranked table
+@app.route('/api/batch/stream', methods=['GET'])
+def stream_batch():
+    tickers = re.split(r'[,\s\n]+', request.args.get('tickers', ''))
+    tickers = [t.strip().upper() for t in tickers if t.strip()]
+    
+    if not tickers:
+        return jsonify({'success': False, 'error': 'No tickers provided'}), 400
+    
+    max_tickers = max_batch_size()
+    if len(tickers) > max_tickers:
+        return jsonify({
+            'success': False,
+            'error': f'At most {max_tickers} tickers can be processed in one request'
+        }), 400
+    
+    def generate():
+        results = []
+        for result in iter_screen_tickers(tickers):
+            results.append(result)
+            with timed('render.row'):
+                html = row_cache.render(result)
+            yield format_sse('row', {
+                'ticker': result['ticker'],
+                'completed': len(results),
+                'total': len(tickers),
+                'html': html
+            })
+        
+        from screener import materialize_results
+        with timed('screen.materialize'):
+            materialize_results(results)
+        
+        # Ranks depend on the whole batch, so the ranked rows are sent once at the end
+        from ranking import rank_results
+        batch_results = rank_results(results)
+        yield format_sse('ranking', {
+            'count': len(batch_results),
+            'error': None if batch_results else "Could not retrieve valid data for any of the provided tickers.",
+            'html': row_cache.render_many(batch_results),
+            'summary': render_template('_batch_summary.html', batch_results=batch_results) if batch_results else ''
+        })
+    
+    logger.info(f"Streaming batch request for {len(tickers)} tickers")
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Route to expose the state of the upstream rate limiter and circuit breaker
+@app.route('/api/upstream-status', methods=['GET'])
+def get_upstream_status():
+    return jsonify({'success': True, 'data': upstream_state()})
+
+# Route to expose request-path metrics in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not METRICS_ENABLED:
+        return jsonify({'success': False, 'error': 'Metrics are disabled'}), 404
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Route to get saved ticker lists. The ETag covers the number of lists, the newest id
+# and the latest update, so it also changes on deletes, which Last-Modified cannot show
 @app.route('/api/ticker-lists', methods=['GET'])
 def get_ticker_lists():
     try:
+        count, last_id, last_modified = db.session.query(
+            db.func.count(TickerList.id), db.func.max(TickerList.id), db.func.max(TickerList.updated_at)
+        ).one()
+        etag = make_etag('ticker-lists', count, last_id, last_modified.isoformat() if last_modified else '')
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
         ticker_lists = TickerList.query.order_by(TickerList.name).all()
-        return jsonify({
+        response = jsonify({
             'success': True,
             'data': [{'id': lst.id, 'name': lst.name, 'tickers': lst.tickers} for lst in ticker_lists]
         })
+        return set_validators(response, etag, last_modified)
     except Exception as e:
         logger.error(f"Error fetching ticker lists: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,239 @@
+"""
+Vectorized Metrics Engine Module
+
+This module computes the Magic Formula, Graham and AlphaSpreads metrics for
+many tickers at once. Inputs are one column per financial field (a DataFrame
+with one row per ticker), and every metric and color class is calculated with
+masked NumPy operations instead of per-ticker if/elif chains.
+
+The rules mirror process_financial_data exactly. Missing values are
+represented as NaN, so a NaN input is treated the same way as None.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Raw fields read from fetch_financial_data output
+INPUT_FIELDS = [
+    'market_cap', 'ebit', 'total_debt', 'cash', 'nwc', 'net_fixed_assets',
+    'current_price', 'dividend_yield', 'current_assets', 'current_liabilities',
+    'total_assets', 'total_equity', 'book_value_per_share', 'trailing_eps',
+    'earnings_growth', 'net_income',
+]
+
+# Current approximate AAA corporate bond yield used in Graham's formula
+AAA_YIELD = 4.5
+
+# Default growth rate used when none is available
+DEFAULT_GROWTH = 0.05
+
+
+def _as_float(value):
+    if value is None or isinstance(value, str):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def records_to_frame(records):
+    """
+    Build the columnar input for compute_metrics from fetch_financial_data dicts.
+
+    Args:
+        records (list): fetch_financial_data outputs, one per ticker
+
+    Returns:
+        pd.DataFrame: One float64 column per input field, NaN for missing values
+    """
+    return pd.DataFrame(
+        {field: np.array([_as_float(record.get(field)) for record in records], dtype=np.float64)
+         for field in INPUT_FIELDS}
+    )
+
+
+def _truthy(values):
+    """Vectorized equivalent of `if value:` for optional numbers."""
+    return ~np.isnan(values) & (values != 0)
+
+
+def _classify(values, thresholds, labels, default, descending=True):
+    """Map values to color classes using ordered threshold checks."""
+    if descending:
+        conditions = [values > threshold for threshold in thresholds]
+    else:
+        conditions = [values < threshold for threshold in thresholds]
+    return np.where(np.isnan(values), "secondary", np.select(conditions, labels, default))
+
+
+def _graham_value(eps, growth):
+    """Graham's formula: Value = EPS x (8.5 + 2g) x 4.4 / Y."""
+    growth = np.where(growth < 1, growth * 100, growth)
+    growth = np.minimum(growth, 15.0)
+    return eps * (8.5 + 2 * (growth / 100)) * 4.4 / AAA_YIELD
+
+
+def compute_metrics(frame):
+    """
+    Compute valuation metrics and color classes for every row of a frame.
+
+    Args:
+        frame (pd.DataFrame): One column per field in INPUT_FIELDS, one row per ticker
+
+    Returns:
+        pd.DataFrame: Metrics and color classes, aligned with the input rows
+    """
+    col = {field: frame[field].to_numpy(dtype=np.float64) for field in INPUT_FIELDS}
+    market_cap = col['market_cap']
+    ebit = col['ebit']
+    current_price = col['current_price']
+    nan = np.full(len(frame), np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Enterprise Value (NaN propagates when any component is missing)
+        enterprise_value = market_cap + col['total_debt'] - col['cash']
+
+        # Earnings Yield (EBIT/EV) - Key Magic Formula Metric #1
+        earnings_yield = np.where(_truthy(enterprise_value) & ~np.isnan(ebit),
+                                  (ebit / enterprise_value) * 100, nan)
+
+        # Invested Capital = Total Assets - Current Liabilities, with fallbacks
+        total_assets = col['total_assets']
+        current_liabilities = col['current_liabilities']
+        net_fixed_assets = col['net_fixed_assets']
+        nwc = col['nwc']
+        invested_capital = np.select(
+            [~np.isnan(total_assets) & ~np.isnan(current_liabilities),
+             _truthy(net_fixed_assets) & _truthy(nwc),
+             _truthy(net_fixed_assets),
+             _truthy(nwc)],
+            [total_assets - current_liabilities,
+             net_fixed_assets + nwc,
+             net_fixed_assets,
+             nwc],
+            np.nan,
+        )
+
+        # Return on Capital (EBIT/Invested Capital) - Key Magic Formula Metric #2
+        return_on_capital = np.where(_truthy(invested_capital) & ~np.isnan(ebit),
+                                     (ebit / invested_capital) * 100, nan)
+
+        # Magic Formula score (NaN unless both factors are available)
+        magic_score = (earnings_yield / 2) + (return_on_capital / 2)
+
+        # Traditional Earnings Yield (Net Income/Market Cap)
+        net_income = col['net_income']
+        traditional_earnings_yield = np.where((market_cap > 0) & ~np.isnan(net_income),
+                                              (net_income / market_cap) * 100, nan)
+
+        # AlphaSpreads score - earnings yield relative to dividend yield
+        dividend_yield = col['dividend_yield']
+        earnings_to_dividend_ratio = earnings_yield / np.maximum(dividend_yield, 0.1)
+        alpha_spreads_score = np.where(
+            ~np.isnan(earnings_yield) & ~np.isnan(dividend_yield),
+            np.where(earnings_to_dividend_ratio > 3,
+                     np.minimum(100, earnings_to_dividend_ratio * 10),
+                     earnings_to_dividend_ratio * 20),
+            nan,
+        )
+
+        # Graham intrinsic value, from trailing EPS or estimated from EBIT
+        growth = np.where(np.isnan(col['earnings_growth']), DEFAULT_GROWTH, col['earnings_growth'])
+        positive_price = _truthy(current_price) & (current_price > 0)
+        trailing_eps = col['trailing_eps']
+        uses_eps = ~np.isnan(trailing_eps) & positive_price
+        shares_outstanding = np.where(positive_price, market_cap / current_price, nan)
+        uses_ebit = (~uses_eps & ~np.isnan(ebit) & (market_cap > 0) & (shares_outstanding > 0))
+        estimated_eps = ebit * 0.7 / shares_outstanding  # 0.7 factor for taxes approximation
+
+        graham_value = np.select(
+            [uses_eps, uses_ebit],
+            [_graham_value(trailing_eps, growth), _graham_value(estimated_eps, growth)],
+            np.nan,
+        )
+        graham_upside = np.where(uses_eps | uses_ebit, ((graham_value / current_price) - 1) * 100, nan)
+
+        # Price-to-Book Ratio (Graham Principle #1)
+        book_value_per_share = col['book_value_per_share']
+        price_to_book = np.where(_truthy(current_price) & (book_value_per_share > 0),
+                                 current_price / book_value_per_share, nan)
+
+        # Current Ratio (Graham Principle #2)
+        current_assets = col['current_assets']
+        current_ratio = np.where(_truthy(current_assets) & (current_liabilities > 0),
+                                 current_assets / current_liabilities, nan)
+
+        # Debt-to-Equity Ratio (Graham Principle #3)
+        total_debt = col['total_debt']
+        total_equity = col['total_equity']
+        debt_to_equity = np.where(~np.isnan(total_debt) & (total_equity > 0),
+                                  total_debt / total_equity, nan)
+
+        # P/E and PEG ratios used by the Lynch categorization
+        pe_ratio = np.where(~np.isnan(current_price) & _truthy(trailing_eps),
+                            current_price / trailing_eps, nan)
+        raw_growth = col['earnings_growth']
+        growth_for_peg = np.where(raw_growth < 1, raw_growth * 100, raw_growth)
+        peg_ratio = np.where(~np.isnan(pe_ratio) & _truthy(raw_growth),
+                             pe_ratio / growth_for_peg, nan)
+
+    # Buy/Not Buy decision based on Earnings Yield and Return on Capital
+    has_both = ~np.isnan(earnings_yield) & ~np.isnan(return_on_capital)
+    decision_conditions = [
+        (earnings_yield > 40) & (return_on_capital > 40),  # Too good to be true - potential trap
+        (earnings_yield > 12) & (return_on_capital > 15),
+        (earnings_yield > 4) & (return_on_capital > 8),
+        (earnings_yield > 4) | (return_on_capital > 8),
+    ]
+    buy_decision = np.where(has_both, np.select(decision_conditions, ["Not Buy", "Strong Buy", "Buy", "Hold"], "Not Buy"),
+                            "Insufficient Data")
+    decision_class = np.where(has_both, np.select(decision_conditions, ["danger", "success", "primary", "warning"], "danger"),
+                              "secondary")
+
+    return pd.DataFrame({
+        'enterprise_value': enterprise_value,
+        'earnings_yield': earnings_yield,
+        'traditional_earnings_yield': traditional_earnings_yield,
+        'return_on_capital': return_on_capital,
+        'magic_score': magic_score,
+        'alpha_spreads_score': alpha_spreads_score,
+        'graham_value': graham_value,
+        'graham_upside': graham_upside,
+        'intrinsic_value_class': _classify(graham_upside, [50, 20, 0], ["success", "primary", "warning"], "danger"),
+        'price_to_book': price_to_book,
+        'price_to_book_class': _classify(price_to_book, [1.0, 1.5, 2.5], ["success", "primary", "warning"], "danger",
+                                         descending=False),
+        'current_ratio': current_ratio,
+        'current_ratio_class': _classify(current_ratio, [2.0, 1.5, 1.0], ["success", "primary", "warning"], "danger"),
+        'debt_to_equity': debt_to_equity,
+        'debt_to_equity_class': _classify(debt_to_equity, [0.3, 0.5, 1.0], ["success", "primary", "warning"], "danger",
+                                          descending=False),
+        'buy_decision': buy_decision,
+        'decision_class': decision_class,
+        'pe_ratio': pe_ratio,
+        'peg_ratio': peg_ratio,
+    }, index=frame.index)
+
+
+def metrics_to_rows(metrics):
+    """
+    Convert a metrics frame into one dict per ticker, with None for missing values.
+
+    Args:
+        metrics (pd.DataFrame): Output of compute_metrics
+
+    Returns:
+        list: One dict of Python values per row
+    """
+    columns = {}
+    for name in metrics.columns:
+        values = metrics[name].tolist()
+        if metrics[name].dtype.kind == 'f':
+            values = [None if value != value else value for value in values]
+        columns[name] = values
+
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
@@ -1,4 +1,5 @@
 import os
+import json
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
@@ -18,4 +19,106 @@ class TickerList(db.Model):
     
     def get_tickers_list(self):
         """Return tickers as a list"""
-        return [ticker.strip() for ticker in self.tickers.split(',')]
\ No newline at end of file
+        return [ticker.strip() for ticker in self.tickers.split(',')]
+
+class CachedPayload(db.Model):
+    """Model for persisted upstream responses used by the data cache"""
+    __table_args__ = (db.UniqueConstraint('ticker', 'kind', name='uq_cached_payload_ticker_kind'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    ticker = db.Column(db.String(20), nullable=False, index=True)
+    kind = db.Column(db.String(32), nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<CachedPayload {self.ticker}:{self.kind}>'
+
+
+class ScreenJob(db.Model):
+    """Model for background batch screening jobs"""
+    id = db.Column(db.String(36), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    tickers = db.Column(db.Text, nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    results = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ScreenJob {self.id} {self.status}>'
+
+    def get_tickers_list(self):
+        """Return tickers as a list"""
+        return [ticker.strip() for ticker in self.tickers.split(',') if ticker.strip()]
+
+    def get_results(self):
+        """Return the (partial) results as a list of dicts"""
+        return json.loads(self.results) if self.results else []
+
+
+class FetchLock(db.Model):
+    """Model for cross-worker locks held while one worker fetches a ticker from upstream"""
+    key = db.Column(db.String(64), primary_key=True)
+    owner = db.Column(db.String(128), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<FetchLock {self.key} {self.owner}>'
+
+
+class ScreenMetric(db.Model):
+    """Model for materialized screening metrics, one row per ticker per as-of date"""
+    __table_args__ = (
+        db.UniqueConstraint('ticker', 'as_of', name='uq_screen_metric_ticker_as_of'),
+        db.Index('ix_screen_metric_as_of_magic_rank', 'as_of', 'magic_rank'),
+        db.Index('ix_screen_metric_as_of_earnings_yield', 'as_of', 'earnings_yield'),
+        db.Index('ix_screen_metric_as_of_return_on_capital', 'as_of', 'return_on_capital'),
+        db.Index('ix_screen_metric_as_of_lynch_category', 'as_of', 'lynch_category'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ticker = db.Column(db.String(20), nullable=False)
+    as_of = db.Column(db.Date, nullable=False)
+    company_name = db.Column(db.String(200))
+    current_price = db.Column(db.Float)
+    earnings_yield = db.Column(db.Float)
+    return_on_capital = db.Column(db.Float)
+    magic_score = db.Column(db.Float)
+    graham_upside = db.Column(db.Float)
+    price_to_book = db.Column(db.Float)
+    current_ratio = db.Column(db.Float)
+    debt_to_equity = db.Column(db.Float)
+    lynch_category = db.Column(db.String(32))
+    checklist_score = db.Column(db.Float)
+    # Magic Formula ranks across every ticker of the same as-of date (NULL until re-ranked)
+    ey_rank = db.Column(db.Integer)
+    roc_rank = db.Column(db.Integer)
+    magic_rank = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ScreenMetric {self.ticker} {self.as_of}>'
+
+    def to_dict(self):
+        """Return the row as a JSON-friendly dict"""
+        return {
+            'ticker': self.ticker,
+            'as_of': self.as_of.isoformat(),
+            'company_name': self.company_name,
+            'current_price': self.current_price,
+            'earnings_yield': self.earnings_yield,
+            'return_on_capital': self.return_on_capital,
+            'magic_score': self.magic_score,
+            'graham_upside': self.graham_upside,
+            'price_to_book': self.price_to_book,
+            'current_ratio': self.current_ratio,
+            'debt_to_equity': self.debt_to_equity,
+            'lynch_category': self.lynch_category,
+            'checklist_score': self.checklist_score,
+            'ey_rank': self.ey_rank,
+            'roc_rank': self.roc_rank,
+            'magic_rank': self.magic_rank,
+        }
@@ -0,0 +1,99 @@
+"""
+Magic Formula Ranking Module
+
+This module ranks screened stocks using Joel Greenblatt's Magic Formula:
+every stock is ranked by earnings yield and by return on capital (1 is best),
+and the two ranks are added together to form the combined Magic Formula rank
+(lower is better).
+
+Ranks are computed with pandas' rank(method='min'), so tied values share the
+same rank, and missing values are always ranked last. When only the best few
+names are needed, argpartition selects them without sorting the whole universe.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _metric_rank(values):
+    """Rank values from highest to lowest (1 is best), NaN ranked last."""
+    series = pd.Series(values, dtype=np.float64)
+    return series.rank(ascending=False, method='min', na_option='bottom').to_numpy(dtype=np.int64)
+
+
+def compute_magic_ranks(earnings_yield, return_on_capital):
+    """
+    Compute Magic Formula ranks for a universe of stocks.
+
+    Args:
+        earnings_yield (array-like): Earnings yield per stock, NaN or None if missing
+        return_on_capital (array-like): Return on capital per stock, NaN or None if missing
+
+    Returns:
+        tuple: Arrays of earnings yield rank, return on capital rank and combined rank
+    """
+    ey = np.array([np.nan if value is None else value for value in earnings_yield], dtype=np.float64)
+    roc = np.array([np.nan if value is None else value for value in return_on_capital], dtype=np.float64)
+
+    ey_rank = _metric_rank(ey)
+    roc_rank = _metric_rank(roc)
+    return ey_rank, roc_rank, ey_rank + roc_rank
+
+
+def top_k_order(combined_rank, k=None):
+    """
+    Get the positions of the best-ranked stocks in rank order.
+
+    Ties are broken by original position, so the order is deterministic.
+
+    Args:
+        combined_rank (np.ndarray): Combined Magic Formula rank per stock
+        k (int): Number of stocks to return, None returns all of them
+
+    Returns:
+        np.ndarray: Positions into the input, best first
+    """
+    n = len(combined_rank)
+    if k is None or k >= n:
+        return np.argsort(combined_rank, kind='stable')
+
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+
+    # Select every stock that can make the top k (including ties at the cut-off)
+    cutoff = np.partition(combined_rank, k - 1)[k - 1]
+    candidates = np.flatnonzero(combined_rank <= cutoff)
+    order = candidates[np.argsort(combined_rank[candidates], kind='stable')]
+    return order[:k]
+
+
+def rank_results(results, top_k=None):
+    """
+    Add Magic Formula ranks to screened results and sort them best first.
+
+    Each result gets 'ey_rank', 'roc_rank' and 'magic_rank' keys.
+
+    Args:
+        results (list): Result dicts from process_financial_data
+        top_k (int): Only return the best top_k results
+
+    Returns:
+        list: Ranked results, best Magic Formula rank first
+    """
+    if not results:
+        return []
+
+    ey_rank, roc_rank, magic_rank = compute_magic_ranks(
+        [result.get('earnings_yield') for result in results],
+        [result.get('return_on_capital') for result in results],
+    )
+
+    for result, ey, roc, combined in zip(results, ey_rank.tolist(), roc_rank.tolist(), magic_rank.tolist()):
+        result['ey_rank'] = ey
+        result['roc_rank'] = roc
+        result['magic_rank'] = combined
+
+    return [results[i] for i in top_k_order(magic_rank, top_k)]
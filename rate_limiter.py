@@ -0,0 +1,293 @@
+"""
+Upstream Rate Limiting Module
+
+This module provides a thread-safe token-bucket rate limiter that is shared by
+every request made to Yahoo Finance. Instead of sleeping for a fixed amount of
+time before each call, callers acquire tokens from the bucket, which lets short
+bursts through immediately while keeping the sustained request rate under the
+configured limit.
+
+The sustained rate adapts to what Yahoo Finance allows (AIMD): it creeps up
+while calls succeed and is halved whenever a call is rate limited (HTTP 429).
+A circuit breaker stops upstream calls entirely after repeated 429s; while it
+is open, callers get UpstreamThrottled immediately and the data cache serves
+whatever it has, until a single probe call succeeds again.
+"""
+
+import os
+import threading
+import time
+import logging
+
+from telemetry import timed, upstream_calls, upstream_in_flight
+
+logger = logging.getLogger(__name__)
+
+# Sustained upstream requests per second and the size of the allowed burst
+FETCH_RATE_LIMIT = float(os.environ.get("FETCH_RATE_LIMIT", "20"))
+FETCH_BURST = int(os.environ.get("FETCH_BURST", "40"))
+
+# Bounds of the adaptive rate, the additive increase (requests per second gained
+# per second of successful calls) and the multiplicative decrease on a 429
+FETCH_RATE_MIN = float(os.environ.get("FETCH_RATE_MIN", "0.5"))
+FETCH_RATE_MAX = float(os.environ.get("FETCH_RATE_MAX", str(FETCH_RATE_LIMIT * 2)))
+FETCH_RATE_INCREASE = float(os.environ.get("FETCH_RATE_INCREASE", "0.5"))
+FETCH_RATE_DECREASE = float(os.environ.get("FETCH_RATE_DECREASE", "0.5"))
+
+# Consecutive 429s that open the circuit, and seconds it stays open before a probe
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_COOLDOWN = float(os.environ.get("CIRCUIT_COOLDOWN", "60"))
+CIRCUIT_MAX_COOLDOWN = float(os.environ.get("CIRCUIT_MAX_COOLDOWN", "900"))
+
+# Number of upstream calls made by a single fetch_financial_data run
+# (info, financials, balance sheet, dividends and price history)
+UPSTREAM_CALLS_PER_TICKER = 5
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by all fetch workers."""
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate (float): Tokens added to the bucket per second
+            capacity (int): Maximum number of tokens the bucket can hold
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until the requested number of tokens is available.
+
+        Args:
+            tokens (int): Number of tokens to take from the bucket
+            timeout (float): Maximum number of seconds to wait, None waits forever
+
+        Returns:
+            bool: True if the tokens were acquired, False on timeout
+        """
+        # Never ask for more than the bucket can ever hold
+        tokens = min(float(tokens), self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket whose rate grows additively on success and shrinks multiplicatively on throttling."""
+
+    def __init__(self, rate, capacity, min_rate=FETCH_RATE_MIN, max_rate=FETCH_RATE_MAX,
+                 increase=FETCH_RATE_INCREASE, decrease=FETCH_RATE_DECREASE):
+        super().__init__(rate, capacity)
+        self.min_rate = float(min_rate)
+        self.max_rate = max(float(max_rate), self.rate)
+        self.increase = float(increase)
+        self.decrease = float(decrease)
+        self._last_decrease = 0.0
+
+    def on_success(self):
+        """Raise the rate after a successful upstream call."""
+        with self._lock:
+            # Spread the increase over the calls made in one second at the current rate
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self):
+        """Cut the rate after a rate-limited upstream call."""
+        with self._lock:
+            now = time.monotonic()
+            # Calls already in flight fail together; count them as one signal
+            if now - self._last_decrease < 1.0 / self.rate:
+                return
+            self._last_decrease = now
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+            logger.warning(f"Upstream rate limited, reducing request rate to {self.rate:.2f}/s")
+
+    def state(self):
+        with self._lock:
+            self._refill()
+            return {'rate': round(self.rate, 3), 'tokens': round(self._tokens, 3),
+                    'min_rate': self.min_rate, 'max_rate': self.max_rate}
+
+
+class UpstreamThrottled(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too Many Requests: upstream circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stops upstream calls after repeated rate limiting and probes for recovery."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, cooldown=CIRCUIT_COOLDOWN,
+                 max_cooldown=CIRCUIT_MAX_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = float(cooldown)
+        self.max_cooldown = float(max_cooldown)
+        self.cooldown = self.base_cooldown
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        # Thread making the half-open probe; only its outcome closes or reopens the circuit
+        self._probe_thread = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Check whether an upstream call may be made.
+
+        Raises:
+            UpstreamThrottled: While the circuit is open, or a probe is already in flight
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if self._state == self.OPEN and remaining <= 0:
+                self._state = self.HALF_OPEN
+                logger.info("Upstream circuit half-open, probing")
+
+            if self._state == self.HALF_OPEN and self._probe_thread is None:
+                self._probe_thread = threading.get_ident()
+                return
+
+            raise UpstreamThrottled(max(remaining, 0.0))
+
+    def _is_probe(self):
+        return self._state == self.HALF_OPEN and self._probe_thread == threading.get_ident()
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                self._failures = 0
+                return
+            # Calls that started before the circuit opened and succeed late must not close it
+            if not self._is_probe():
+                return
+            logger.info("Upstream circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_thread = None
+            self.cooldown = self.base_cooldown
+
+    def record_throttle(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN:
+                if not self._is_probe():
+                    return
+                # The probe failed; stay open for longer
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self._state == self.OPEN or self._failures < self.failure_threshold:
+                return
+
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_thread = None
+            logger.warning(f"Upstream circuit open for {self.cooldown:.0f}s after {self._failures} rate-limited calls")
+
+    def record_failure(self):
+        """A call failed for a reason other than rate limiting."""
+        with self._lock:
+            # A failed probe must not leave the circuit stuck in half-open
+            if self._is_probe():
+                self._probe_thread = None
+
+    def state(self):
+        with self._lock:
+            retry_after = 0.0
+            if self._state == self.OPEN:
+                retry_after = max(0.0, self._opened_at + self.cooldown - time.monotonic())
+            return {'state': self._state, 'consecutive_throttles': self._failures,
+                    'cooldown': self.cooldown, 'retry_after': round(retry_after, 1)}
+
+
+def is_rate_limit_error(error):
+    """Check whether an exception means upstream rate limited us."""
+    if isinstance(error, UpstreamThrottled) or type(error).__name__ == 'YFRateLimitError':
+        return True
+    message = str(error)
+    return "Too Many Requests" in message or "Rate limited" in message or " 429" in message
+
+
+def record_upstream_result(error=None):
+    """Feed the outcome of an upstream call to the adaptive limiter and the circuit breaker."""
+    if error is None:
+        upstream_calls.inc('success')
+        upstream_limiter.on_success()
+        upstream_circuit.record_success()
+    elif is_rate_limit_error(error):
+        upstream_calls.inc('throttled')
+        upstream_limiter.on_throttle()
+        upstream_circuit.record_throttle()
+    else:
+        upstream_calls.inc('error')
+        upstream_circuit.record_failure()
+
+
+def upstream_call(loader):
+    """
+    Make one upstream call under the shared rate limiter and circuit breaker.
+
+    Args:
+        loader (callable): Function making the upstream call
+
+    Returns:
+        The loader's result
+
+    Raises:
+        UpstreamThrottled: If the circuit is open
+    """
+    upstream_circuit.before_call()
+    with timed('upstream.rate_limit_wait'):
+        upstream_limiter.acquire()
+    try:
+        with upstream_in_flight.track():
+            result = loader()
+    except Exception as e:
+        record_upstream_result(e)
+        raise
+    record_upstream_result()
+    return result
+
+
+def upstream_state():
+    """Current state of the adaptive limiter and the circuit breaker."""
+    return {'limiter': upstream_limiter.state(), 'circuit': upstream_circuit.state()}
+
+
+# Process-wide limiter and circuit breaker used for all Yahoo Finance traffic
+upstream_limiter = AdaptiveTokenBucket(FETCH_RATE_LIMIT, FETCH_BURST)
+upstream_circuit = CircuitBreaker()
@@ -0,0 +1,195 @@
+"""
+Universe Refresh Module
+
+This module keeps the screening universe warm from a separate process, so
+interactive screens mostly read precomputed results instead of fetching and
+analyzing tickers on demand. The universe is the union of every saved
+TickerList and a universe file (one or more tickers per line, separated by
+commas or spaces; '#' starts a comment).
+
+Each refresh pass walks the universe in chunks:
+1. Fundamentals and price history are brought up to date through the data
+   cache and the history store, synchronously (no stale-while-revalidate)
+2. The chunk is analyzed with the same pipeline as interactive screens
+   (metrics, Lynch categorization and price predictions) and the metrics are
+   materialized for /api/screen
+3. Every result is stored in the data cache as kind 'result', where
+   screen_tickers picks it up while it is fresh (CACHE_TTL_RESULT)
+
+Upstream calls are paced by a refresh budget of its own (REFRESH_RATE_LIMIT
+upstream calls per second), well below the interactive limit, on top of the
+shared adaptive limiter and circuit breaker. Passes can be restricted to
+off-peak hours with REFRESH_HOURS.
+
+Run it as a local process next to the web workers:
+    flask --app main refresh-universe            # loop forever
+    flask --app main refresh-universe --once     # one pass, e.g. from cron
+"""
+
+import os
+import re
+import time
+import logging
+from datetime import datetime
+
+from rate_limiter import TokenBucket, UPSTREAM_CALLS_PER_TICKER
+
+logger = logging.getLogger(__name__)
+
+# File listing extra tickers to keep warm
+UNIVERSE_FILE = os.environ.get(
+    "UNIVERSE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "universe.txt"),
+)
+
+# Upstream calls per second the refresher may spend, and its burst
+REFRESH_RATE_LIMIT = float(os.environ.get("REFRESH_RATE_LIMIT", "2"))
+REFRESH_BURST = int(os.environ.get("REFRESH_BURST", str(UPSTREAM_CALLS_PER_TICKER * 5)))
+
+# Tickers fetched and analyzed together
+REFRESH_CHUNK_SIZE = int(os.environ.get("REFRESH_CHUNK_SIZE", "25"))
+
+# Seconds between the starts of two refresh passes
+REFRESH_INTERVAL = float(os.environ.get("REFRESH_INTERVAL", "900"))
+
+# Local hours in which passes may start, e.g. "22-6" (empty means any time)
+REFRESH_HOURS = os.environ.get("REFRESH_HOURS", "")
+
+
+def read_universe_file(path=UNIVERSE_FILE):
+    """
+    Read the tickers listed in a universe file.
+
+    Args:
+        path (str): Path of the universe file
+
+    Returns:
+        list: Ticker symbols in file order, empty if the file does not exist
+    """
+    if not path or not os.path.exists(path):
+        return []
+
+    tickers = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            tickers.extend(re.split(r'[,\s]+', line.strip()))
+    return [ticker for ticker in tickers if ticker]
+
+
+def universe_tickers(path=UNIVERSE_FILE):
+    """
+    Get the union of all saved ticker lists and the universe file.
+
+    Must be called inside an application context.
+
+    Args:
+        path (str): Path of the universe file
+
+    Returns:
+        list: Unique upper-case ticker symbols, saved lists first
+    """
+    from models import TickerList
+
+    tickers = []
+    for ticker_list in TickerList.query.order_by(TickerList.id).all():
+        tickers.extend(ticker_list.get_tickers_list())
+    tickers.extend(read_universe_file(path))
+    return list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker and ticker.strip()))
+
+
+def in_refresh_hours(hours=REFRESH_HOURS, now=None):
+    """
+    Check whether a pass may start now.
+
+    Args:
+        hours (str): Window of local hours as "start-end" (end exclusive, may wrap
+            past midnight), empty for any time
+        now (datetime): Current local time
+
+    Returns:
+        bool: True inside the window
+    """
+    if not hours:
+        return True
+    start, _, end = hours.partition('-')
+    start, end = int(start), int(end or start)
+    hour = (now or datetime.now()).hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def refresh_universe(screen, store, tickers, budget=None, chunk_size=REFRESH_CHUNK_SIZE):
+    """
+    Run one refresh pass over a universe.
+
+    Args:
+        screen (callable): Function taking a list of tickers and returning their results
+            (fetching, analyzing and materializing them)
+        store (callable): Function taking (ticker, result) that keeps a precomputed result
+        tickers (list): Ticker symbols to refresh
+        budget (TokenBucket): Upstream call budget, None for no limit beyond the shared limiter
+        chunk_size (int): Tickers per chunk
+
+    Returns:
+        dict: Counts of refreshed and failed tickers and the duration in seconds
+    """
+    start = time.monotonic()
+    refreshed = 0
+    for offset in range(0, len(tickers), chunk_size):
+        chunk = tickers[offset:offset + chunk_size]
+        if budget is not None:
+            for _ in chunk:
+                budget.acquire(UPSTREAM_CALLS_PER_TICKER)
+
+        try:
+            results = screen(chunk)
+        except Exception as e:
+            logger.error(f"Error refreshing tickers {chunk}: {str(e)}")
+            continue
+
+        for result in results:
+            store(result['ticker'], result)
+        refreshed += len(results)
+        logger.info(f"Refreshed {offset + len(chunk)}/{len(tickers)} tickers ({refreshed} analyzed)")
+
+    summary = {'tickers': len(tickers), 'refreshed': refreshed, 'failed': len(tickers) - refreshed,
+               'seconds': round(time.monotonic() - start, 3)}
+    logger.info(f"Refresh pass finished: {summary}")
+    return summary
+
+
+def run_refresher(app, screen, store, once=False, interval=REFRESH_INTERVAL, path=UNIVERSE_FILE,
+                  rate=REFRESH_RATE_LIMIT, hours=REFRESH_HOURS):
+    """
+    Refresh the universe in passes until stopped.
+
+    Args:
+        app (Flask): Application whose database holds the ticker lists and caches
+        screen (callable): See refresh_universe
+        store (callable): See refresh_universe
+        once (bool): Run a single pass and return
+        interval (float): Seconds between the starts of two passes
+        path (str): Path of the universe file
+        rate (float): Upstream calls per second the refresher may spend (0 for no budget)
+        hours (str): Local hours in which passes may start, see in_refresh_hours
+
+    Returns:
+        dict: Summary of the last pass
+    """
+    budget = TokenBucket(rate, max(REFRESH_BURST, UPSTREAM_CALLS_PER_TICKER)) if rate > 0 else None
+    summary = None
+    while True:
+        started = time.monotonic()
+        if once or in_refresh_hours(hours):
+            with app.app_context():
+                tickers = universe_tickers(path)
+                logger.info(f"Refreshing {len(tickers)} tickers")
+                summary = refresh_universe(screen, store, tickers, budget)
+        else:
+            logger.info(f"Outside refresh hours {hours}, skipping this pass")
+
+        if once:
+            return summary
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
@@ -0,0 +1,200 @@
+"""
+Result Rendering Module
+
+This module keeps rendering batch results cheap enough that a 1,000-row
+screen renders in milliseconds:
+
+1. Lazy formatting: results carry raw numbers only; the percent, fixed and
+   currency template filters format them when a row is actually rendered
+2. Row fragment caching: each rendered _batch_row.html fragment is kept in an
+   in-process LRU keyed by the values the row displays, so unchanged rows
+   (re-screens, the ranking event after streamed rows, refreshed pages) are
+   not rendered again
+3. Bytecode cache: compiled templates are written to TEMPLATE_CACHE_DIR, so
+   cold workers load them instead of compiling them. Warm it at deployment
+   with: flask --app main compile-templates
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+from jinja2 import FileSystemBytecodeCache, Undefined
+from markupsafe import Markup
+
+from telemetry import cache_requests
+
+logger = logging.getLogger(__name__)
+
+# Directory of the compiled template cache (empty disables it)
+TEMPLATE_CACHE_DIR = os.environ.get(
+    "TEMPLATE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "template_cache"),
+)
+
+# Maximum number of rendered rows held in the fragment cache (0 disables it)
+ROW_CACHE_MAX_ENTRIES = int(os.environ.get("ROW_CACHE_MAX_ENTRIES", "10000"))
+
+ROW_TEMPLATE = '_batch_row.html'
+
+# Result fields displayed by the row template; together they key its fragment
+ROW_FIELDS = (
+    'ticker', 'company_name', 'currency', 'current_price',
+    'earnings_yield', 'ey_rank', 'traditional_earnings_yield', 'return_on_capital', 'roc_rank',
+    'dividend_yield', 'price_to_book', 'price_to_book_class', 'current_ratio', 'current_ratio_class',
+    'debt_to_equity', 'debt_to_equity_class', 'magic_score', 'magic_rank', 'alpha_spreads_score',
+    'graham_value', 'graham_upside', 'intrinsic_value_class', 'prediction_class',
+    'long_term_recommendation', 'long_term_recommendation_class', 'buy_decision', 'decision_class',
+)
+
+# Fields of the price prediction displayed by the row template
+PREDICTION_FIELDS = ('prediction', 'forecast_period', 'confidence')
+
+
+def _is_missing(value):
+    return value is None or isinstance(value, Undefined)
+
+
+def format_percent(value, digits=2):
+    """Format a value already expressed in percent, e.g. 12.345 -> '12.35%'."""
+    if _is_missing(value):
+        return "N/A"
+    return f"{value:.{digits}f}%"
+
+
+def format_fixed(value, digits=2):
+    """Format a plain number with a fixed number of decimals."""
+    if _is_missing(value):
+        return "N/A"
+    return f"{value:.{digits}f}"
+
+
+def format_currency(value, currency='USD'):
+    """Format an amount with its currency, abbreviating thousands, millions and billions."""
+    if _is_missing(value):
+        return "N/A"
+    if _is_missing(currency) or not currency:
+        currency = 'USD'
+
+    # Format large numbers with B for billions, M for millions, etc.
+    if abs(value) >= 1_000_000_000:
+        return f"{currency} {value/1_000_000_000:.2f}B"
+    elif abs(value) >= 1_000_000:
+        return f"{currency} {value/1_000_000:.2f}M"
+    elif abs(value) >= 1_000:
+        return f"{currency} {value/1_000:.2f}K"
+    else:
+        return f"{currency} {value:.2f}"
+
+
+class RowCache:
+    """In-process LRU of rendered batch rows, keyed by the values they display."""
+
+    def __init__(self, max_entries=ROW_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.app = None
+        self._template = None
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    @staticmethod
+    def key(item):
+        """Key of the fragment rendered for a result: the displayed values as a hashable tuple."""
+        prediction = item.get('price_prediction')
+        if isinstance(prediction, dict):
+            prediction = (*map(prediction.get, PREDICTION_FIELDS), 'prediction' in prediction)
+        factors = item.get('long_term_factors')
+        if isinstance(factors, list):
+            factors = tuple(factors)
+        # The template treats a missing field like None, except for the ranks added by rank_results
+        return (prediction, factors, 'magic_rank' in item, *map(item.get, ROW_FIELDS))
+
+    def render(self, item):
+        """
+        Render one result as a table row, reusing the fragment of an identical row.
+
+        Args:
+            item (dict): Result from process_financial_data, ranked or not
+
+        Returns:
+            Markup: The rendered <tr> element
+        """
+        template = self.app.jinja_env.get_template(ROW_TEMPLATE)
+        if self.max_entries <= 0:
+            return Markup(template.render(item=item))
+
+        key = self.key(item)
+        try:
+            hash(key)
+        except TypeError:
+            return Markup(template.render(item=item))
+
+        with self._lock:
+            # A reloaded template (debug mode) invalidates every fragment
+            if template is not self._template:
+                self._fragments.clear()
+                self._template = template
+            html = self._fragments.get(key)
+            if html is not None:
+                self._fragments.move_to_end(key)
+        if html is not None:
+            cache_requests.inc('row', 'hit')
+            return html
+
+        cache_requests.inc('row', 'miss')
+        html = Markup(template.render(item=item))
+        with self._lock:
+            self._fragments[key] = html
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return html
+
+    def render_many(self, items):
+        """Render results as consecutive table rows."""
+        return Markup(''.join(self.render(item) for item in items))
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+
+row_cache = RowCache()
+
+
+def init_rendering(app):
+    """
+    Register the formatting filters, the row renderer (render_rows) and the template bytecode cache.
+
+    Args:
+        app (Flask): Application to configure
+    """
+    app.jinja_env.filters.update(percent=format_percent, fixed=format_fixed, currency=format_currency)
+    app.jinja_env.globals.update(render_rows=row_cache.render_many)
+    row_cache.init_app(app)
+
+    if TEMPLATE_CACHE_DIR:
+        try:
+            os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+        except OSError as e:
+            logger.warning(f"Template cache disabled, cannot create {TEMPLATE_CACHE_DIR}: {str(e)}")
+
+
+def precompile_templates(app):
+    """
+    Compile every template into the bytecode cache.
+
+    Args:
+        app (Flask): Application whose templates are compiled
+
+    Returns:
+        int: Number of templates compiled
+    """
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
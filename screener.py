@@ -0,0 +1,265 @@
+"""
+Materialized Screener Module
+
+This module keeps the output of every screen in the ScreenMetric table, one
+row per ticker per as-of date, so universe-wide screens can be answered from
+the database without fetching anything from Yahoo Finance:
+
+1. materialize_results() upserts the key metrics of screened results
+   (earnings yield, return on capital, Magic Formula score, Graham upside,
+   P/B, current ratio, D/E, Lynch category and checklist score)
+2. Magic Formula ranks are computed across every ticker of an as-of date with
+   the ranking module. Writes only clear the ranks of the rows they touch;
+   the next query re-ranks the date once, so screens stay cheap to record
+3. query_screen() filters and sorts in SQL on indexed columns, e.g. earnings
+   yield above 8 and return on capital above 20, best Magic Formula rank first
+
+/api/screen accepts filters as <column>_<op>=<value> query parameters, where
+op is gt, gte, lt or lte (e.g. earnings_yield_gt=8&return_on_capital_gt=20).
+"""
+
+import os
+import math
+import logging
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+# Record screened results in the ScreenMetric table
+SCREENER_MATERIALIZE = os.environ.get("SCREENER_MATERIALIZE", "true").lower() in ("1", "true", "yes")
+
+# Rows returned by /api/screen when no limit is given, and the most it returns at once
+SCREEN_DEFAULT_LIMIT = int(os.environ.get("SCREEN_DEFAULT_LIMIT", "100"))
+SCREEN_MAX_LIMIT = int(os.environ.get("SCREEN_MAX_LIMIT", "1000"))
+
+# Result fields copied into ScreenMetric
+METRIC_FIELDS = (
+    'company_name', 'current_price', 'earnings_yield', 'return_on_capital', 'magic_score',
+    'graham_upside', 'price_to_book', 'current_ratio', 'debt_to_equity', 'lynch_category',
+    'checklist_score',
+)
+
+# Numeric columns /api/screen can filter and sort on
+NUMERIC_COLUMNS = (
+    'current_price', 'earnings_yield', 'return_on_capital', 'magic_score', 'graham_upside',
+    'price_to_book', 'current_ratio', 'debt_to_equity', 'checklist_score',
+    'ey_rank', 'roc_rank', 'magic_rank',
+)
+
+# Rank columns sort best (lowest) first by default, every other column highest first
+RANK_COLUMNS = ('ey_rank', 'roc_rank', 'magic_rank')
+
+FILTER_OPERATORS = {
+    'gt': lambda column, value: column > value,
+    'gte': lambda column, value: column >= value,
+    'lt': lambda column, value: column < value,
+    'lte': lambda column, value: column <= value,
+}
+
+# Tickers per IN (...) clause when loading existing rows
+_IN_CHUNK = 500
+
+
+class ScreenQueryError(ValueError):
+    """Raised for /api/screen parameters that cannot be turned into a query."""
+
+
+def _column_value(value):
+    # Store plain Python values; NaN and infinities become NULL
+    if value is None or isinstance(value, str):
+        return value
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _upsert(results, as_of):
+    from models import db, ScreenMetric
+
+    tickers = list(results)
+    existing = {}
+    for start in range(0, len(tickers), _IN_CHUNK):
+        chunk = tickers[start:start + _IN_CHUNK]
+        for row in ScreenMetric.query.filter(ScreenMetric.as_of == as_of, ScreenMetric.ticker.in_(chunk)):
+            existing[row.ticker] = row
+
+    for ticker, result in results.items():
+        row = existing.get(ticker)
+        if row is None:
+            row = ScreenMetric(ticker=ticker, as_of=as_of)
+            db.session.add(row)
+        for field in METRIC_FIELDS:
+            setattr(row, field, _column_value(result.get(field)))
+        # The ranks of the whole date are recomputed by the next query
+        row.ey_rank = row.roc_rank = row.magic_rank = None
+    db.session.commit()
+
+
+def materialize_results(results, as_of=None):
+    """
+    Record screened results in the ScreenMetric table.
+
+    Args:
+        results (list): Result dicts from process_financial_data
+        as_of (date): Date the metrics are valid for, today (UTC) by default
+
+    Returns:
+        int: Number of tickers written
+    """
+    if not SCREENER_MATERIALIZE:
+        return 0
+
+    by_ticker = {result['ticker']: result for result in results if result and result.get('ticker')}
+    if not by_ticker:
+        return 0
+
+    from models import db
+    from sqlalchemy.exc import IntegrityError
+
+    as_of = as_of or datetime.utcnow().date()
+    # A concurrent screen may insert the same tickers first; the retry updates its rows instead
+    for attempt in range(2):
+        try:
+            _upsert(by_ticker, as_of)
+            return len(by_ticker)
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                logger.error(f"Could not record {len(by_ticker)} screen results for {as_of}: conflicting writes")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error recording screen results for {as_of}: {str(e)}")
+            break
+    return 0
+
+
+def rank_screen(as_of):
+    """
+    Recompute the Magic Formula ranks of every ticker recorded for a date.
+
+    Args:
+        as_of (date): As-of date to rank
+
+    Returns:
+        int: Number of rows ranked
+    """
+    from models import db, ScreenMetric
+    from ranking import compute_magic_ranks
+
+    rows = (db.session.query(ScreenMetric.id, ScreenMetric.earnings_yield, ScreenMetric.return_on_capital)
+            .filter(ScreenMetric.as_of == as_of).all())
+    if not rows:
+        return 0
+
+    ey_rank, roc_rank, magic_rank = compute_magic_ranks([row[1] for row in rows], [row[2] for row in rows])
+    db.session.bulk_update_mappings(ScreenMetric, [
+        {'id': row[0], 'ey_rank': ey, 'roc_rank': roc, 'magic_rank': combined}
+        for row, ey, roc, combined in zip(rows, ey_rank.tolist(), roc_rank.tolist(), magic_rank.tolist())
+    ])
+    db.session.commit()
+    logger.info(f"Ranked {len(rows)} screened tickers for {as_of}")
+    return len(rows)
+
+
+def latest_as_of():
+    """Return the most recent as-of date with recorded results, or None."""
+    from models import db, ScreenMetric
+    return db.session.query(db.func.max(ScreenMetric.as_of)).scalar()
+
+
+def parse_screen_args(args):
+    """
+    Turn /api/screen query parameters into query_screen keyword arguments.
+
+    Args:
+        args (MultiDict): Request query parameters
+
+    Returns:
+        dict: Keyword arguments for query_screen
+
+    Raises:
+        ScreenQueryError: When a parameter is unknown or malformed
+    """
+    options = {'filters': []}
+    for name, raw in args.items(multi=True):
+        if name in ('sort', 'order', 'limit', 'offset', 'as_of', 'category'):
+            continue
+        column, _, op = name.rpartition('_')
+        if column not in NUMERIC_COLUMNS or op not in FILTER_OPERATORS:
+            raise ScreenQueryError(f"Unknown parameter: {name}")
+        try:
+            value = float(raw)
+        except ValueError:
+            raise ScreenQueryError(f"{name} must be a number")
+        options['filters'].append((column, op, value))
+
+    categories = [c.strip() for value in args.getlist('category') for c in value.split(',') if c.strip()]
+    if categories:
+        options['categories'] = categories
+
+    sort = args.get('sort', 'magic_rank')
+    if sort not in NUMERIC_COLUMNS and sort != 'ticker':
+        raise ScreenQueryError(f"Cannot sort by {sort}")
+    order = args.get('order', 'asc' if sort in RANK_COLUMNS or sort == 'ticker' else 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise ScreenQueryError("order must be asc or desc")
+    options['sort'] = sort
+    options['descending'] = order == 'desc'
+
+    try:
+        options['limit'] = min(int(args.get('limit', SCREEN_DEFAULT_LIMIT)), SCREEN_MAX_LIMIT)
+        options['offset'] = int(args.get('offset', 0))
+    except ValueError:
+        raise ScreenQueryError("limit and offset must be integers")
+    if options['limit'] < 0 or options['offset'] < 0:
+        raise ScreenQueryError("limit and offset must not be negative")
+
+    if args.get('as_of'):
+        try:
+            options['as_of'] = date.fromisoformat(args['as_of'])
+        except ValueError:
+            raise ScreenQueryError("as_of must be a date (YYYY-MM-DD)")
+    return options
+
+
+def query_screen(filters=(), categories=None, sort='magic_rank', descending=False,
+                 limit=SCREEN_DEFAULT_LIMIT, offset=0, as_of=None):
+    """
+    Filter and sort the materialized metrics of one as-of date in SQL.
+
+    Args:
+        filters (iterable): (column, op, value) tuples, op one of FILTER_OPERATORS
+        categories (list): Only return these Lynch categories
+        sort (str): Column to sort by
+        descending (bool): Sort highest first
+        limit (int): Maximum number of rows
+        offset (int): Rows to skip
+        as_of (date): As-of date to query, the latest recorded date by default
+
+    Returns:
+        dict: 'as_of', 'total' (rows matching the filters) and 'results' (row dicts)
+    """
+    from models import db, ScreenMetric
+
+    as_of = as_of or latest_as_of()
+    if as_of is None:
+        return {'as_of': None, 'total': 0, 'results': []}
+
+    # Re-rank the date if screens recorded since the last query cleared any ranks
+    if (db.session.query(ScreenMetric.id)
+            .filter(ScreenMetric.as_of == as_of, ScreenMetric.magic_rank.is_(None)).first()):
+        rank_screen(as_of)
+
+    query = ScreenMetric.query.filter(ScreenMetric.as_of == as_of)
+    for column, op, value in filters:
+        query = query.filter(FILTER_OPERATORS[op](getattr(ScreenMetric, column), value))
+    if categories:
+        query = query.filter(ScreenMetric.lynch_category.in_(categories))
+
+    total = query.count()
+    column = getattr(ScreenMetric, sort)
+    ordering = (column.desc() if descending else column.asc()).nulls_last()
+    rows = query.order_by(ordering, ScreenMetric.ticker).offset(offset).limit(limit).all()
+    return {'as_of': as_of.isoformat(), 'total': total, 'results': [row.to_dict() for row in rows]}
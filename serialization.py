@@ -0,0 +1,270 @@
+"""
+Serialization Module
+
+This module converts analysis results into values that can be encoded as JSON.
+Results contain NumPy scalars (e.g. from pandas reductions) and NaN values,
+which the standard JSON encoder either rejects or writes as invalid JSON.
+
+DataFrames (price history, balance sheets) are encoded column by column:
+
+    {
+        "columns": ["Open", "High", ...],
+        "index": [1714363200, 86400, 86400, ...],
+        "index_encoding": "delta",
+        "tz": "America/New_York",
+        "data": [[...Open...], [...High...], ...]
+    }
+
+A datetime index is sent as epoch seconds ("epoch"), or as the first
+timestamp followed by the differences between consecutive timestamps
+("delta"; a cumulative sum restores it), which is far shorter for daily bars.
+Float columns can be rounded to float32, whose shortest decimal form is about
+half as long. Other indexes are sent as plain labels ("labels").
+
+Payloads are encoded with orjson when it is installed (NumPy arrays are
+written natively, without converting them to Python lists first), and with
+the standard json module otherwise.
+
+Values persisted by the data cache are encoded with encode_payload instead:
+plain JSON in which DataFrames and Series use the snapshot encoding of
+data_providers and datetimes are tagged, so they decode to the same types
+(and NaN values survive). Unlike pickle, decoding a payload never runs code.
+"""
+
+import sys
+import json
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def make_json_safe(value):
+    """
+    Convert NumPy scalars and NaN values into plain JSON-compatible Python values.
+
+    Args:
+        value: Any nested structure of dicts, lists and scalars
+
+    Returns:
+        The same structure with NumPy scalars converted and NaN replaced by None
+    """
+    if isinstance(value, dict):
+        return {key: make_json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [make_json_safe(item) for item in value]
+    # NumPy scalars can only exist once something else has imported NumPy
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(value, numpy.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _encode_index(index, delta_timestamps):
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(index, pd.DatetimeIndex):
+        tz = str(index.tz) if index.tz is not None else None
+        naive = index.tz_convert('UTC').tz_localize(None) if tz else index
+        epoch = naive.asi8 // 1_000_000_000
+        if delta_timestamps and len(epoch) > 1:
+            return np.concatenate([epoch[:1], np.diff(epoch)]), 'delta', tz
+        return epoch, 'epoch', tz
+
+    labels = [label.isoformat() if isinstance(label, pd.Timestamp) else label for label in index]
+    return make_json_safe(labels), 'labels', None
+
+
+def _encode_column(values, float32):
+    import numpy as np
+
+    # orjson only writes contiguous arrays natively
+    if values.dtype.kind == 'f':
+        return values.astype(np.float32) if float32 else np.ascontiguousarray(values)
+    if values.dtype.kind in 'iub':
+        return np.ascontiguousarray(values)
+    return make_json_safe(values.tolist())
+
+
+def encode_frame(frame, float32=False, delta_timestamps=False):
+    """
+    Encode a DataFrame as column-oriented arrays.
+
+    Args:
+        frame (pd.DataFrame): Frame to encode
+        float32 (bool): Round float columns to float32
+        delta_timestamps (bool): Send a datetime index as differences between timestamps
+
+    Returns:
+        dict: Columns, index and one array per column, ready for dumps()
+    """
+    index, index_encoding, tz = _encode_index(frame.index, delta_timestamps)
+    return {
+        'columns': make_json_safe([str(column) for column in frame.columns]),
+        'index': index,
+        'index_encoding': index_encoding,
+        'tz': tz,
+        'data': [_encode_column(frame.iloc[:, i].to_numpy(), float32) for i in range(frame.shape[1])],
+    }
+
+
+def encode_stock_data(data, fields=None, float32=False, delta_timestamps=False):
+    """
+    Prepare fetch_financial_data output for the JSON API.
+
+    Args:
+        data (dict): fetch_financial_data output
+        fields (list): Only include these keys, None includes all of them
+        float32 (bool): Round float columns of frames to float32
+        delta_timestamps (bool): Delta-encode datetime indexes of frames
+
+    Returns:
+        dict: Payload with every DataFrame encoded by encode_frame
+    """
+    pandas = sys.modules.get('pandas')
+    selected = data if fields is None else {field: data[field] for field in fields if field in data}
+
+    payload = {}
+    for key, value in selected.items():
+        if pandas is not None and isinstance(value, pandas.DataFrame):
+            payload[key] = encode_frame(value, float32, delta_timestamps)
+        elif pandas is not None and isinstance(value, pandas.Series):
+            payload[key] = encode_frame(value.to_frame(), float32, delta_timestamps)
+        else:
+            payload[key] = value
+    return payload
+
+
+def _plain_default(value):
+    # Fallback for values the standard encoder does not know
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        if value.dtype.kind == 'f':
+            if value.dtype == numpy.float32:
+                # Shortest decimal form of each float32 value, as orjson writes it
+                values = [float(text) for text in value.astype(str)]
+            else:
+                values = value.tolist()
+            return [None if item != item else item for item in values]
+        return value.tolist()
+    if numpy is not None and isinstance(value, numpy.generic):
+        return make_json_safe(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _orjson_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(value, (numpy.ndarray, numpy.generic)):
+        return _plain_default(value)
+    raise TypeError
+
+
+def dumps(value):
+    """
+    Encode a payload as compact JSON.
+
+    Args:
+        value: Nested dicts and lists of JSON values, NumPy arrays and scalars
+
+    Returns:
+        bytes: UTF-8 encoded JSON, with NaN written as null
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_orjson_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(make_json_safe(value), default=_plain_default, separators=(',', ':'),
+                      allow_nan=False).encode('utf-8')
+
+
+def _pack(value):
+    pandas = sys.modules.get('pandas')
+    if pandas is not None and isinstance(value, (pandas.DataFrame, pandas.Series)):
+        from data_providers import encode_snapshot
+        return _pack(encode_snapshot(value))
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: _pack(item) for key, item in value.items()}
+        return {'__items__': [[_pack(key), _pack(item)] for key, item in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_pack(item) for item in value]
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(value, numpy.generic):
+        return _pack(value.item())
+    if pandas is not None and isinstance(value, pandas.Timestamp):
+        return {'__timestamp__': value.isoformat()}
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    raise TypeError(f"Cannot encode values of type {type(value).__name__}")
+
+
+def _unpack(value):
+    if isinstance(value, list):
+        return [_unpack(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '__timestamp__' in value:
+        import pandas as pd
+        return pd.Timestamp(value['__timestamp__'])
+    if '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+    if '__date__' in value:
+        return date.fromisoformat(value['__date__'])
+    if '__items__' in value:
+        return {_hashable(_unpack(key)): _unpack(item) for key, item in value['__items__']}
+
+    value = {key: _unpack(item) for key, item in value.items()}
+    if value.get('__frame__') or value.get('__series__'):
+        from data_providers import decode_snapshot
+        return decode_snapshot(value)
+    return value
+
+
+def _hashable(key):
+    # Tuple keys come back as lists
+    return tuple(_hashable(item) for item in key) if isinstance(key, list) else key
+
+
+def encode_payload(value):
+    """
+    Encode a value for the persistent cache as data-only JSON.
+
+    Args:
+        value: Nested dicts, lists and tuples of JSON values, NumPy scalars,
+            datetimes, DataFrames and Series
+
+    Returns:
+        bytes: UTF-8 encoded JSON (NaN is written as NaN)
+
+    Raises:
+        TypeError: If the value contains anything else
+    """
+    return json.dumps(_pack(value), separators=(',', ':')).encode('utf-8')
+
+
+def decode_payload(payload):
+    """
+    Decode a value encoded with encode_payload.
+
+    Args:
+        payload (bytes): Output of encode_payload
+
+    Returns:
+        The decoded value (tuples come back as lists)
+
+    Raises:
+        ValueError: If the payload is not valid JSON (e.g. written in an older format)
+    """
+    return _unpack(json.loads(payload))
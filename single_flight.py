@@ -0,0 +1,204 @@
+"""
+Single-Flight Request Coalescing Module
+
+This module makes concurrent lookups of the same ticker and data kind share one
+upstream fetch instead of each running their own:
+
+1. Within a worker, the first caller for a key runs the fetch and every other
+   thread asking for the same key waits for it and receives the same result
+   (or exception).
+2. When SINGLE_FLIGHT_SHARED is enabled (deployments running several gunicorn
+   workers), the fetching thread also takes a lease in the FetchLock table. A
+   worker that finds the lease held waits until it is released (or expires)
+   and then reads the result the other worker published to the shared cache
+   tier, fetching it itself only if nothing was published.
+
+Coalescing within a worker is in memory and costs nothing extra. The
+cross-worker lease is off by default because it adds database writes to every
+miss: one upsert that takes over an expired lease in the same statement, and
+one delete to release it.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Coordinate fetches across workers through the database (only useful with several workers)
+SINGLE_FLIGHT_SHARED = os.environ.get("SINGLE_FLIGHT_SHARED", "false").lower() in ("1", "true", "yes")
+
+# Seconds a cross-worker lease is valid (protects against crashed workers)
+SINGLE_FLIGHT_LOCK_TTL = float(os.environ.get("SINGLE_FLIGHT_LOCK_TTL", "30"))
+
+# Maximum seconds to wait for another worker's fetch, and how often to check on it
+SINGLE_FLIGHT_WAIT = float(os.environ.get("SINGLE_FLIGHT_WAIT", "30"))
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.environ.get("SINGLE_FLIGHT_POLL_INTERVAL", "0.1"))
+
+
+class _Call:
+    """An in-flight fetch that other threads can wait on."""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent fetches of the same key, per worker and across workers."""
+
+    def __init__(self, shared=SINGLE_FLIGHT_SHARED, lock_ttl=SINGLE_FLIGHT_LOCK_TTL,
+                 wait=SINGLE_FLIGHT_WAIT, poll_interval=SINGLE_FLIGHT_POLL_INTERVAL):
+        self.shared = shared
+        self.lock_ttl = timedelta(seconds=lock_ttl)
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.app = None
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Enable cross-worker coalescing using the application's database."""
+        self.app = app
+
+    def do(self, key, fetch, reload=None):
+        """
+        Run a fetch, or join the one already in flight for the same key.
+
+        Args:
+            key (tuple): Identifies the fetch, e.g. (ticker, kind)
+            fetch (callable): Fetches the value upstream and publishes it to the shared store
+            reload (callable): Reads a value published by another worker, returning
+                None if there is none; without it only threads are coalesced
+
+        Returns:
+            The fetched value
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            logger.debug(f"Joining in-flight fetch for {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = self._run_shared(key, fetch, reload)
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self):
+        """Number of keys currently being fetched by this worker."""
+        with self._lock:
+            return len(self._calls)
+
+    # Cross-worker coordination
+
+    def _run_shared(self, key, fetch, reload):
+        if not self.shared or self.app is None or reload is None:
+            return fetch()
+
+        name = ':'.join(str(part) for part in key)[:64]
+        owner = self._owner()
+        if self._acquire(name, owner):
+            try:
+                return fetch()
+            finally:
+                self._release(name, owner)
+
+        # Another worker is fetching the same data; wait for it to publish
+        logger.debug(f"Waiting for another worker to fetch {key}")
+        deadline = time.monotonic() + self.wait
+        while time.monotonic() < deadline and self._is_held(name):
+            time.sleep(self.poll_interval)
+
+        value = reload()
+        if value is not None:
+            return value
+        return fetch()
+
+    def _owner(self):
+        return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+    def _acquire(self, name, owner):
+        from models import db, FetchLock
+
+        try:
+            with self.app.app_context():
+                now = datetime.utcnow()
+                values = {'key': name, 'owner': owner, 'expires_at': now + self.lock_ttl}
+                dialect = db.engine.dialect.name
+                if dialect == 'sqlite':
+                    from sqlalchemy.dialects.sqlite import insert
+                elif dialect == 'postgresql':
+                    from sqlalchemy.dialects.postgresql import insert
+                else:
+                    return self._acquire_generic(name, values, now)
+
+                # Take the lease, or take over one left behind by a worker that died mid-fetch
+                table = FetchLock.__table__
+                statement = insert(table).values(**values)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[table.c.key],
+                    set_={'owner': statement.excluded.owner, 'expires_at': statement.excluded.expires_at},
+                    where=table.c.expires_at < now,
+                )
+                acquired = db.session.execute(statement).rowcount == 1
+                db.session.commit()
+                return acquired
+        except Exception as e:
+            # Never let the lock table stop a fetch
+            logger.error(f"Error acquiring fetch lock {name}: {str(e)}")
+            return True
+
+    def _acquire_generic(self, name, values, now):
+        from sqlalchemy.exc import IntegrityError
+        from models import db, FetchLock
+
+        FetchLock.query.filter(FetchLock.key == name, FetchLock.expires_at < now).delete()
+        db.session.add(FetchLock(**values))
+        try:
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+    def _release(self, name, owner):
+        from models import db, FetchLock
+
+        try:
+            with self.app.app_context():
+                FetchLock.query.filter_by(key=name, owner=owner).delete()
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"Error releasing fetch lock {name}: {str(e)}")
+
+    def _is_held(self, name):
+        from models import FetchLock
+
+        try:
+            with self.app.app_context():
+                lock = FetchLock.query.filter_by(key=name).first()
+                return lock is not None and lock.expires_at >= datetime.utcnow()
+        except Exception as e:
+            logger.error(f"Error checking fetch lock {name}: {str(e)}")
+            return False
@@ -67,7 +67,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     if (stockForm) {
-        stockForm.addEventListener('submit', function() {
+        stockForm.addEventListener('submit', function(e) {
             // Show loading indicator
             loadingIndicator.classList.remove('d-none');
             
@@ -77,7 +77,145 @@ document.addEventListener('DOMContentLoaded', function() {
                 submitBtn.disabled = true;
                 submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Loading...';
             }
+            
+            // Stream batch results into the table instead of waiting for the whole page
+            const tickerList = document.getElementById('tickerList');
+            if (window.EventSource && tickerList && stockForm.dataset.streamUrl) {
+                const tickers = tickerList.value.split(/[,\s]+/).filter(t => t.trim());
+                const maxTickers = parseInt(stockForm.dataset.streamMax, 10) || 0;
+                if (tickers.length > 0 && tickers.length <= maxTickers) {
+                    e.preventDefault();
+                    streamBatch(tickers);
+                }
+            }
+        });
+    }
+    
+    // Render batch results row by row as the server streams them
+    function streamBatch(tickers) {
+        const resultsSection = document.getElementById('batch-results');
+        const resultsBody = document.getElementById('batchResultsBody');
+        const summary = document.getElementById('batchSummary');
+        const loadingText = loadingIndicator.querySelector('p');
+        
+        resultsBody.innerHTML = '';
+        summary.innerHTML = '';
+        document.querySelectorAll('.alert-danger, .alert-warning').forEach(alert => alert.remove());
+        
+        const source = new EventSource(stockForm.dataset.streamUrl + '?tickers=' + encodeURIComponent(tickers.join(',')));
+        
+        source.addEventListener('row', function(event) {
+            const row = JSON.parse(event.data);
+            resultsSection.classList.remove('d-none');
+            resultsBody.insertAdjacentHTML('beforeend', row.html);
+            if (loadingText) {
+                loadingText.textContent = 'Analyzed ' + row.completed + ' of ' + row.total + ' tickers...';
+            }
+        });
+        
+        source.addEventListener('ranking', function(event) {
+            const ranking = JSON.parse(event.data);
+            source.close();
+            
+            resultsBody.innerHTML = ranking.html;
+            summary.innerHTML = ranking.summary;
+            if (ranking.error) {
+                resultsSection.classList.add('d-none');
+                loadingIndicator.insertAdjacentHTML('afterend',
+                    '<div class="alert alert-danger mt-3" role="alert"><i class="fas fa-exclamation-triangle me-2"></i> ' + ranking.error + '</div>');
+            }
+            finishStream();
         });
+        
+        source.onerror = function() {
+            // Fall back to a regular form submission if the stream cannot be used
+            source.close();
+            if (!resultsBody.children.length) {
+                stockForm.submit();
+            } else {
+                finishStream();
+            }
+        };
+        
+        function finishStream() {
+            loadingIndicator.classList.add('d-none');
+            if (loadingText) {
+                loadingText.textContent = 'Fetching financial data...';
+            }
+            const submitBtn = document.getElementById('submitBtn');
+            if (submitBtn) {
+                submitBtn.disabled = false;
+                submitBtn.innerHTML = '<i class="fas fa-table me-1"></i> Analyze Stocks';
+            }
+        }
+    }
+    
+    // Poll the progress of a background screening job and show the results when it finishes
+    const jobProgress = document.getElementById('jobProgress');
+    if (jobProgress) {
+        const jobCompleted = document.getElementById('jobCompleted');
+        const jobProgressBar = document.getElementById('jobProgressBar');
+        const resultsSection = document.getElementById('batch-results');
+        const resultsBody = document.getElementById('batchResultsBody');
+        // Number of partial results already shown; failed tickers have none, so this
+        // is not the number of tickers analyzed
+        let received = 0;
+        // Stop polling once the job has not changed for this many polls (about 7 minutes,
+        // longer than the server takes to hand an abandoned job to another worker)
+        const maxUnchangedPolls = 200;
+        let unchangedPolls = 0;
+        let lastState = null;
+        
+        function stopPolling() {
+            jobProgress.classList.replace('alert-info', 'alert-warning');
+            jobProgress.querySelector('.spinner-border').remove();
+            jobProgress.insertAdjacentHTML('beforeend',
+                '<p class="mb-0 mt-2">The job has not made progress for a while. Reload the page to check on it again.</p>');
+        }
+        
+        function pollJob() {
+            fetch(jobProgress.dataset.statusUrl + '?offset=' + received)
+                .then(response => response.json())
+                .then(function(result) {
+                    if (!result.success) {
+                        return;
+                    }
+                    const job = result.data;
+                    jobCompleted.textContent = job.completed;
+                    jobProgressBar.style.width = (job.total ? Math.round(100 * job.completed / job.total) : 0) + '%';
+                    
+                    if (job.status === 'done' || job.status === 'failed') {
+                        window.location.reload();
+                        return;
+                    }
+                    
+                    // Show the rows screened so far; the ranked table replaces them when the job is done
+                    if (job.results.length && job.offset === received) {
+                        resultsSection.classList.remove('d-none');
+                        resultsBody.insertAdjacentHTML('beforeend', result.html);
+                        received += job.results.length;
+                    }
+                    
+                    const state = job.status + ':' + job.completed + ':' + job.updated_at;
+                    unchangedPolls = state === lastState ? unchangedPolls + 1 : 0;
+                    lastState = state;
+                    if (unchangedPolls >= maxUnchangedPolls) {
+                        stopPolling();
+                    } else {
+                        setTimeout(pollJob, 2000);
+                    }
+                })
+                .catch(function() {
+                    unchangedPolls++;
+                    if (unchangedPolls >= maxUnchangedPolls) {
+                        stopPolling();
+                    } else {
+                        setTimeout(pollJob, 5000);
+                    }
+                });
+        }
+        
+        setTimeout(pollJob, 2000);
     }
     
     // Handle tooltips
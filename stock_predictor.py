@@ -3,19 +3,36 @@ Stock Price Prediction Module using Machine Learning
 
 This module provides functionality to predict stock prices based on historical data.
 It uses scikit-learn to implement a regression model that forecasts future price movements.
+
+scikit-learn is only imported when a model is actually fitted, so importing
+this module does not pay for it.
 """
 
+import os
 import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import Ridge
-from sklearn.preprocessing import StandardScaler
-from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split
 from datetime import datetime, timedelta
+from telemetry import timed
+from feature_state import feature_store, INCREMENTAL_FEATURES
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of fitted models kept in memory
+MODEL_CACHE_SIZE = int(os.environ.get("MODEL_CACHE_SIZE", "256"))
+
+# Optional directory for persisting fitted models with joblib
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR")
+
+# Columns that are not used as model features
+NON_FEATURE_COLUMNS = ['Close', 'Open', 'High', 'Low', 'Adj Close']
+
+_model_cache = OrderedDict()
+_model_cache_lock = threading.Lock()
+
 def create_features(data):
     """
     Create features for stock price prediction model.
@@ -76,23 +93,24 @@ def prepare_target(data, forecast_period=30):
         tuple: X features, y target
     """
     # Create target: future price change over the forecast period
-    data['future_return'] = data['Close'].pct_change(forecast_period).shift(-forecast_period)
+    # (computed separately so the feature frame can be reused for prediction)
+    y = data['Close'].pct_change(forecast_period).shift(-forecast_period)
     
     # Separate features and target
-    X = data.drop(['future_return', 'Close', 'Open', 'High', 'Low', 'Adj Close'], axis=1, errors='ignore')
-    y = data['future_return']
+    X = data.drop(NON_FEATURE_COLUMNS, axis=1, errors='ignore')
     
     # Drop rows with NaN values in target
     mask = ~y.isna()
     return X[mask], y[mask]
 
-def train_prediction_model(historical_data, forecast_period=30):
+def train_prediction_model(historical_data, forecast_period=30, df_features=None):
     """
     Train a model to predict stock price movement.
     
     Args:
         historical_data (pd.DataFrame): DataFrame with historical OHLCV data
         forecast_period (int): Number of days to forecast
+        df_features (pd.DataFrame): Output of create_features, computed if not given
         
     Returns:
         object: Trained prediction model
@@ -103,7 +121,8 @@ def train_prediction_model(historical_data, forecast_period=30):
             return None
         
         # Create features from historical data
-        df_features = create_features(historical_data)
+        if df_features is None:
+            df_features = create_features(historical_data)
         
         # Prepare target variable
         X, y = prepare_target(df_features, forecast_period)
@@ -112,6 +131,11 @@ def train_prediction_model(historical_data, forecast_period=30):
             logger.warning("Not enough processed data points for prediction")
             return None
         
+        from sklearn.linear_model import Ridge
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.pipeline import Pipeline
+        from sklearn.model_selection import train_test_split
+        
         # Split into training and validation sets
         X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
         
@@ -134,6 +158,104 @@ def train_prediction_model(historical_data, forecast_period=30):
         logger.error(f"Error training prediction model: {str(e)}")
         return None
 
+def _model_cache_key(ticker, historical_data, forecast_period):
+    last_bar = pd.Timestamp(historical_data.index[-1]).isoformat()
+    return (ticker.upper(), forecast_period, last_bar)
+
+def _model_cache_path(ticker, forecast_period):
+    safe_ticker = "".join(c if c.isalnum() or c in '.-' else '_' for c in ticker.upper())
+    return os.path.join(MODEL_CACHE_DIR, f"{safe_ticker}_{forecast_period}.joblib")
+
+def _load_model_from_disk(key):
+    if not MODEL_CACHE_DIR:
+        return None
+    path = _model_cache_path(key[0], key[1])
+    if not os.path.exists(path):
+        return None
+    try:
+        import joblib
+        stored = joblib.load(path)
+        if stored.get('key') == key:
+            return stored['model']
+    except Exception as e:
+        logger.error(f"Error loading cached model for {key[0]}: {str(e)}")
+    return None
+
+def _save_model_to_disk(key, model):
+    if not MODEL_CACHE_DIR:
+        return
+    try:
+        import joblib
+        os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+        path = _model_cache_path(key[0], key[1])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump({'key': key, 'model': model}, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.error(f"Error saving cached model for {key[0]}: {str(e)}")
+
+def lookup_cached_model(key):
+    """Find a fitted model in the in-memory registry or on disk."""
+    with _model_cache_lock:
+        model = _model_cache.get(key)
+        if model is not None:
+            _model_cache.move_to_end(key)
+            return model
+    
+    model = _load_model_from_disk(key)
+    if model is not None:
+        _cache_model_in_memory(key, model)
+    return model
+
+def remember_model(key, model):
+    """Store a fitted model in the in-memory registry and, if enabled, on disk."""
+    _cache_model_in_memory(key, model)
+    _save_model_to_disk(key, model)
+
+def clear_model_cache():
+    """Drop every fitted model from the in-memory registry."""
+    with _model_cache_lock:
+        _model_cache.clear()
+
+def _cache_model_in_memory(key, model):
+    with _model_cache_lock:
+        _model_cache[key] = model
+        _model_cache.move_to_end(key)
+        while len(_model_cache) > MODEL_CACHE_SIZE:
+            _model_cache.popitem(last=False)
+
+def get_prediction_model(ticker, historical_data, forecast_period=30, df_features=None):
+    """
+    Get a fitted model for a ticker, training one only when new bars have arrived.
+    
+    Models are cached in memory (LRU) and, if MODEL_CACHE_DIR is set, on disk.
+    They are keyed by ticker, forecast period and the date of the last bar.
+    
+    Args:
+        ticker (str): Stock ticker symbol
+        historical_data (pd.DataFrame): DataFrame with historical OHLCV data
+        forecast_period (int): Number of days to forecast
+        df_features (pd.DataFrame): Output of create_features, computed if not given
+        
+    Returns:
+        object: Trained prediction model, or None if one could not be trained
+    """
+    if historical_data is None or historical_data.empty:
+        return None
+    
+    key = _model_cache_key(ticker, historical_data, forecast_period)
+    model = lookup_cached_model(key)
+    if model is not None:
+        logger.debug(f"Using cached prediction model for {ticker}")
+        return model
+    
+    model = train_prediction_model(historical_data, forecast_period, df_features=df_features)
+    if model is None:
+        return None
+    
+    remember_model(key, model)
+    return model
+
 def calculate_long_term_indicators(historical_data):
     """
     Calculate indicators that are particularly useful for long-term investors.
@@ -238,6 +360,145 @@ def calculate_long_term_indicators(historical_data):
         logger.error(f"Error calculating long-term indicators: {str(e)}")
         return None
 
+def build_prediction_result(predicted_return, current_price, forecast_period=30):
+    """
+    Turn a predicted return into a labelled prediction result.
+    
+    Args:
+        predicted_return (float): Predicted return over the forecast period
+        current_price (float): Latest closing price
+        forecast_period (int): Number of days ahead the prediction covers
+        
+    Returns:
+        dict: Prediction label, formatted return and confidence, and predicted price
+    """
+    # Determine prediction confidence based on feature importance
+    # Since we're using Ridge regression, we can't directly access feature importance
+    # Instead, use the model's explained variance on validation set as a proxy for confidence
+    confidence = min(0.95, max(0.2, abs(predicted_return) * 2))  # Scale confidence based on magnitude of prediction
+
+    # Create a prediction label
+    if predicted_return > 0.05:
+        prediction = 'Strong Bullish'
+    elif predicted_return > 0.02:
+        prediction = 'Bullish'
+    elif predicted_return > -0.02:
+        prediction = 'Neutral'
+    elif predicted_return > -0.05:
+        prediction = 'Bearish'
+    else:
+        prediction = 'Strong Bearish'
+
+    # Calculate predicted price
+    predicted_price = current_price * (1 + predicted_return)
+
+    # Format the prediction as a percentage
+    formatted_return = f"{predicted_return * 100:.1f}%"
+    formatted_confidence = f"{confidence * 100:.0f}%"
+
+    return {
+        'prediction': prediction,
+        'predicted_return': formatted_return,
+        'confidence': formatted_confidence,
+        'forecast_period': forecast_period,
+        'current_price': current_price,
+        'predicted_price': predicted_price
+    }
+
+def unknown_prediction_result(forecast_period=30):
+    """Prediction result used when no model could be trained."""
+    return {
+        'prediction': 'Unknown',
+        'predicted_return': None, 
+        'confidence': None,
+        'forecast_period': forecast_period
+    }
+
+def analyze_long_term_factors(long_term_data):
+    """
+    Build a long-term investment recommendation from long-term indicators.
+    
+    Args:
+        long_term_data (dict): Output of calculate_long_term_indicators
+        
+    Returns:
+        tuple: Long-term recommendation (or None) and the list of contributing factors
+    """
+    # Create a long-term investment recommendation
+    long_term_recommendation = None
+    long_term_factors = []
+
+    if long_term_data:
+        # Collect positive long-term factors
+        positive_factors = []
+        negative_factors = []
+
+        # Check for Golden Cross (very bullish long-term signal)
+        if long_term_data.get('recent_golden_cross'):
+            positive_factors.append("Recent Golden Cross detected (50-day MA crossed above 200-day MA)")
+
+        # Check for Death Cross (very bearish long-term signal)
+        if long_term_data.get('recent_death_cross'):
+            negative_factors.append("Recent Death Cross detected (50-day MA crossed below 200-day MA)")
+
+        # Check price relative to moving averages
+        if long_term_data.get('price_to_ma50', 0) > 1.05:
+            positive_factors.append(f"Price is {((long_term_data['price_to_ma50'] - 1) * 100):.1f}% above 50-day MA")
+        elif long_term_data.get('price_to_ma50', 0) < 0.95:
+            negative_factors.append(f"Price is {((1 - long_term_data['price_to_ma50']) * 100):.1f}% below 50-day MA")
+
+        if long_term_data.get('price_to_ma200', 0) > 1.05:
+            positive_factors.append(f"Price is {((long_term_data['price_to_ma200'] - 1) * 100):.1f}% above 200-day MA")
+        elif long_term_data.get('price_to_ma200', 0) < 0.95:
+            negative_factors.append(f"Price is {((1 - long_term_data['price_to_ma200']) * 100):.1f}% below 200-day MA")
+
+        # Check 100-day performance
+        if long_term_data.get('percent_change_100d', 0) > 10:
+            positive_factors.append(f"Strong 100-day performance: +{long_term_data['percent_change_100d']}%")
+        elif long_term_data.get('percent_change_100d', 0) < -10:
+            negative_factors.append(f"Weak 100-day performance: {long_term_data['percent_change_100d']}%")
+
+        # Check volatility
+        if long_term_data.get('long_term_volatility', 100) < 20:
+            positive_factors.append(f"Low volatility: {long_term_data['long_term_volatility']}%")
+        elif long_term_data.get('long_term_volatility', 0) > 40:
+            negative_factors.append(f"High volatility: {long_term_data['long_term_volatility']}%")
+
+        # Check trend strength
+        if long_term_data.get('trend_strength', 0) > 0.7 and long_term_data.get('trend_direction') == "Upward":
+            positive_factors.append(f"Strong upward trend (R²: {long_term_data['trend_strength']})")
+        elif long_term_data.get('trend_strength', 0) > 0.7 and long_term_data.get('trend_direction') == "Downward":
+            negative_factors.append(f"Strong downward trend (R²: {long_term_data['trend_strength']})")
+
+        # Check proximity to 52-week high/low
+        if long_term_data.get('pct_from_high', 100) < 5:
+            positive_factors.append(f"Near 52-week high (within {long_term_data['pct_from_high']}%)")
+        elif long_term_data.get('pct_from_low', 0) < 10:
+            negative_factors.append(f"Near 52-week low (within {long_term_data['pct_from_low']}% of bottom)")
+
+        # Check drawdown
+        if long_term_data.get('current_drawdown', -100) > -5:
+            positive_factors.append(f"Minimal current drawdown: {long_term_data['current_drawdown']}%")
+        elif long_term_data.get('current_drawdown', 0) < -20:
+            negative_factors.append(f"Significant current drawdown: {long_term_data['current_drawdown']}%")
+
+        # Determine long-term recommendation based on factors count
+        if len(positive_factors) >= 3 and len(positive_factors) > len(negative_factors) * 2:
+            long_term_recommendation = "Strong Long-Term Buy"
+        elif len(positive_factors) > len(negative_factors):
+            long_term_recommendation = "Long-Term Buy"
+        elif len(negative_factors) >= 3 and len(negative_factors) > len(positive_factors) * 2:
+            long_term_recommendation = "Long-Term Avoid"
+        elif len(negative_factors) > len(positive_factors):
+            long_term_recommendation = "Long-Term Caution"
+        else:
+            long_term_recommendation = "Long-Term Neutral"
+
+        # Combine positive and negative factors
+        long_term_factors = positive_factors + negative_factors
+
+    return long_term_recommendation, long_term_factors
+
 def predict_price_movement(ticker, historical_data, forecast_period=30):
     """
     Predict future price movement for a stock.
@@ -252,135 +513,39 @@ def predict_price_movement(ticker, historical_data, forecast_period=30):
     """
     try:
         # Calculate long-term indicators
-        long_term_data = calculate_long_term_indicators(historical_data)
+        with timed('predict.long_term'):
+            long_term_data = calculate_long_term_indicators(historical_data)
         
-        # Train model on historical data
-        model = train_prediction_model(historical_data, forecast_period)
+        # Create features once; they are used both for training and for the latest prediction.
+        # The incremental feature state only folds in the bars it has not seen yet
+        df_features = None
+        if historical_data is not None and not historical_data.empty:
+            if INCREMENTAL_FEATURES:
+                with timed('predict.features_incremental'):
+                    df_features = feature_store.features(ticker, historical_data)
+            if df_features is None:
+                with timed('predict.features'):
+                    df_features = create_features(historical_data)
+                if INCREMENTAL_FEATURES:
+                    feature_store.seed(ticker, historical_data, df_features)
+        
+        # Get a trained model, reusing the cached one if no new bars have arrived
+        with timed('predict.fit'):
+            model = get_prediction_model(ticker, historical_data, forecast_period, df_features=df_features)
         
         if model is None:
             logger.warning(f"Could not create prediction model for {ticker}")
-            prediction_result = {
-                'prediction': 'Unknown',
-                'predicted_return': None, 
-                'confidence': None,
-                'forecast_period': forecast_period
-            }
+            prediction_result = unknown_prediction_result(forecast_period)
         else:
-            # Create features for the most recent data
-            df_features = create_features(historical_data)
-            
             # Get the latest data point with all features
-            latest_features = df_features.iloc[-1:].drop(['Close', 'Open', 'High', 'Low', 'Adj Close'], axis=1, errors='ignore')
+            latest_features = df_features.iloc[-1:].drop(NON_FEATURE_COLUMNS, axis=1, errors='ignore')
             
             # Make prediction
             predicted_return = model.predict(latest_features)[0]
-            
-            # Determine prediction confidence based on feature importance
-            # Since we're using Ridge regression, we can't directly access feature importance
-            # Instead, use the model's explained variance on validation set as a proxy for confidence
-            confidence = min(0.95, max(0.2, abs(predicted_return) * 2))  # Scale confidence based on magnitude of prediction
-            
-            # Create a prediction label
-            if predicted_return > 0.05:
-                prediction = 'Strong Bullish'
-            elif predicted_return > 0.02:
-                prediction = 'Bullish'
-            elif predicted_return > -0.02:
-                prediction = 'Neutral'
-            elif predicted_return > -0.05:
-                prediction = 'Bearish'
-            else:
-                prediction = 'Strong Bearish'
-            
-            # Calculate predicted price
-            current_price = historical_data['Close'].iloc[-1]
-            predicted_price = current_price * (1 + predicted_return)
-            
-            # Format the prediction as a percentage
-            formatted_return = f"{predicted_return * 100:.1f}%"
-            formatted_confidence = f"{confidence * 100:.0f}%"
-            
-            prediction_result = {
-                'prediction': prediction,
-                'predicted_return': formatted_return,
-                'confidence': formatted_confidence,
-                'forecast_period': forecast_period,
-                'current_price': current_price,
-                'predicted_price': predicted_price
-            }
+            prediction_result = build_prediction_result(predicted_return, historical_data['Close'].iloc[-1], forecast_period)
         
         # Create a long-term investment recommendation
-        long_term_recommendation = None
-        long_term_factors = []
-        
-        if long_term_data:
-            # Collect positive long-term factors
-            positive_factors = []
-            negative_factors = []
-            
-            # Check for Golden Cross (very bullish long-term signal)
-            if long_term_data.get('recent_golden_cross'):
-                positive_factors.append("Recent Golden Cross detected (50-day MA crossed above 200-day MA)")
-            
-            # Check for Death Cross (very bearish long-term signal)
-            if long_term_data.get('recent_death_cross'):
-                negative_factors.append("Recent Death Cross detected (50-day MA crossed below 200-day MA)")
-            
-            # Check price relative to moving averages
-            if long_term_data.get('price_to_ma50', 0) > 1.05:
-                positive_factors.append(f"Price is {((long_term_data['price_to_ma50'] - 1) * 100):.1f}% above 50-day MA")
-            elif long_term_data.get('price_to_ma50', 0) < 0.95:
-                negative_factors.append(f"Price is {((1 - long_term_data['price_to_ma50']) * 100):.1f}% below 50-day MA")
-                
-            if long_term_data.get('price_to_ma200', 0) > 1.05:
-                positive_factors.append(f"Price is {((long_term_data['price_to_ma200'] - 1) * 100):.1f}% above 200-day MA")
-            elif long_term_data.get('price_to_ma200', 0) < 0.95:
-                negative_factors.append(f"Price is {((1 - long_term_data['price_to_ma200']) * 100):.1f}% below 200-day MA")
-            
-            # Check 100-day performance
-            if long_term_data.get('percent_change_100d', 0) > 10:
-                positive_factors.append(f"Strong 100-day performance: +{long_term_data['percent_change_100d']}%")
-            elif long_term_data.get('percent_change_100d', 0) < -10:
-                negative_factors.append(f"Weak 100-day performance: {long_term_data['percent_change_100d']}%")
-            
-            # Check volatility
-            if long_term_data.get('long_term_volatility', 100) < 20:
-                positive_factors.append(f"Low volatility: {long_term_data['long_term_volatility']}%")
-            elif long_term_data.get('long_term_volatility', 0) > 40:
-                negative_factors.append(f"High volatility: {long_term_data['long_term_volatility']}%")
-            
-            # Check trend strength
-            if long_term_data.get('trend_strength', 0) > 0.7 and long_term_data.get('trend_direction') == "Upward":
-                positive_factors.append(f"Strong upward trend (R²: {long_term_data['trend_strength']})")
-            elif long_term_data.get('trend_strength', 0) > 0.7 and long_term_data.get('trend_direction') == "Downward":
-                negative_factors.append(f"Strong downward trend (R²: {long_term_data['trend_strength']})")
-            
-            # Check proximity to 52-week high/low
-            if long_term_data.get('pct_from_high', 100) < 5:
-                positive_factors.append(f"Near 52-week high (within {long_term_data['pct_from_high']}%)")
-            elif long_term_data.get('pct_from_low', 0) < 10:
-                negative_factors.append(f"Near 52-week low (within {long_term_data['pct_from_low']}% of bottom)")
-            
-            # Check drawdown
-            if long_term_data.get('current_drawdown', -100) > -5:
-                positive_factors.append(f"Minimal current drawdown: {long_term_data['current_drawdown']}%")
-            elif long_term_data.get('current_drawdown', 0) < -20:
-                negative_factors.append(f"Significant current drawdown: {long_term_data['current_drawdown']}%")
-            
-            # Determine long-term recommendation based on factors count
-            if len(positive_factors) >= 3 and len(positive_factors) > len(negative_factors) * 2:
-                long_term_recommendation = "Strong Long-Term Buy"
-            elif len(positive_factors) > len(negative_factors):
-                long_term_recommendation = "Long-Term Buy"
-            elif len(negative_factors) >= 3 and len(negative_factors) > len(positive_factors) * 2:
-                long_term_recommendation = "Long-Term Avoid"
-            elif len(negative_factors) > len(positive_factors):
-                long_term_recommendation = "Long-Term Caution"
-            else:
-                long_term_recommendation = "Long-Term Neutral"
-            
-            # Combine positive and negative factors
-            long_term_factors = positive_factors + negative_factors
+        long_term_recommendation, long_term_factors = analyze_long_term_factors(long_term_data)
         
         # Add long-term analysis to the prediction result
         prediction_result.update({
@@ -398,4 +563,265 @@ def predict_price_movement(ticker, historical_data, forecast_period=30):
             'predicted_return': None,
             'confidence': None,
             'forecast_period': forecast_period
-        }
\ No newline at end of file
+        }
+
+class LinearPredictionModel:
+    """
+    Standardized ridge regression fitted by the batch solver.
+    
+    This is the same model as the StandardScaler + Ridge pipeline used by
+    train_prediction_model, stored as plain arrays so that many of them can be
+    fitted in one vectorized solve.
+    """
+    
+    def __init__(self, feature_names, mean, scale, coef, intercept):
+        self.feature_names = list(feature_names)
+        self.mean = mean
+        self.scale = scale
+        self.coef = coef
+        self.intercept = intercept
+    
+    def predict(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=np.float64)
+        return ((X - self.mean) / self.scale) @ self.coef + self.intercept
+
+def _grouped_rolling(series, window, how):
+    rolled = series.groupby(level=0, sort=False).rolling(window=window)
+    return getattr(rolled, how)().droplevel(0)
+
+def create_panel_features(panel):
+    """
+    Create the create_features columns for many tickers at once.
+    
+    Args:
+        panel (pd.DataFrame): Historical price data indexed by (ticker, date)
+        
+    Returns:
+        pd.DataFrame: Panel with engineered features, rows with NaN values dropped
+    """
+    df = panel.copy()
+    close = df.groupby(level=0, sort=False)['Close']
+    
+    # Percentage changes over different time periods
+    df['return_1d'] = close.pct_change(1)
+    df['return_5d'] = close.pct_change(5)
+    df['return_10d'] = close.pct_change(10)
+    df['return_20d'] = close.pct_change(20)
+    
+    # Moving averages
+    df['ma5'] = _grouped_rolling(df['Close'], 5, 'mean')
+    df['ma10'] = _grouped_rolling(df['Close'], 10, 'mean')
+    df['ma20'] = _grouped_rolling(df['Close'], 20, 'mean')
+    df['ma50'] = _grouped_rolling(df['Close'], 50, 'mean')
+    
+    # Volatility features
+    df['volatility_5d'] = _grouped_rolling(df['return_1d'], 5, 'std')
+    df['volatility_10d'] = _grouped_rolling(df['return_1d'], 10, 'std')
+    df['volatility_20d'] = _grouped_rolling(df['return_1d'], 20, 'std')
+    
+    # Price relationships
+    df['close_to_ma5'] = df['Close'] / df['ma5']
+    df['close_to_ma10'] = df['Close'] / df['ma10']
+    df['close_to_ma20'] = df['Close'] / df['ma20']
+    df['close_to_ma50'] = df['Close'] / df['ma50']
+    
+    # Volume features
+    if 'Volume' in df.columns:
+        df['volume_ma5'] = _grouped_rolling(df['Volume'], 5, 'mean')
+        df['volume_ma10'] = _grouped_rolling(df['Volume'], 10, 'mean')
+        df['volume_change'] = df.groupby(level=0, sort=False)['Volume'].pct_change(1)
+    
+    return df.dropna()
+
+@lru_cache(maxsize=1024)
+def _train_indices(n_samples):
+    # Same shuffled split as train_test_split(X, y, test_size=0.2, random_state=42)
+    from sklearn.model_selection import train_test_split
+    train_idx, _ = train_test_split(np.arange(n_samples), test_size=0.2, random_state=42)
+    return train_idx
+
+def _fit_ridge_batch(train_sets, alpha=1.0):
+    """
+    Fit standardized ridge regressions for many training sets in one solve.
+    
+    Args:
+        train_sets (list): (X, y) array pairs, all with the same number of features
+        alpha (float): Ridge regularization strength
+        
+    Returns:
+        tuple: Arrays of feature means, scales, coefficients and intercepts, one row per set
+    """
+    n_sets = len(train_sets)
+    n_features = train_sets[0][0].shape[1]
+    max_rows = max(len(y) for _, y in train_sets)
+    
+    # Pad the training sets into one (sets, rows, features) array with a row mask
+    X = np.zeros((n_sets, max_rows, n_features))
+    y = np.zeros((n_sets, max_rows))
+    weights = np.zeros((n_sets, max_rows))
+    for i, (X_set, y_set) in enumerate(train_sets):
+        X[i, :len(y_set)] = X_set
+        y[i, :len(y_set)] = y_set
+        weights[i, :len(y_set)] = 1.0
+    counts = weights.sum(axis=1)
+    
+    # StandardScaler: population standard deviation, constant features left unscaled
+    mean = np.einsum('gnp,gn->gp', X, weights) / counts[:, None]
+    centered = (X - mean[:, None, :]) * weights[:, :, None]
+    scale = np.sqrt(np.einsum('gnp,gnp->gp', centered, centered) / counts[:, None])
+    scale[scale < 10 * np.finfo(np.float64).eps] = 1.0
+    X_scaled = centered / scale[:, None, :]
+    
+    # Ridge with intercept: center the target, then solve (X'X + alpha*I) w = X'y
+    y_mean = (y * weights).sum(axis=1) / counts
+    y_centered = (y - y_mean[:, None]) * weights
+    gram = np.einsum('gnp,gnq->gpq', X_scaled, X_scaled) + alpha * np.eye(n_features)
+    rhs = np.einsum('gnp,gn->gp', X_scaled, y_centered)
+    coef = np.linalg.solve(gram, rhs[:, :, None])[:, :, 0]
+    
+    return mean, scale, coef, y_mean
+
+def _predict_panel_returns(histories, forecast_period, pooled):
+    """Fit or reuse a model per ticker (or one pooled model) and predict the latest returns."""
+    # Tickers with an incremental feature state only fold in their new bars;
+    # the others get grouped rolling features, which then seed their states
+    frames = {}
+    if INCREMENTAL_FEATURES:
+        with timed('predict.features_incremental'):
+            for ticker, data in histories.items():
+                frame = feature_store.features(ticker, data)
+                if frame is not None:
+                    frames[ticker] = frame
+    
+    cold = {ticker: data for ticker, data in histories.items() if ticker not in frames}
+    if cold:
+        with timed('predict.features'):
+            panel_features = create_panel_features(pd.concat(cold, names=['ticker', 'date']))
+        for ticker, frame in panel_features.groupby(level=0, sort=False):
+            frames[ticker] = frame.droplevel(0)
+            if INCREMENTAL_FEATURES:
+                feature_store.seed(ticker, cold[ticker], frames[ticker])
+    
+    if not frames:
+        return {}
+    
+    # Keep the order of histories
+    features = pd.concat({ticker: frames[ticker] for ticker in histories if ticker in frames},
+                         names=['ticker', 'date'])
+    
+    feature_names = [c for c in features.columns if c not in NON_FEATURE_COLUMNS]
+    X_all = features[feature_names].to_numpy(dtype=np.float64)
+    y_all = (features.groupby(level=0, sort=False)['Close'].pct_change(forecast_period)
+             .groupby(level=0, sort=False).shift(-forecast_period).to_numpy(dtype=np.float64))
+    positions = features.groupby(level=0, sort=False).indices
+    
+    predicted = {}
+    models = {}
+    to_fit = []
+    for ticker, rows in positions.items():
+        if not pooled:
+            key = _model_cache_key(ticker, histories[ticker], forecast_period)
+            model = lookup_cached_model(key)
+            if model is not None:
+                models[ticker] = model
+                continue
+        
+        mask = ~np.isnan(y_all[rows])
+        if mask.sum() < 30:  # Need at least 30 samples to train a reasonable model
+            logger.warning(f"Not enough processed data points for prediction of {ticker}")
+            continue
+        
+        X_train = X_all[rows][mask]
+        y_train = y_all[rows][mask]
+        train_idx = _train_indices(len(y_train))
+        to_fit.append((ticker, X_train[train_idx], y_train[train_idx]))
+    
+    if to_fit:
+        if pooled:
+            train_sets = [(np.concatenate([X for _, X, _ in to_fit]), np.concatenate([y for _, _, y in to_fit]))]
+        else:
+            train_sets = [(X, y) for _, X, y in to_fit]
+        
+        with timed('predict.fit'):
+            mean, scale, coef, intercept = _fit_ridge_batch(train_sets)
+        for i, (ticker, _, _) in enumerate(to_fit):
+            j = 0 if pooled else i
+            model = LinearPredictionModel(feature_names, mean[j], scale[j], coef[j], intercept[j])
+            models[ticker] = model
+            if not pooled:
+                remember_model(_model_cache_key(ticker, histories[ticker], forecast_period), model)
+    
+    for ticker, model in models.items():
+        latest = features.iloc[positions[ticker][-1:]]
+        predicted[ticker] = model.predict(latest.drop(NON_FEATURE_COLUMNS, axis=1, errors='ignore'))[0]
+    
+    return predicted
+
+def predict_price_movements(histories, forecast_period=30, pooled=False):
+    """
+    Predict future price movement for many stocks in one pass.
+    
+    Features come from the tickers' incremental feature states, or are built
+    with grouped rolling operations for tickers without one, and the ridge
+    models are fitted together in one vectorized solve. Models already
+    in the registry for the same last bar are reused. With pooled=True a single
+    model is fitted across all tickers instead.
+    
+    Args:
+        histories (dict or pd.DataFrame): Historical OHLCV data per ticker, either a dict
+            of DataFrames or one DataFrame indexed by (ticker, date)
+        forecast_period (int): Number of days ahead to predict
+        pooled (bool): Share one model across all tickers
+        
+    Returns:
+        dict: Prediction results per ticker, in the same format as predict_price_movement
+    """
+    if isinstance(histories, pd.DataFrame):
+        histories = {ticker: frame.droplevel(0) for ticker, frame in histories.groupby(level=0, sort=False)}
+    
+    usable = {ticker: data for ticker, data in histories.items()
+              if data is not None and not data.empty and len(data) >= 60}
+    
+    predicted_returns = {}
+    try:
+        # Tickers can only share a panel when they have the same columns
+        # (e.g. funds have an extra 'Capital Gains' column)
+        by_columns = {}
+        for ticker, data in usable.items():
+            by_columns.setdefault(tuple(data.columns), {})[ticker] = data
+        for group in by_columns.values():
+            predicted_returns.update(_predict_panel_returns(group, forecast_period, pooled))
+    except Exception as e:
+        logger.error(f"Error in batch prediction, falling back to per-ticker models: {str(e)}")
+        return {ticker: predict_price_movement(ticker, data, forecast_period) for ticker, data in histories.items()}
+    
+    results = {}
+    for ticker, data in histories.items():
+        try:
+            if ticker in predicted_returns:
+                prediction_result = build_prediction_result(predicted_returns[ticker], data['Close'].iloc[-1], forecast_period)
+            else:
+                logger.warning(f"Could not create prediction model for {ticker}")
+                prediction_result = unknown_prediction_result(forecast_period)
+            
+            with timed('predict.long_term'):
+                long_term_data = calculate_long_term_indicators(data)
+            long_term_recommendation, long_term_factors = analyze_long_term_factors(long_term_data)
+            prediction_result.update({
+                'long_term_recommendation': long_term_recommendation,
+                'long_term_factors': long_term_factors,
+                'long_term_data': long_term_data
+            })
+            results[ticker] = prediction_result
+        except Exception as e:
+            logger.error(f"Error predicting price for {ticker}: {str(e)}")
+            results[ticker] = {
+                'prediction': 'Error',
+                'predicted_return': None,
+                'confidence': None,
+                'forecast_period': forecast_period
+            }
+    
+    return results
@@ -0,0 +1,223 @@
+"""
+Telemetry Module
+
+This module records where the time of a screen goes and exposes it in the
+Prometheus text format at /metrics:
+
+1. A latency histogram per pipeline stage (the upstream calls and cache
+   lookups of fetch_financial_data, the metrics, Lynch and prediction steps of
+   process_financial_data, feature engineering and model fitting in the
+   predictor, rate limiter waits and template rendering)
+2. Cache lookups by kind and result (hit, stale or miss)
+3. Upstream calls by outcome (success, error or throttled)
+4. Gauges of upstream calls and ticker fetches in flight
+
+Metrics are kept per process; with several gunicorn workers every worker
+reports its own values. With METRICS_ENABLED off, timed() hands out a shared
+no-op context manager and every update returns on its first line, so the
+instrumentation costs one attribute check per call.
+"""
+
+import os
+import time
+import bisect
+import threading
+from contextlib import nullcontext
+
+# Record metrics and serve /metrics
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_disabled_timer = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class for metrics with a fixed set of label names."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+                for labels, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def track(self, *labels):
+        """Context manager counting the calls in progress."""
+        if not METRICS_ENABLED:
+            return _disabled_timer
+        return _InProgress(self, labels)
+
+    def _samples(self):
+        if not self._values and not self.label_names:
+            return [f"{self.name} 0"]
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+                for labels, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        if not METRICS_ENABLED:
+            return
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Per-bucket counts (plus +Inf), sum and count
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][position] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, *labels):
+        """Context manager observing the time spent in its block."""
+        if not METRICS_ENABLED:
+            return _disabled_timer
+        return _Timer(self, labels)
+
+    def _samples(self):
+        lines = []
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class _InProgress:
+    __slots__ = ('gauge', 'labels')
+
+    def __init__(self, gauge, labels):
+        self.gauge = gauge
+        self.labels = labels
+
+    def __enter__(self):
+        self.gauge.inc(*self.labels)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.gauge.dec(*self.labels)
+        return False
+
+
+def render_metrics():
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics recorded by the application
+stage_seconds = Histogram('stocksight_stage_duration_seconds', 'Time spent in each pipeline stage.', ['stage'])
+cache_requests = Counter('stocksight_cache_requests_total', 'Cache lookups by kind of data and result.',
+                         ['kind', 'result'])
+upstream_calls = Counter('stocksight_upstream_calls_total', 'Upstream calls by outcome.', ['outcome'])
+upstream_in_flight = Gauge('stocksight_upstream_in_flight', 'Upstream calls in progress.')
+fetches_in_flight = Gauge('stocksight_fetches_in_flight', 'Tickers being fetched by batch screens.')
+
+
+def timed(stage):
+    """
+    Time a block of code as one pipeline stage.
+
+    Args:
+        stage (str): Stage name, e.g. 'fetch.info' or 'predict.fit'
+
+    Returns:
+        Context manager recording the block's duration
+    """
+    if not METRICS_ENABLED:
+        return _disabled_timer
+    return _Timer(stage_seconds, (stage,))
@@ -0,0 +1,9 @@
+"""
+Shared test setup: the application module reads its database URL when it is
+imported, so point it at a throwaway SQLite file before any test imports it.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
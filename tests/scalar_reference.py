@@ -0,0 +1,432 @@
+"""
+Per-ticker reference implementations the vectorized engines are checked
+against: the valuation metrics of the former process_financial_data and the
+former scalar categorize_stock / evaluate_stock_against_checklist, with their
+logging removed.
+
+Two behaviors are deliberately not reproduced, since the engines fixed them:
+
+1. The cyclical check used a generator whose loop variable shadowed
+   `industry` and `sector`, so it always held; here a keyword has to appear
+   in the industry or sector name
+2. A missing industry or sector raised on .lower(); here it counts as empty
+"""
+
+from lynch_categories import LYNCH_CHECKLISTS
+
+
+def baseline_metrics(data):
+    """Valuation metrics and color classes of one fetch_financial_data dict."""
+    market_cap = data['market_cap']
+    ebit = data['ebit']
+    total_debt = data['total_debt']
+    cash = data['cash']
+    nwc = data['nwc']
+    net_fixed_assets = data['net_fixed_assets']
+    current_price = data['current_price']
+    dividend_yield = data['dividend_yield']
+    current_liabilities = data.get('current_liabilities')
+    current_assets = data.get('current_assets')
+    total_assets = data.get('total_assets')
+    total_equity = data.get('total_equity')
+    book_value_per_share = data.get('book_value_per_share')
+    trailing_eps = data.get('trailing_eps')
+    earnings_growth = data.get('earnings_growth')
+
+    if market_cap is not None and total_debt is not None and cash is not None:
+        enterprise_value = market_cap + total_debt - cash
+    else:
+        enterprise_value = None
+
+    if enterprise_value and ebit is not None and enterprise_value != 0:
+        earnings_yield = (ebit / enterprise_value) * 100
+    else:
+        earnings_yield = None
+
+    if total_assets is not None and current_liabilities is not None:
+        invested_capital = total_assets - current_liabilities
+    elif net_fixed_assets and nwc:
+        invested_capital = net_fixed_assets + nwc
+    elif net_fixed_assets:
+        invested_capital = net_fixed_assets
+    elif nwc:
+        invested_capital = nwc
+    else:
+        invested_capital = None
+
+    if invested_capital and ebit is not None and invested_capital != 0:
+        return_on_capital = (ebit / invested_capital) * 100
+    else:
+        return_on_capital = None
+
+    if earnings_yield is not None and return_on_capital is not None:
+        magic_score = (earnings_yield / 2) + (return_on_capital / 2)
+    else:
+        magic_score = None
+
+    traditional_earnings_yield = None
+    net_income = data.get('net_income')
+    if market_cap is not None and market_cap > 0 and net_income is not None:
+        traditional_earnings_yield = (net_income / market_cap) * 100
+
+    alpha_spreads_score = None
+    if earnings_yield is not None and dividend_yield is not None:
+        earnings_to_dividend_ratio = earnings_yield / max(dividend_yield, 0.1)
+        if earnings_to_dividend_ratio > 3:
+            alpha_spreads_score = min(100, earnings_to_dividend_ratio * 10)
+        else:
+            alpha_spreads_score = earnings_to_dividend_ratio * 20
+
+    def upside_class(upside):
+        if upside > 50:
+            return "success"
+        elif upside > 20:
+            return "primary"
+        elif upside > 0:
+            return "warning"
+        return "danger"
+
+    graham_value = None
+    graham_upside = None
+    intrinsic_value_class = "secondary"
+    if trailing_eps is not None and current_price and current_price > 0:
+        growth_to_use = earnings_growth if isinstance(earnings_growth, (int, float)) else 0.05
+        if growth_to_use < 1:
+            growth_to_use = growth_to_use * 100
+        growth_to_use = min(growth_to_use, 15.0)
+        graham_value = trailing_eps * (8.5 + 2 * (growth_to_use / 100)) * 4.4 / 4.5
+        graham_upside = ((graham_value / current_price) - 1) * 100
+        intrinsic_value_class = upside_class(graham_upside)
+    elif ebit is not None and market_cap is not None and market_cap > 0:
+        shares_outstanding = market_cap / current_price if current_price and current_price > 0 else None
+        if shares_outstanding and shares_outstanding > 0:
+            estimated_eps = ebit * 0.7 / shares_outstanding
+            estimated_growth = earnings_growth if isinstance(earnings_growth, (int, float)) else 0.05
+            if estimated_growth < 1:
+                estimated_growth = estimated_growth * 100
+            estimated_growth = min(estimated_growth, 15.0)
+            graham_value = estimated_eps * (8.5 + 2 * (estimated_growth / 100)) * 4.4 / 4.5
+            graham_upside = ((graham_value / current_price) - 1) * 100
+            intrinsic_value_class = upside_class(graham_upside)
+
+    price_to_book = None
+    price_to_book_class = "secondary"
+    if current_price and book_value_per_share and book_value_per_share > 0:
+        price_to_book = current_price / book_value_per_share
+        if price_to_book < 1.0:
+            price_to_book_class = "success"
+        elif price_to_book < 1.5:
+            price_to_book_class = "primary"
+        elif price_to_book < 2.5:
+            price_to_book_class = "warning"
+        else:
+            price_to_book_class = "danger"
+
+    current_ratio = None
+    current_ratio_class = "secondary"
+    if current_assets and current_liabilities and current_liabilities > 0:
+        current_ratio = current_assets / current_liabilities
+        if current_ratio > 2.0:
+            current_ratio_class = "success"
+        elif current_ratio > 1.5:
+            current_ratio_class = "primary"
+        elif current_ratio > 1.0:
+            current_ratio_class = "warning"
+        else:
+            current_ratio_class = "danger"
+
+    debt_to_equity = None
+    debt_to_equity_class = "secondary"
+    if total_debt is not None and total_equity is not None and total_equity > 0:
+        debt_to_equity = total_debt / total_equity
+        if debt_to_equity < 0.3:
+            debt_to_equity_class = "success"
+        elif debt_to_equity < 0.5:
+            debt_to_equity_class = "primary"
+        elif debt_to_equity < 1.0:
+            debt_to_equity_class = "warning"
+        else:
+            debt_to_equity_class = "danger"
+
+    if earnings_yield is not None and return_on_capital is not None:
+        if earnings_yield > 40 and return_on_capital > 40:
+            buy_decision, decision_class = "Not Buy", "danger"
+        elif earnings_yield > 12 and return_on_capital > 15:
+            buy_decision, decision_class = "Strong Buy", "success"
+        elif earnings_yield > 4 and return_on_capital > 8:
+            buy_decision, decision_class = "Buy", "primary"
+        elif earnings_yield > 4 or return_on_capital > 8:
+            buy_decision, decision_class = "Hold", "warning"
+        else:
+            buy_decision, decision_class = "Not Buy", "danger"
+    else:
+        buy_decision, decision_class = "Insufficient Data", "secondary"
+
+    pe_ratio = None
+    if current_price is not None and trailing_eps is not None and trailing_eps != 0:
+        pe_ratio = current_price / trailing_eps
+    peg_ratio = None
+    if pe_ratio is not None and earnings_growth is not None and earnings_growth != 0:
+        growth_for_peg = earnings_growth
+        if isinstance(growth_for_peg, (int, float)) and growth_for_peg < 1:
+            growth_for_peg = growth_for_peg * 100
+        peg_ratio = pe_ratio / growth_for_peg
+
+    return {
+        'enterprise_value': enterprise_value,
+        'earnings_yield': earnings_yield,
+        'traditional_earnings_yield': traditional_earnings_yield,
+        'return_on_capital': return_on_capital,
+        'magic_score': magic_score,
+        'alpha_spreads_score': alpha_spreads_score,
+        'graham_value': graham_value,
+        'graham_upside': graham_upside,
+        'intrinsic_value_class': intrinsic_value_class,
+        'price_to_book': price_to_book,
+        'price_to_book_class': price_to_book_class,
+        'current_ratio': current_ratio,
+        'current_ratio_class': current_ratio_class,
+        'debt_to_equity': debt_to_equity,
+        'debt_to_equity_class': debt_to_equity_class,
+        'buy_decision': buy_decision,
+        'decision_class': decision_class,
+        'pe_ratio': pe_ratio,
+        'peg_ratio': peg_ratio,
+    }
+
+
+def baseline_categorize(data):
+    """Lynch category, description, key metrics and recommendations of one ticker."""
+    market_cap = data.get('market_cap')
+    earnings_growth = data.get('earnings_growth')
+    industry = (data.get('industry') or '').lower()
+    sector = (data.get('sector') or '').lower()
+    price_change = data.get('price_change_percent')
+    book_value_per_share = data.get('book_value_per_share')
+    current_price = data.get('current_price')
+    total_assets = data.get('total_assets')
+    enterprise_value = data.get('enterprise_value')
+
+    category = None
+    category_description = ""
+    key_metrics = []
+
+    cyclical_industries = ['automotive', 'airline', 'mining', 'steel', 'construction',
+                           'semiconductor', 'energy', 'oil', 'gas', 'housing', 'travel']
+    cyclical_sectors = ['materials', 'energy', 'industrials', 'consumer discretionary']
+    is_cyclical = any(keyword in industry for keyword in cyclical_industries) or \
+        any(keyword in sector for keyword in cyclical_sectors)
+
+    is_potential_turnaround = price_change is not None and price_change < -30
+
+    price_to_book = None
+    if current_price is not None and book_value_per_share is not None and book_value_per_share > 0:
+        price_to_book = current_price / book_value_per_share
+    is_asset_play = price_to_book is not None and price_to_book < 1.0
+
+    assets_to_ev = None
+    if total_assets is not None and enterprise_value is not None and enterprise_value > 0:
+        assets_to_ev = total_assets / enterprise_value
+    if assets_to_ev is not None and assets_to_ev > 1.2:
+        is_asset_play = True
+
+    if is_asset_play:
+        category = "Asset Play"
+        category_description = "Companies with valuable assets not reflected in the stock price"
+        key_metrics = [
+            f"Price-to-Book: {price_to_book:.2f}" if price_to_book else "Price-to-Book: N/A",
+            f"Assets to Enterprise Value: {assets_to_ev:.2f}" if assets_to_ev else "Assets to EV: N/A"
+        ]
+    elif is_potential_turnaround:
+        category = "Turnaround"
+        category_description = "Companies recovering from poor performance"
+        key_metrics = [
+            f"1-Year Price Change: {price_change:.2f}%" if price_change else "Price Change: N/A",
+            f"Debt-to-Equity: {data.get('debt_to_equity'):.2f}" if data.get('debt_to_equity') else "Debt-to-Equity: N/A"
+        ]
+    elif is_cyclical:
+        category = "Cyclical"
+        category_description = "Companies whose performance is tied to economic cycles"
+        key_metrics = [
+            f"Industry: {industry}",
+            f"P/E Ratio: {data.get('pe_ratio'):.2f}" if data.get('pe_ratio') else "P/E Ratio: N/A"
+        ]
+    elif earnings_growth is not None:
+        growth_rate = earnings_growth
+        if isinstance(growth_rate, (int, float)) and growth_rate < 1:
+            growth_rate = growth_rate * 100
+
+        if market_cap is not None and market_cap > 100_000_000_000 and growth_rate < 10:
+            category = "Slow Grower"
+            category_description = "Large, mature companies with modest growth (less than 10% annually)"
+            key_metrics = [
+                f"Dividend Yield: {data.get('dividend_yield'):.2f}%" if data.get('dividend_yield') else "Dividend Yield: N/A",
+                f"Growth Rate: {growth_rate:.2f}%"
+            ]
+        elif market_cap is not None and market_cap > 10_000_000_000 and 10 <= growth_rate <= 20:
+            category = "Stalwart"
+            category_description = "Large, established companies with solid financials and moderate growth (10-20% annually)"
+            key_metrics = [
+                f"Growth Rate: {growth_rate:.2f}%",
+                f"P/E Ratio: {data.get('pe_ratio'):.2f}" if data.get('pe_ratio') else "P/E Ratio: N/A"
+            ]
+        elif growth_rate > 20:
+            category = "Fast Grower"
+            category_description = "Companies with high growth (more than 20% annually)"
+            key_metrics = [
+                f"Growth Rate: {growth_rate:.2f}%",
+                f"PEG Ratio: {data.get('peg_ratio'):.2f}" if data.get('peg_ratio') else "PEG Ratio: N/A"
+            ]
+
+    if category is None:
+        if market_cap is not None and market_cap > 50_000_000_000:
+            category = "Stalwart"
+            category_description = "Large, established companies with solid financials"
+            key_metrics = [
+                f"P/E Ratio: {data.get('pe_ratio'):.2f}" if data.get('pe_ratio') else "P/E Ratio: N/A",
+                f"Dividend Yield: {data.get('dividend_yield'):.2f}%" if data.get('dividend_yield') else "Dividend Yield: N/A"
+            ]
+        else:
+            category = "Unknown"
+            category_description = "Unable to categorize with available data"
+            key_metrics = []
+
+    return {
+        "category": category,
+        "description": category_description,
+        "key_metrics": key_metrics,
+        "recommendations": LYNCH_CHECKLISTS.get(category, LYNCH_CHECKLISTS["General"]),
+    }
+
+
+def baseline_evaluate(data, category):
+    """Lynch checklist evaluation of one ticker: (meets_criteria, needs_attention, score)."""
+    meets, needs = [], []
+    score = 0
+
+    pe_ratio = data.get('pe_ratio')
+    peg_ratio = data.get('peg_ratio')
+    dividend_yield = data.get('dividend_yield')
+    debt_to_equity = data.get('debt_to_equity')
+    price_to_book = data.get('price_to_book')
+    assets_to_ev = data.get('assets_to_ev')
+    revenue_growth = data.get('revenue_growth')
+    earnings_growth = data.get('earnings_growth')
+    price_change_percent = data.get('price_change_percent')
+
+    if category == "Slow Grower":
+        if dividend_yield is not None and dividend_yield > 2.0:
+            meets.append("Good dividend yield (>2%)")
+            score += 1
+        else:
+            needs.append("Dividend yield could be higher")
+        if debt_to_equity is not None and debt_to_equity < 0.8:
+            meets.append("Reasonable debt levels")
+            score += 1
+        else:
+            needs.append("Monitor debt levels")
+
+    elif category == "Stalwart":
+        if pe_ratio is not None and earnings_growth is not None:
+            if pe_ratio < (earnings_growth * 1.5):
+                meets.append("Good P/E ratio relative to growth")
+                score += 1
+            else:
+                needs.append("P/E ratio may be too high relative to growth")
+        if price_change_percent is not None and price_change_percent < -10:
+            meets.append("Currently experiencing a temporary setback (potential buying opportunity)")
+            score += 1
+
+    elif category == "Fast Grower":
+        if revenue_growth is not None:
+            if revenue_growth > 25:
+                meets.append("Exceptional revenue growth (>25%)")
+                score += 1.5
+            elif revenue_growth > 20:
+                meets.append("Strong revenue growth (>20%)")
+                score += 1
+            elif revenue_growth > 15:
+                meets.append("Good revenue growth (>15%)")
+                score += 0.5
+            else:
+                needs.append("Revenue growth may be insufficient for a Fast Grower")
+        if peg_ratio is not None:
+            if peg_ratio < 0.8:
+                meets.append("Excellent PEG ratio (<0.8)")
+                score += 1.5
+            elif peg_ratio < 1.2:
+                meets.append("Attractive PEG ratio (<1.2)")
+                score += 1
+            elif peg_ratio < 1.5:
+                meets.append("Acceptable PEG ratio (<1.5)")
+                score += 0.5
+            else:
+                needs.append("PEG ratio may be too high for growth rate")
+        if data.get('industry') in ["Retail", "Restaurants", "Consumer Services", "Technology"]:
+            meets.append("Industry with strong expansion potential")
+            score += 0.5
+
+    elif category == "Cyclical":
+        if pe_ratio is not None:
+            if pe_ratio < 8:
+                meets.append("Very low P/E ratio (strong buying opportunity)")
+                score += 1.5
+            elif pe_ratio < 12:
+                meets.append("Low P/E ratio (potential buying opportunity)")
+                score += 1
+            elif pe_ratio > 25:
+                needs.append("Very high P/E ratio (consider taking profits)")
+            elif pe_ratio > 18:
+                needs.append("High P/E ratio (approaching peak valuation)")
+        if price_change_percent is not None:
+            if price_change_percent < -30:
+                meets.append("Significant downturn (strong buying opportunity)")
+                score += 1.5
+            elif price_change_percent < -20:
+                meets.append("Currently in a downturn (potential buying opportunity)")
+                score += 1
+            elif price_change_percent > 50:
+                needs.append("Significant upturn (consider taking profits)")
+        industry = data.get('industry')
+        if industry in ["Automotive", "Steel", "Chemicals", "Construction",
+                        "Manufacturing", "Airlines", "Hotels", "Energy"]:
+            meets.append(f"Confirmed cyclical industry: {industry}")
+            score += 0.5
+
+    elif category == "Turnaround":
+        if debt_to_equity is not None:
+            if debt_to_equity < 2.0:
+                meets.append("Manageable debt level for recovery")
+                score += 1
+            else:
+                needs.append("High debt level may impede recovery")
+        if price_change_percent is not None and price_change_percent > 10:
+            meets.append("Shows signs of recovery in share price")
+            score += 1
+
+    elif category == "Asset Play":
+        if price_to_book is not None:
+            if price_to_book < 1.0:
+                meets.append("Trading below book value")
+                score += 1
+            elif price_to_book < 1.3:
+                meets.append("Trading at reasonable price-to-book ratio")
+                score += 0.5
+            else:
+                needs.append("Price to book ratio may be too high for an Asset Play")
+        if assets_to_ev is not None:
+            if assets_to_ev > 1.2:
+                meets.append("Assets worth more than enterprise value")
+                score += 1
+            elif assets_to_ev > 0.8:
+                meets.append("Assets represent significant portion of enterprise value")
+                score += 0.5
+            else:
+                needs.append("Enterprise value significantly higher than asset value")
+        if data.get('sector') in ['Real Estate', 'Consumer Discretionary', 'Energy']:
+            meets.append("Operates in sector likely to have valuable physical assets")
+            score += 0.5
+
+    if score > 0:
+        score = min(5, score)
+    return meets, needs, score
@@ -0,0 +1,69 @@
+"""
+Tests for the analysis process pool: frames packed for the workers, and
+workers that do not inherit locks held by the web worker's threads.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis_pool
+
+# Held by a background thread while the pool starts, like a limiter or cache lock
+busy_lock = threading.Lock()
+
+
+def sum_closes(tickers, datas):
+    # A worker forked while busy_lock was held would block here forever
+    if not busy_lock.acquire(timeout=5):
+        raise RuntimeError("lock inherited in the held state")
+    busy_lock.release()
+    return [float(data['history']['Close'].sum()) for data in datas]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(analysis_pool, "ANALYSIS_PROCESSES", 2)
+    monkeypatch.setattr(analysis_pool, "ANALYSIS_POOL_MIN_BATCH", 1)
+    monkeypatch.setattr(analysis_pool, "ANALYSIS_PRELOAD", ["numpy", "pandas"])
+    monkeypatch.setattr(analysis_pool, "_executor", None)
+    yield
+    if analysis_pool._executor is not None:
+        analysis_pool._executor.shutdown(wait=True)
+
+
+def test_frames_round_trip_through_plain_arrays():
+    index = pd.date_range('2024-01-01', periods=3, freq='D', tz='America/New_York')
+    frame = pd.DataFrame({'Close': [1.0, 2.0, 3.0], 'Volume': [10.0, 20.0, 30.0]}, index=index)
+
+    packed = analysis_pool.pack_frame(frame)
+
+    assert isinstance(packed['values'], np.ndarray)
+    pd.testing.assert_frame_equal(analysis_pool.unpack_frame(packed), frame, check_freq=False)
+
+
+def test_workers_do_not_inherit_locks_held_by_other_threads(pool):
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with busy_lock:
+            holding.set()
+            release.wait(30)
+
+    thread = threading.Thread(target=hold, daemon=True)
+    thread.start()
+    holding.wait(5)
+    index = pd.date_range('2024-01-01', periods=2, freq='D')
+    datas = [{'history': pd.DataFrame({'Close': [float(i), 1.0]}, index=index)} for i in range(4)]
+
+    try:
+        results = analysis_pool.run_analysis(sum_closes, ['A', 'B', 'C', 'D'], datas)
+    finally:
+        release.set()
+        thread.join(5)
+
+    assert results == [1.0, 2.0, 3.0, 4.0]
+    assert analysis_pool._executor._mp_context.get_start_method() == 'forkserver'
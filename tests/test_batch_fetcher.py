@@ -0,0 +1,156 @@
+"""
+Tests for the shared fetch pool and the retrying HTTP session, against a
+local stand-in for the upstream HTTP server.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import batch_fetcher
+import http_session
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections need HTTP/1.1 and a Content-Length
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests[self.path] = server.requests.get(self.path, 0) + 1
+            count = server.requests[self.path]
+            status, delay = server.script.get(self.path, lambda n: (200, 0))(count)
+
+        time.sleep(delay)
+        body = f"{self.path} {count}".encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass  # The client gave up waiting (timeout test)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = set()
+    server.requests = {}
+    # Path -> function of the request count returning (status, delay in seconds)
+    server.script = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetch_pool(monkeypatch):
+    monkeypatch.setattr(batch_fetcher, "FETCH_MAX_WORKERS", 2)
+    monkeypatch.setattr(batch_fetcher, "_executor", None)
+    yield
+    if batch_fetcher._executor is not None:
+        batch_fetcher._executor.shutdown(wait=True)
+
+
+def test_batches_reuse_the_pool_threads_and_their_connections(upstream, fetch_pool):
+    session = http_session.create_session()
+    # Slow responses make the first batch start both pool threads
+    upstream.script["/quote"] = lambda n: (200, 0.05)
+
+    def fetch(ticker):
+        return session.get(f"{upstream.url}/quote?symbol={ticker}", timeout=5).status_code
+
+    tickers = ["AAA", "BBB", "CCC", "DDD"]
+    assert batch_fetcher.run_batch(tickers, fetch) == [200] * 4
+    connections = set(upstream.connections)
+    assert len(connections) <= 2
+
+    assert dict(batch_fetcher.iter_batch(tickers, fetch)) == {ticker: 200 for ticker in tickers}
+    assert batch_fetcher.run_batch(tickers, fetch) == [200] * 4
+    assert upstream.connections == connections
+    assert batch_fetcher.get_executor() is batch_fetcher.get_executor()
+
+
+def test_failed_ticker_does_not_affect_the_others(fetch_pool):
+    def task(ticker):
+        if ticker == "BAD":
+            raise ValueError("no data")
+        return ticker.lower()
+
+    assert batch_fetcher.run_batch(["AAA", "BAD", "CCC"], task) == ["aaa", None, "ccc"]
+
+
+def test_iter_batch_cancels_pending_tickers_when_the_consumer_stops():
+    executor = ThreadPoolExecutor(max_workers=1)
+    started = []
+
+    def task(ticker):
+        started.append(ticker)
+        time.sleep(0.02)
+        return ticker
+
+    stream = batch_fetcher.iter_batch(["AAA", "BBB", "CCC", "DDD"], task, executor=executor)
+    next(stream)
+    stream.close()
+    executor.shutdown(wait=True)
+    assert len(started) < 4
+
+
+retrying = pytest.mark.skipif(http_session.curl_requests is None, reason="curl_cffi is not installed")
+
+
+@retrying
+def test_server_errors_are_retried(upstream):
+    upstream.script["/flaky"] = lambda n: (503 if n <= 2 else 200, 0)
+    session = http_session.RetryingSession(retries=3, backoff=0.01)
+
+    response = session.get(f"{upstream.url}/flaky", timeout=5)
+
+    assert response.status_code == 200
+    assert upstream.requests["/flaky"] == 3
+
+
+@retrying
+def test_server_errors_are_returned_once_retries_run_out(upstream):
+    upstream.script["/down"] = lambda n: (502, 0)
+    session = http_session.RetryingSession(retries=2, backoff=0.01)
+
+    response = session.get(f"{upstream.url}/down", timeout=5)
+
+    assert response.status_code == 502
+    assert upstream.requests["/down"] == 3
+
+
+@retrying
+def test_rate_limit_responses_are_not_retried(upstream):
+    upstream.script["/limited"] = lambda n: (429, 0)
+    session = http_session.RetryingSession(retries=3, backoff=0.01)
+
+    assert session.get(f"{upstream.url}/limited", timeout=5).status_code == 429
+    assert upstream.requests["/limited"] == 1
+
+
+@retrying
+def test_timeouts_are_retried(upstream):
+    upstream.script["/slow"] = lambda n: (200, 1.0 if n == 1 else 0)
+    session = http_session.RetryingSession(retries=2, backoff=0.01)
+
+    response = session.get(f"{upstream.url}/slow", timeout=0.3)
+
+    assert response.status_code == 200
+    assert upstream.requests["/slow"] == 2
@@ -0,0 +1,48 @@
+"""
+Tests for processing a batch of fetched tickers: one ticker with malformed
+data is dropped without failing the rest of the batch.
+"""
+
+import importlib
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def main():
+    return importlib.import_module('main')
+
+
+@pytest.fixture(scope='module')
+def datas(main):
+    from data_providers import sample_provider
+
+    with main.app.app_context():
+        return {ticker: main.fetch_financial_data(ticker, provider=sample_provider, use_cache=False)
+                for ticker in ('AAPL', 'MSFT')}
+
+
+def test_batch_matches_processing_each_ticker(main, datas):
+    batch = main.process_financial_batch(['AAPL', 'MSFT'], [datas['AAPL'], datas['MSFT']])
+
+    assert [result['ticker'] for result in batch] == ['AAPL', 'MSFT']
+    assert batch[1] == main.process_financial_data('MSFT', datas['MSFT'])
+
+
+def test_ticker_failing_to_build_its_result_is_dropped(main, datas):
+    malformed = {key: value for key, value in datas['MSFT'].items() if key != 'company_name'}
+
+    batch = main.process_financial_batch(['AAPL', 'BAD', 'MSFT'], [datas['AAPL'], malformed, datas['MSFT']])
+
+    assert batch[1] is None
+    assert [result['ticker'] for result in (batch[0], batch[2])] == ['AAPL', 'MSFT']
+
+
+def test_ticker_failing_the_vectorized_stage_is_dropped(main, datas):
+    malformed = dict(datas['MSFT'], historical_data='not a frame')
+
+    batch = main.process_financial_batch(['AAPL', 'BAD', 'MSFT'], [datas['AAPL'], malformed, datas['MSFT']])
+
+    assert batch[1] is None
+    assert batch[0] == main.process_financial_data('AAPL', datas['AAPL'])
+    assert batch[2]['ticker'] == 'MSFT'
@@ -0,0 +1,52 @@
+"""
+Tests for splitting bulk downloads per ticker and for classifying the
+failures yf.download reports.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from bulk_history import split_wide_frame, download_errors
+from rate_limiter import is_rate_limit_error
+
+
+def wide_frame():
+    index = pd.date_range('2024-01-01', periods=3, freq='D', tz='UTC')
+    columns = pd.MultiIndex.from_product([['AAPL', 'MSFT'], ['Close', 'Volume']])
+    values = np.array([[1.0, 10.0, np.nan, np.nan],
+                       [2.0, 20.0, 5.0, 50.0],
+                       [3.0, 30.0, 6.0, 60.0]])
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+def test_wide_frame_is_split_per_ticker_without_empty_rows():
+    frames = split_wide_frame(wide_frame(), ['AAPL', 'MSFT', 'GOOG'])
+
+    assert sorted(frames) == ['AAPL', 'MSFT']
+    assert list(frames['AAPL']['Close']) == [1.0, 2.0, 3.0]
+    assert list(frames['MSFT']['Volume']) == [50.0, 60.0]
+
+
+def test_reported_rate_limits_are_classified():
+    yf = SimpleNamespace(shared=SimpleNamespace(_ERRORS={
+        'MSFT': "YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')",
+        'GOOG': "YFPricesMissingError('possibly delisted; no price data found')",
+    }))
+    frames = split_wide_frame(wide_frame(), ['AAPL'])
+
+    errors = download_errors(yf, ['AAPL', 'MSFT', 'GOOG'], frames)
+
+    assert sorted(errors) == ['GOOG', 'MSFT']
+    assert is_rate_limit_error(errors['MSFT'])
+    assert not is_rate_limit_error(errors['GOOG'])
+
+
+def test_missing_symbols_are_reported_without_the_private_error_state():
+    frames = split_wide_frame(wide_frame(), ['AAPL'])
+
+    errors = download_errors(SimpleNamespace(), ['AAPL', 'TSLA'], frames)
+
+    assert list(errors) == ['TSLA']
+    assert not is_rate_limit_error(errors['TSLA'])
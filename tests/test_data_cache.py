@@ -0,0 +1,73 @@
+"""
+Tests for the staleness limit of the data cache and the data-only encoding of
+its persisted payloads.
+"""
+
+import pickle
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_cache import DataCache, CacheEntry
+from serialization import encode_payload, decode_payload
+
+
+def cache_with(value, age, ttl=60, max_stale_factor=10):
+    cache = DataCache(ttls={'info': ttl}, max_stale_factor=max_stale_factor)
+    cache._memory_put(('AAPL', 'info'), CacheEntry(value, datetime.utcnow() - timedelta(seconds=age)))
+    return cache
+
+
+def test_recently_expired_entry_is_served_while_revalidating():
+    cache = cache_with('cached', age=120)
+    refreshed = []
+    cache._revalidate = lambda ticker, kind, loader: refreshed.append((ticker, kind))
+
+    assert cache.get('AAPL', 'info', lambda: 'fetched') == 'cached'
+    assert refreshed == [('AAPL', 'info')]
+
+
+def test_entry_beyond_the_staleness_limit_is_fetched_first():
+    cache = cache_with('cached', age=3 * 24 * 3600)
+
+    assert cache.get('AAPL', 'info', lambda: 'fetched') == 'fetched'
+    assert cache.lookup('AAPL', 'info').value == 'fetched'
+
+
+def test_entry_beyond_the_staleness_limit_is_served_when_upstream_fails():
+    cache = cache_with('cached', age=3 * 24 * 3600)
+
+    def failing_loader():
+        raise ConnectionError("upstream down")
+
+    assert cache.get('AAPL', 'info', failing_loader) == 'cached'
+
+
+def test_payloads_round_trip_without_pickle():
+    index = pd.DatetimeIndex(['2024-03-01', '2024-03-04'], name='Date').tz_localize('America/New_York')
+    value = {
+        'dividends': pd.Series([0.24, 0.25], index=index, name='Dividends'),
+        'financials': pd.DataFrame({pd.Timestamp('2023-09-30'): [1.5, np.nan]}, index=['Net Income', 'EBIT']),
+        'score': np.float64(1.25),
+        'rank': np.int64(3),
+        'flag': np.bool_(True),
+        'missing': float('nan'),
+        'as_of': pd.Timestamp('2024-03-04 16:00', tz='UTC'),
+        'factors': ['Low P/E', 'Rising margins'],
+    }
+
+    decoded = decode_payload(encode_payload(value))
+
+    pd.testing.assert_series_equal(decoded['dividends'], value['dividends'])
+    pd.testing.assert_frame_equal(decoded['financials'], value['financials'])
+    assert decoded['score'] == 1.25 and decoded['rank'] == 3 and decoded['flag'] is True
+    assert decoded['missing'] != decoded['missing']
+    assert decoded['as_of'] == value['as_of']
+    assert decoded['factors'] == value['factors']
+
+
+def test_pickled_payloads_are_rejected():
+    with pytest.raises(ValueError):
+        decode_payload(pickle.dumps({'info': 'old format'}))
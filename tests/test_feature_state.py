@@ -0,0 +1,78 @@
+"""
+Tests for the incremental features: a state fed a whole history reproduces
+create_features exactly, and a state continued over a sliding window stays
+within rounding of create_features of the window.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_state import FeatureState, FeatureStore
+from history_store import HistoryStore
+from stock_predictor import create_features
+
+# Sliding windows match create_features up to rounding (see the feature_state docstring)
+SLIDING_RTOL = 1e-12
+SLIDING_ATOL = 1e-14
+
+
+def history(days, seed=0, kind='random'):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2020-01-01', periods=days, freq='B', tz='America/New_York', name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    if kind == 'flat':
+        # Runs of identical closes exercise the zero-variance guards of the rolling kernels
+        close[:] = 50.0
+        close[100:130] = 51.0
+    data = pd.DataFrame({'Open': close * 0.99, 'High': close * 1.01, 'Low': close * 0.98, 'Close': close,
+                         'Volume': rng.integers(100_000, 10_000_000, days).astype(np.float64)}, index=index)
+    if kind == 'gapped':
+        data.iloc[[60, 61, 200], data.columns.get_loc('Close')] = np.nan
+    if kind == 'no_volume':
+        data = data.drop(columns='Volume')
+    return data
+
+
+def expected_features(data):
+    with warnings.catch_warnings():
+        # pct_change's default fill_method is deprecated; create_features relies on it
+        warnings.simplefilter('ignore', FutureWarning)
+        return create_features(data)
+
+
+@pytest.mark.parametrize('kind', ['random', 'flat', 'gapped', 'no_volume'])
+def test_state_fed_a_whole_history_matches_create_features_exactly(kind):
+    data = history(600, seed=1, kind=kind)
+    expected = expected_features(data)
+
+    state = FeatureState.from_frame(data, max_rows=len(data))
+    frame = state.frame(expected.index)
+
+    assert frame.index.equals(expected.index)
+    assert list(frame.columns) == list(expected.columns)
+    assert np.array_equal(frame.to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_state_continued_over_a_sliding_window_stays_within_rounding(tmp_path, seed):
+    data = history(500, seed=seed)
+    window = 252
+    store = FeatureStore(HistoryStore(str(tmp_path)), max_rows=256)
+    first = data.iloc[:window]
+    store.seed('TEST', first, expected_features(first))
+
+    for end in range(window + 1, len(data)):
+        if end % 100 == 0:
+            # Continue from the persisted state, as another worker would
+            store.clear()
+        bars = data.iloc[end - window:end]
+        expected = expected_features(bars)
+
+        frame = store.features('TEST', bars)
+
+        assert frame is not None
+        assert frame.index.equals(expected.index)
+        np.testing.assert_allclose(frame.to_numpy(), expected.to_numpy(), rtol=SLIDING_RTOL, atol=SLIDING_ATOL)
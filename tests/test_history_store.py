@@ -0,0 +1,93 @@
+"""
+Tests for the on-disk history store: the single-file format, reading files
+written with the older JSON sidecar, and appends from several processes.
+"""
+
+import json
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import history_store as history_store_module
+from history_store import HistoryStore
+
+
+def daily_bars(start, days, tz='America/New_York', offset=0.0):
+    index = pd.date_range(start, periods=days, freq='D', tz=tz, name='Date')
+    close = np.arange(days, dtype=np.float64) + 100 + offset
+    return pd.DataFrame({'Open': close - 1, 'Close': close, 'Volume': close * 1000}, index=index)
+
+
+def test_bars_columns_and_timezone_are_kept_in_one_file(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    bars = daily_bars('2024-01-01', 5)
+
+    store.append('AAPL', bars)
+
+    assert sorted(os.listdir(tmp_path)) == ['AAPL.lock', 'AAPL.npy']
+    stored = store.read('AAPL')
+    pd.testing.assert_frame_equal(stored, bars, check_names=False, check_freq=False)
+    assert str(stored.index.tz) == 'America/New_York'
+    assert store.last_date('AAPL') == bars.index[-1]
+
+
+def test_naive_histories_round_trip(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    bars = daily_bars('2024-01-01', 3, tz=None)
+
+    store.append('SPY', bars)
+
+    pd.testing.assert_frame_equal(store.read('SPY'), bars, check_names=False, check_freq=False)
+
+
+def test_overlapping_bars_replace_stored_ones(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append('AAPL', daily_bars('2024-01-01', 5))
+    revised = daily_bars('2024-01-05', 3, offset=50.0)
+
+    store.append('AAPL', revised)
+
+    stored = store.read('AAPL')
+    assert len(stored) == 7
+    assert stored['Close'].iloc[4] == revised['Close'].iloc[0]
+
+
+def test_files_with_a_json_sidecar_are_read_and_rewritten(tmp_path):
+    bars = daily_bars('2024-01-01', 4)
+    epoch = bars.index.tz_convert('UTC').tz_localize(None).asi8 // 1_000_000_000
+    np.save(tmp_path / 'MSFT.npy', np.column_stack([epoch.astype(np.float64), bars.to_numpy()]))
+    (tmp_path / 'MSFT.json').write_text(json.dumps({'columns': list(bars.columns), 'tz': 'America/New_York'}))
+    store = HistoryStore(str(tmp_path))
+
+    pd.testing.assert_frame_equal(store.read('MSFT'), bars, check_names=False, check_freq=False)
+
+    store.append('MSFT', daily_bars('2024-01-05', 1, offset=4.0))
+    assert not (tmp_path / 'MSFT.json').exists()
+    assert len(store.read('MSFT')) == 5
+
+
+def _append_one_bar_at_a_time(directory, start, days):
+    store = HistoryStore(directory)
+    bars = daily_bars(start, days)
+    for i in range(days):
+        store.append('KO', bars.iloc[i:i + 1])
+
+
+@pytest.mark.skipif(history_store_module.fcntl is None, reason="file locks need fcntl")
+def test_appends_from_several_processes_keep_every_bar(tmp_path):
+    context = multiprocessing.get_context('fork')
+    starts = ['2020-01-01', '2021-01-01', '2022-01-01', '2023-01-01']
+    processes = [context.Process(target=_append_one_bar_at_a_time, args=(str(tmp_path), start, 25))
+                 for start in starts]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    stored = HistoryStore(str(tmp_path)).read('KO')
+    assert len(stored) == 25 * len(starts)
+    assert stored.index.is_monotonic_increasing
@@ -0,0 +1,49 @@
+"""
+Tests for polling a background screening job: partial results are paged by
+the number of results the client already has, and sent as table rows.
+"""
+
+import importlib
+import json
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def client():
+    # The database is the throwaway SQLite file set up in conftest
+    main = importlib.import_module('main')
+    from models import db, ScreenJob
+
+    with main.app.app_context():
+        db.create_all()
+        # Three tickers analyzed, one of which failed and has no result
+        results = [{'ticker': 'AAA', 'company_name': 'Aaa Inc'}, {'ticker': 'CCC', 'company_name': 'Ccc Inc'}]
+        db.session.add(ScreenJob(id='job-1', status='running', tickers='AAA,BBB,CCC,DDD', total=4,
+                                 completed=3, results=json.dumps(results), updated_at=datetime.utcnow()))
+        db.session.commit()
+    yield main.app.test_client()
+    with main.app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_poll_returns_new_results_as_rows(client):
+    data = client.get('/api/jobs/job-1?offset=0').get_json()
+
+    assert [result['ticker'] for result in data['data']['results']] == ['AAA', 'CCC']
+    assert data['data']['completed'] == 3
+    assert data['html'].count('<tr') == 2
+
+
+def test_offset_counts_results_not_tickers(client):
+    data = client.get('/api/jobs/job-1?offset=1').get_json()
+    assert [result['ticker'] for result in data['data']['results']] == ['CCC']
+
+    data = client.get('/api/jobs/job-1?offset=2').get_json()
+    assert data['data']['results'] == [] and data['html'] == ''
+
+
+def test_unknown_job_is_not_found(client):
+    assert client.get('/api/jobs/missing').status_code == 404
@@ -0,0 +1,104 @@
+"""
+Tests for background screening jobs: claiming jobs from the table and
+resuming jobs left behind by a worker that went away.
+"""
+
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from jobs import JobQueue
+from models import db, ScreenJob
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'jobs.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def screened(tickers):
+    return [{'ticker': ticker, 'earnings_yield': 0.1, 'return_on_capital': 0.2} for ticker in tickers]
+
+
+def make_queue(app, calls):
+    def screen(tickers):
+        calls.append(list(tickers))
+        return screened(tickers)
+
+    job_queue = JobQueue(workers=1, chunk_size=2, heartbeat_timeout=60, recovery_interval=0.05)
+    job_queue.init_app(app, screen)
+    return job_queue
+
+
+def add_job(job_id, status, completed=0, results=None, age=0):
+    updated_at = datetime.utcnow() - timedelta(seconds=age)
+    db.session.add(ScreenJob(id=job_id, status=status, tickers='AAA,BBB,CCC,DDD', total=4,
+                             completed=completed, results=json.dumps(results or []),
+                             created_at=updated_at, updated_at=updated_at))
+    db.session.commit()
+
+
+def wait_for(app, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            job = db.session.get(ScreenJob, job_id)
+            if job.status == status:
+                return job.status, job.completed, [result['ticker'] for result in job.get_results()]
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not become {status}")
+
+
+def test_submitted_job_runs_in_chunks(app):
+    calls = []
+    job_queue = make_queue(app, calls)
+
+    with app.app_context():
+        job_id = job_queue.submit(['AAA', 'BBB', 'CCC'])
+
+    status, completed, tickers = wait_for(app, job_id, 'done')
+    assert completed == 3
+    assert sorted(tickers) == ['AAA', 'BBB', 'CCC']
+    assert calls == [['AAA', 'BBB'], ['CCC']]
+
+
+def test_abandoned_jobs_are_resumed_after_a_restart(app):
+    calls = []
+    job_queue = make_queue(app, calls)
+    with app.app_context():
+        add_job('queued-job', 'queued', age=5)
+        add_job('stale-job', 'running', completed=2, results=screened(['AAA', 'BBB']), age=120)
+
+        # A status poll starts the workers of the new process
+        job_queue.get('stale-job')
+
+    wait_for(app, 'queued-job', 'done')
+    status, completed, tickers = wait_for(app, 'stale-job', 'done')
+    assert completed == 4
+    assert sorted(tickers) == ['AAA', 'BBB', 'CCC', 'DDD']
+    assert ['CCC', 'DDD'] in calls and calls.count(['AAA', 'BBB']) == 1
+
+
+def test_jobs_running_elsewhere_are_left_alone(app):
+    calls = []
+    job_queue = make_queue(app, calls)
+    with app.app_context():
+        add_job('live-job', 'running', completed=2, age=5)
+
+        assert not job_queue._claim('live-job')
+        job_queue.get('live-job')
+    time.sleep(0.2)
+
+    with app.app_context():
+        assert db.session.get(ScreenJob, 'live-job').completed == 2
+    assert calls == []
@@ -0,0 +1,132 @@
+"""
+Parity tests for the Lynch rule engine: categories, key metrics and checklist
+results must equal the former per-ticker rules (with the cyclical check
+fixed), on edge cases and on randomized inputs.
+"""
+
+import numpy as np
+import pytest
+
+from lynch_categories import categorize_stock, evaluate_stock_against_checklist
+from lynch_engine import records_to_frame, classify_frame, classification_to_rows
+from scalar_reference import baseline_categorize, baseline_evaluate
+
+BASE = {
+    'ticker': 'TEST', 'market_cap': 20e9, 'earnings_growth': 0.08, 'revenue_growth': 9.0,
+    'industry': 'Software—Application', 'sector': 'Technology', 'price_change_percent': 5.0,
+    'book_value_per_share': 20.0, 'current_price': 100.0, 'total_assets': 30e9,
+    'enterprise_value': 60e9, 'pe_ratio': 18.0, 'peg_ratio': 1.1, 'debt_to_equity': 0.6,
+    'dividend_yield': 1.5,
+}
+
+# (name, overrides of BASE, expected category)
+CASES = [
+    # The old shadowing bug made every one of these Cyclical
+    ('unknown_mid_cap', {}, 'Unknown'),
+    ('fast_grower_software', {'earnings_growth': 0.35, 'revenue_growth': 30.0}, 'Fast Grower'),
+    ('fast_grower_expansion_industry', {'earnings_growth': 45.0, 'industry': 'Restaurants',
+                                        'sector': 'Consumer Cyclical', 'peg_ratio': 0.5}, 'Fast Grower'),
+    ('slow_grower', {'market_cap': 300e9, 'earnings_growth': 0.04, 'dividend_yield': 3.1,
+                     'debt_to_equity': 0.5}, 'Slow Grower'),
+    ('stalwart_by_growth', {'earnings_growth': 0.15, 'pe_ratio': 20.0, 'price_change_percent': -12.0}, 'Stalwart'),
+    ('stalwart_growth_in_percent', {'earnings_growth': 15.0, 'pe_ratio': 20.0}, 'Stalwart'),
+    ('stalwart_by_size', {'market_cap': 80e9, 'earnings_growth': None}, 'Stalwart'),
+    ('large_cap_with_zero_growth', {'market_cap': 150e9, 'earnings_growth': 0}, 'Slow Grower'),
+    ('missing_everything', {key: None for key in BASE if key != 'ticker'}, 'Unknown'),
+    ('missing_industry_and_sector', {'industry': None, 'sector': None, 'earnings_growth': 0.3}, 'Fast Grower'),
+    # Cyclicals are now matched on keywords in the industry or sector name
+    ('cyclical_industry_keyword', {'industry': 'Oil & Gas E&P', 'sector': 'Oil Services', 'pe_ratio': 6.0,
+                                   'price_change_percent': -25.0}, 'Cyclical'),
+    ('cyclical_sector_keyword', {'sector': 'Basic Materials', 'industry': 'Chemicals', 'pe_ratio': 30.0,
+                                 'price_change_percent': 60.0}, 'Cyclical'),
+    ('confirmed_cyclical_industry', {'industry': 'Steel', 'sector': 'Basic Materials', 'pe_ratio': 19.0}, 'Cyclical'),
+    ('cyclical_without_pe', {'industry': 'Auto Parts', 'sector': 'Consumer Discretionary', 'pe_ratio': None}, 'Cyclical'),
+    ('turnaround', {'price_change_percent': -45.0, 'debt_to_equity': 1.5}, 'Turnaround'),
+    ('turnaround_heavy_debt', {'price_change_percent': -35.0, 'debt_to_equity': 3.0}, 'Turnaround'),
+    ('turnaround_beats_cyclical', {'price_change_percent': -50.0, 'industry': 'Airlines'}, 'Turnaround'),
+    ('asset_play_below_book', {'current_price': 15.0, 'price_to_book': 0.75, 'assets_to_ev': 0.9,
+                               'sector': 'Real Estate'}, 'Asset Play'),
+    ('asset_play_hidden_assets', {'total_assets': 90e9, 'price_to_book': 1.2, 'assets_to_ev': 1.5,
+                                  'sector': 'Energy'}, 'Asset Play'),
+    ('asset_play_expensive', {'current_price': 18.0, 'price_to_book': 2.0, 'assets_to_ev': 0.5}, 'Asset Play'),
+    ('negative_book_value', {'book_value_per_share': -5.0}, 'Unknown'),
+    ('negative_enterprise_value', {'enterprise_value': -10e9}, 'Unknown'),
+    ('fast_grower_score_capped', {'earnings_growth': 0.5, 'revenue_growth': 40.0, 'peg_ratio': 0.3,
+                                  'industry': 'Technology'}, 'Fast Grower'),
+]
+
+
+def record(overrides):
+    data = dict(BASE)
+    data.update(overrides)
+    return data
+
+
+def assert_same(analysis, data, name):
+    expected = baseline_categorize(data)
+    for key in ('category', 'description', 'key_metrics', 'recommendations'):
+        assert analysis[key] == expected[key], (name, key)
+
+    meets, needs, score = baseline_evaluate(data, expected['category'])
+    assert analysis['meets_criteria'] == meets, name
+    assert analysis['needs_attention'] == needs, name
+    # Scores stay integers unless half points were added
+    assert analysis['checklist_score'] == score and type(analysis['checklist_score']) is type(score), name
+
+
+@pytest.mark.parametrize('name,overrides,category', CASES, ids=[name for name, _, _ in CASES])
+def test_single_ticker_matches_the_scalar_rules(name, overrides, category):
+    data = record(overrides)
+
+    analysis = categorize_stock(data)
+    evaluation = evaluate_stock_against_checklist(data, analysis['category'])
+
+    assert analysis['category'] == category
+    assert_same(dict(analysis, meets_criteria=evaluation['meets_criteria'],
+                     needs_attention=evaluation['needs_attention'],
+                     checklist_score=evaluation['overall_score']), data, name)
+
+
+def test_batch_matches_the_scalar_rules_row_by_row():
+    datas = [record(overrides) for _, overrides, _ in CASES]
+
+    analyses = classification_to_rows(classify_frame(records_to_frame(datas)))
+
+    for (name, _, category), data, analysis in zip(CASES, datas, analyses):
+        assert analysis['category'] == category, name
+        assert_same(analysis, data, name)
+
+
+def test_randomized_inputs_match_the_scalar_rules():
+    rng = np.random.default_rng(11)
+    industries = ['Steel', 'Oil & Gas Midstream', 'Software—Infrastructure', 'Restaurants', 'Technology',
+                  'Airlines', 'Biotechnology', 'Auto Manufacturers', None]
+    sectors = ['Technology', 'Energy', 'Basic Materials', 'Industrials', 'Real Estate', 'Healthcare',
+               'Consumer Discretionary', None]
+    datas = []
+    for _ in range(3000):
+        data = {'ticker': 'T', 'industry': industries[rng.integers(len(industries))],
+                'sector': sectors[rng.integers(len(sectors))]}
+        for field, value in BASE.items():
+            if field in data or field == 'ticker':
+                continue
+            draw = rng.random()
+            if draw < 0.15:
+                data[field] = None
+            elif draw < 0.2:
+                data[field] = 0
+            else:
+                data[field] = value * rng.uniform(-1.5, 4.0)
+        # Spread size and price moves wide enough to reach every category
+        if data['market_cap']:
+            data['market_cap'] *= rng.choice([1, 3, 8])
+        if data['price_change_percent']:
+            data['price_change_percent'] = rng.uniform(-60, 80)
+        data['price_to_book'] = None if rng.random() < 0.5 else rng.uniform(0.3, 3.0)
+        data['assets_to_ev'] = None if rng.random() < 0.5 else rng.uniform(0.3, 2.0)
+        datas.append(data)
+
+    analyses = classification_to_rows(classify_frame(records_to_frame(datas)))
+
+    for index, (data, analysis) in enumerate(zip(datas, analyses)):
+        assert_same(analysis, data, f"random {index}")
@@ -0,0 +1,113 @@
+"""
+Parity tests for the vectorized metrics engine: every metric and color class
+must equal the former per-ticker process_financial_data rules, on edge cases
+and on randomized inputs, whether a ticker is processed alone or in a batch.
+"""
+
+import numpy as np
+import pytest
+
+from metrics_engine import records_to_frame, compute_metrics, metrics_to_rows
+from scalar_reference import baseline_metrics
+
+BASE = {
+    'market_cap': 200e9, 'ebit': 20e9, 'total_debt': 30e9, 'cash': 10e9,
+    'nwc': 5e9, 'net_fixed_assets': 40e9, 'current_price': 150.0, 'dividend_yield': 1.2,
+    'current_assets': 60e9, 'current_liabilities': 35e9, 'total_assets': 180e9,
+    'total_equity': 70e9, 'book_value_per_share': 40.0, 'trailing_eps': 6.5,
+    'earnings_growth': 0.12, 'net_income': 15e9,
+}
+
+# (name, overrides of BASE)
+CASES = [
+    ('typical', {}),
+    ('missing_market_cap', {'market_cap': None}),
+    ('missing_cash', {'cash': None}),
+    ('zero_enterprise_value', {'market_cap': 50e9, 'total_debt': 10e9, 'cash': 60e9}),
+    ('negative_enterprise_value', {'cash': 500e9}),
+    ('missing_ebit', {'ebit': None}),
+    ('negative_ebit', {'ebit': -5e9}),
+    ('missing_eps_estimated_from_ebit', {'trailing_eps': None}),
+    ('missing_eps_and_price', {'trailing_eps': None, 'current_price': None}),
+    ('missing_eps_negative_market_cap', {'trailing_eps': None, 'market_cap': -1e9}),
+    ('zero_price', {'current_price': 0}),
+    ('zero_eps', {'trailing_eps': 0}),
+    ('negative_eps', {'trailing_eps': -2.0}),
+    ('missing_growth', {'earnings_growth': None}),
+    ('growth_in_percent', {'earnings_growth': 25.0}),
+    ('growth_exactly_one', {'earnings_growth': 1.0}),
+    ('negative_growth', {'earnings_growth': -0.3}),
+    ('zero_growth', {'earnings_growth': 0}),
+    ('missing_dividend_yield', {'dividend_yield': None}),
+    ('zero_dividend_yield', {'dividend_yield': 0}),
+    ('invested_capital_from_fixed_assets_and_nwc', {'total_assets': None}),
+    ('invested_capital_from_fixed_assets', {'total_assets': None, 'nwc': 0}),
+    ('invested_capital_from_nwc', {'total_assets': None, 'net_fixed_assets': None}),
+    ('no_invested_capital', {'total_assets': None, 'net_fixed_assets': None, 'nwc': None}),
+    ('zero_invested_capital', {'total_assets': 35e9}),
+    ('zero_current_liabilities', {'current_liabilities': 0}),
+    ('negative_equity', {'total_equity': -1e9}),
+    ('negative_book_value', {'book_value_per_share': -3.0}),
+    ('missing_net_income', {'net_income': None}),
+    ('too_good_to_be_true', {'ebit': 150e9}),
+    ('hold', {'ebit': 3e9}),
+    ('not_buy', {'ebit': 1e9}),
+    ('numpy_scalars', {field: np.float64(value) for field, value in BASE.items()}),
+]
+
+
+def record(overrides):
+    data = dict(BASE)
+    data.update(overrides)
+    return data
+
+
+def assert_same(actual, expected, name):
+    assert actual.keys() == expected.keys(), name
+    for key, value in expected.items():
+        if value is None:
+            assert actual[key] is None, (name, key, actual[key])
+        else:
+            # Exact equality: the engine performs the same floating-point operations
+            assert actual[key] == value, (name, key, actual[key], value)
+
+
+@pytest.mark.parametrize('name,overrides', CASES, ids=[name for name, _ in CASES])
+def test_single_ticker_matches_the_scalar_rules(name, overrides):
+    data = record(overrides)
+
+    [metrics] = metrics_to_rows(compute_metrics(records_to_frame([data])))
+
+    assert_same(metrics, baseline_metrics(data), name)
+
+
+def test_batch_matches_the_scalar_rules_row_by_row():
+    datas = [record(overrides) for _, overrides in CASES]
+
+    rows = metrics_to_rows(compute_metrics(records_to_frame(datas)))
+
+    for (name, _), data, metrics in zip(CASES, datas, rows):
+        assert_same(metrics, baseline_metrics(data), name)
+
+
+def test_randomized_inputs_match_the_scalar_rules():
+    rng = np.random.default_rng(7)
+    datas = []
+    for _ in range(2000):
+        data = {}
+        for field, value in BASE.items():
+            draw = rng.random()
+            if draw < 0.1:
+                data[field] = None
+            elif draw < 0.15:
+                data[field] = 0
+            elif draw < 0.25:
+                data[field] = -value * rng.random()
+            else:
+                data[field] = value * rng.uniform(0.05, 3.0)
+        datas.append(data)
+
+    rows = metrics_to_rows(compute_metrics(records_to_frame(datas)))
+
+    for index, (data, metrics) in enumerate(zip(datas, rows)):
+        assert_same(metrics, baseline_metrics(data), f"random {index}")
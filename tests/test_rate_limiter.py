@@ -0,0 +1,124 @@
+"""
+Tests for the adaptive upstream rate limiter and the circuit breaker,
+including outcomes of calls that were already in flight when it tripped.
+"""
+
+import threading
+import time
+
+import pytest
+
+from rate_limiter import AdaptiveTokenBucket, CircuitBreaker, TokenBucket, UpstreamThrottled
+
+
+def in_other_thread(function):
+    thread = threading.Thread(target=function)
+    thread.start()
+    thread.join(5)
+
+
+def test_bucket_lets_a_burst_through_and_then_times_out():
+    bucket = TokenBucket(rate=1, capacity=3)
+
+    assert all(bucket.acquire(timeout=0) for _ in range(3))
+    assert not bucket.acquire(timeout=0.01)
+
+
+def test_rate_increases_additively_and_is_capped():
+    limiter = AdaptiveTokenBucket(rate=2, capacity=10, min_rate=0.5, max_rate=3, increase=1.0)
+
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(2.5)
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.rate == 3
+
+
+def test_rate_is_cut_once_per_burst_of_throttles_and_floored():
+    limiter = AdaptiveTokenBucket(rate=8, capacity=10, min_rate=3, max_rate=8, decrease=0.5)
+
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.rate == 4
+    assert limiter.state()['tokens'] <= 0.5
+
+    limiter._last_decrease = 0.0
+    limiter.on_throttle()
+    assert limiter.rate == 3
+
+
+def open_breaker(cooldown=0.05):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=cooldown, max_cooldown=1.0)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_throttle()
+    assert breaker.state()['state'] == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = open_breaker()
+    with pytest.raises(UpstreamThrottled):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state()['state'] == CircuitBreaker.HALF_OPEN
+    # A second caller waits for the probe
+    with pytest.raises(UpstreamThrottled):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state()['state'] == CircuitBreaker.CLOSED
+    assert breaker.state()['consecutive_throttles'] == 0
+    breaker.before_call()
+
+
+def test_late_success_while_open_does_not_close_the_circuit():
+    breaker = open_breaker()
+
+    in_other_thread(breaker.record_success)
+    breaker.record_success()
+
+    assert breaker.state()['state'] == CircuitBreaker.OPEN
+    with pytest.raises(UpstreamThrottled):
+        breaker.before_call()
+
+
+def test_only_the_probe_decides_while_half_open():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+
+    # Calls from before the circuit opened finish while the probe is in flight
+    in_other_thread(breaker.record_success)
+    in_other_thread(breaker.record_throttle)
+    assert breaker.state()['state'] == CircuitBreaker.HALF_OPEN
+
+    breaker.record_success()
+    assert breaker.state()['state'] == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_doubles_the_cooldown():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+
+    breaker.record_throttle()
+
+    state = breaker.state()
+    assert state['state'] == CircuitBreaker.OPEN
+    assert state['cooldown'] == pytest.approx(0.1)
+
+
+def test_probe_failing_for_another_reason_allows_a_new_probe():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    in_other_thread(breaker.record_failure)
+    with pytest.raises(UpstreamThrottled):
+        breaker.before_call()
+
+    breaker.record_failure()
+    breaker.before_call()
+    assert breaker.state()['state'] == CircuitBreaker.HALF_OPEN
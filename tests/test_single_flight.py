@@ -0,0 +1,86 @@
+"""
+Tests for request coalescing: threads of one worker sharing a fetch, and the
+database lease that coordinates workers when it is enabled.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from models import db, FetchLock
+from single_flight import SingleFlight
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'locks.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_threads_share_one_fetch_without_touching_the_database():
+    flight = SingleFlight(shared=True)
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(('AAPL', 'info'), fetch, lambda: None)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flight.in_flight() == 0:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ['value'] * 4
+
+
+def test_lease_is_taken_once_and_released(app):
+    flight = SingleFlight(shared=True)
+    flight.init_app(app)
+
+    assert flight._acquire('AAPL:info', 'worker-1')
+    assert not flight._acquire('AAPL:info', 'worker-2')
+    assert flight._is_held('AAPL:info')
+
+    flight._release('AAPL:info', 'worker-1')
+    assert not flight._is_held('AAPL:info')
+    assert flight._acquire('AAPL:info', 'worker-2')
+
+
+def test_expired_lease_is_taken_over(app):
+    flight = SingleFlight(shared=True)
+    flight.init_app(app)
+    with app.app_context():
+        db.session.add(FetchLock(key='AAPL:info', owner='crashed',
+                                 expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+
+    assert flight._acquire('AAPL:info', 'worker-1')
+    with app.app_context():
+        assert db.session.get(FetchLock, 'AAPL:info').owner == 'worker-1'
+
+
+def test_lease_is_skipped_unless_enabled(app):
+    flight = SingleFlight(shared=False)
+    flight.init_app(app)
+
+    assert flight.do(('AAPL', 'info'), lambda: 'fetched', lambda: 'published') == 'fetched'
+    with app.app_context():
+        assert FetchLock.query.count() == 0